@@ -1,7 +1,8 @@
 import math
-import time
 from gi.repository import GLib
 
+import instrument
+
 class Easing:
     """アニメーションの動きの質（イージング）を定義するクラス"""
     
@@ -24,50 +25,151 @@ class Easing:
         c3 = c1 + 1
         return 1 + c3 * pow(t - 1, 3) + c1 * pow(t - 1, 2)
 
+class AnimationClock:
+    """全アニメーションを1つのフレームコールバックでまとめて進める時計
+
+    GdkFrameClock (vsync に同期) の tick で動き、動いているアニメーションが
+    無くなったら tick コールバックを外して完全に止まる。
+    終わったアニメーションはすぐに手放すので、長時間動かしても増え続けない。
+    """
+    def __init__(self, widget):
+        self.widget = widget
+        # 挿入順を保つため dict を順序付き集合として使う
+        self.animators = {}
+        self.tick_id = None
+        # ウィジェットごとのアニメーション {widget: [destroyハンドラID, {key: Animator}]}
+        self.widget_animators = {}
+
+    @property
+    def live_count(self):
+        """現在動いている Animator の数"""
+        return len(self.animators)
+
+    def animate(self, widget, key, to_value, duration_ms, setter,
+                easing_func=None, from_value=None, complete_callback=None):
+        """widget の値 (key で区別) を to_value までアニメーションさせる
+
+        同じ widget/key で動いているものがあれば止めて、その現在値から引き継ぐ。
+        widget が destroy されたら自動でキャンセルされる。
+        """
+        entry = self.widget_animators.get(widget)
+        current = entry[1].get(key) if entry else None
+        if current is not None:
+            if from_value is None:
+                from_value = current.value
+            current.stop()
+        if from_value is None:
+            from_value = 0.0
+
+        # stop() で登録が消えている場合があるので取り直す
+        entry = self.widget_animators.get(widget)
+        if entry is None:
+            handler_id = widget.connect("destroy", self.cancel_widget)
+            entry = self.widget_animators[widget] = [handler_id, {}]
+
+        animator = Animator(duration_ms, setter, complete_callback, easing_func,
+                            clock=self, from_value=from_value, to_value=to_value)
+        animator.widget = widget
+        animator.key = key
+        entry[1][key] = animator
+        animator.start()
+        return animator
+
+    def cancel_widget(self, widget):
+        """widget のアニメーションをすべて止める (完了コールバックは呼ばない)"""
+        entry = self.widget_animators.get(widget)
+        if entry is None:
+            return
+        for animator in list(entry[1].values()):
+            animator.stop()
+
+    def add(self, animator):
+        self.animators[animator] = None
+        if self.tick_id is None:
+            self.tick_id = self.widget.add_tick_callback(self._on_tick)
+
+    def remove(self, animator):
+        self._release(animator)
+        if not self.animators and self.tick_id is not None:
+            self.widget.remove_tick_callback(self.tick_id)
+            self.tick_id = None
+
+    def _release(self, animator):
+        """Animator への参照をすべて手放す"""
+        self.animators.pop(animator, None)
+        if animator.widget is None:
+            return
+        entry = self.widget_animators.get(animator.widget)
+        if entry is not None and entry[1].get(animator.key) is animator:
+            del entry[1][animator.key]
+            if not entry[1]:
+                # このウィジェットのアニメーションが無くなったら destroy の監視もやめる
+                animator.widget.disconnect(entry[0])
+                del self.widget_animators[animator.widget]
+
+    @instrument.timed('animation.frame')
+    def _on_tick(self, widget, frame_clock):
+        # フレーム時刻 (単調増加, マイクロ秒) を全アニメーションで共有する
+        now = frame_clock.get_frame_time() / 1000000.0
+        for animator in list(self.animators):
+            # 他のアニメーションのコールバックで止められたものは飛ばす
+            if animator in self.animators and not animator.advance(now):
+                self._release(animator)
+
+        if not self.animators:
+            self.tick_id = None
+            return GLib.SOURCE_REMOVE
+        return GLib.SOURCE_CONTINUE
+
 class Animator:
-    """値を0.0から1.0へ変化させるアニメーション管理クラス"""
-    def __init__(self, duration_ms, update_callback, complete_callback=None, easing_func=None):
+    """値を from_value から to_value (既定は0.0から1.0) へ変化させるアニメーション管理クラス"""
+    def __init__(self, duration_ms, update_callback, complete_callback=None, easing_func=None,
+                 clock=None, from_value=0.0, to_value=1.0):
         self.duration = duration_ms / 1000.0  # 秒に変換
         self.update_callback = update_callback
         self.complete_callback = complete_callback
-        self.start_time = 0
+        self.start_time = None
         self.easing_func = easing_func if easing_func else Easing.ease_out_quad
-        self.timer_id = None
+        # 共有の AnimationClock (個別のタイマーは持たない)
+        self.clock = clock
+        self.from_value = from_value
+        self.to_value = to_value
+        # 現在値 (途中で別のアニメーションに引き継ぐときに使う)
+        self.value = from_value
+        # AnimationClock.animate から作られた場合の対象
+        self.widget = None
+        self.key = None
 
     def start(self):
-        """アニメーションを開始"""
-        if self.timer_id is not None:
-            GLib.source_remove(self.timer_id)
-        
-        self.start_time = time.time()
-        # 約60FPS (16ms) で更新
-        self.timer_id = GLib.timeout_add(16, self._tick)
+        """アニメーションを開始 (開始時刻は最初のフレームで決まる)"""
+        self.start_time = None
+        self.clock.add(self)
 
     def stop(self):
         """アニメーションを強制停止"""
-        if self.timer_id is not None:
-            GLib.source_remove(self.timer_id)
-            self.timer_id = None
+        self.clock.remove(self)
 
-    def _tick(self):
-        current_time = time.time()
-        elapsed = current_time - self.start_time
+    def advance(self, now):
+        """フレーム時刻 now (秒) まで進める。続ける場合は True を返す"""
+        if self.start_time is None:
+            self.start_time = now
+        elapsed = now - self.start_time
         
         # 進捗率 (0.0 -> 1.0)
-        progress = min(elapsed / self.duration, 1.0)
+        progress = min(elapsed / self.duration, 1.0) if self.duration > 0 else 1.0
         
         # イージング適用
         eased_value = self.easing_func(progress)
+        self.value = self.from_value + (self.to_value - self.from_value) * eased_value
         
         # コールバック呼び出し (UI更新)
         if self.update_callback:
-            self.update_callback(eased_value)
+            self.update_callback(self.value)
 
         # 終了判定
         if progress >= 1.0:
             if self.complete_callback:
                 self.complete_callback()
-            self.timer_id = None
-            return False  # タイマー停止
+            return False  # 終了
         
-        return True  # タイマー継続
\ No newline at end of file
+        return True  # 継続
\ No newline at end of file
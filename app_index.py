@@ -0,0 +1,212 @@
+import os
+import json
+import threading
+
+from gi.repository import GLib, Gio
+
+# ディスクキャッシュの形式が変わったら上げる
+CACHE_VERSION = 2
+
+
+def application_dirs():
+    """.desktop ファイルを探すディレクトリ (優先度の高い順)"""
+    dirs = []
+    for base in [GLib.get_user_data_dir()] + list(GLib.get_system_data_dirs()):
+        path = os.path.join(base, "applications")
+        if path not in dirs and os.path.isdir(path):
+            dirs.append(path)
+    return dirs
+
+
+def cache_path():
+    return os.path.join(GLib.get_user_cache_dir(), "gtk-dock-x11", "app-index.json")
+
+
+def _desktop_files(top):
+    """top 以下の .desktop ファイルの {top からの相対パス: mtime} (os.scandir で読み、中身は開かない)"""
+    files = {}
+    stack = [top]
+    while stack:
+        try:
+            with os.scandir(stack.pop()) as it:
+                for entry in it:
+                    try:
+                        if entry.is_dir(follow_symlinks=False):
+                            stack.append(entry.path)
+                        elif entry.name.endswith(".desktop"):
+                            files[os.path.relpath(entry.path, top)] = entry.stat().st_mtime_ns
+                    except OSError:
+                        pass
+        except OSError:
+            pass
+    return files
+
+
+def _scan_file(path):
+    """1つの .desktop を読み、[アイコン, 実行ファイル名, WMクラス] を返す
+
+    Hidden=true なら None (下位ディレクトリの同じIDを打ち消す)、
+    使えないファイル (読めない・アイコンが無い) なら [] を返す。
+    """
+    try:
+        app = Gio.DesktopAppInfo.new_from_filename(path)
+    except Exception:
+        app = None
+    if app is None: return []
+    if app.get_is_hidden(): return None
+
+    icon = app.get_icon()
+    if not icon: return []
+    executable = app.get_executable()
+    return [
+        icon.to_string(),
+        os.path.basename(executable).lower() if executable else None,
+        app.get_startup_wm_class().lower() if app.get_startup_wm_class() else None,
+    ]
+
+
+def scan_directory(top, cached=None):
+    """1つのアプリディレクトリを読み、{相対パス: [mtime, _scan_file() の結果]} を返す
+
+    cached (前回の結果) と mtime が同じファイルは読み直さない。
+    ディレクトリの mtime ではその場での書き換えが分からないので、ファイルごとに比べる。
+    """
+    cached = cached or {}
+    files = {}
+    for relpath, mtime in _desktop_files(top).items():
+        old = cached.get(relpath)
+        if old is not None and old[0] == mtime:
+            files[relpath] = old
+        else:
+            files[relpath] = [mtime, _scan_file(os.path.join(top, relpath))]
+    return files
+
+
+def desktop_entries(files):
+    """scan_directory() の結果から {デスクトップID: [アイコン, 実行ファイル名, WMクラス] or None} を作る"""
+    # サブディレクトリは "-" でつないでIDにする (例: kde4/foo.desktop -> kde4-foo.desktop)
+    return {relpath.replace(os.sep, "-"): entry
+            for relpath, (mtime, entry) in files.items() if entry != []}
+
+
+def build_mapping(dir_entries):
+    """ディレクトリごとの結果から {名前: アイコン文字列} を作る
+
+    dir_entries は優先度の高い順。同じデスクトップIDは優先度の高い方だけを使う。
+    キーはデスクトップID (.desktop抜き)・実行ファイル名・StartupWMClass をすべて小文字で登録する。
+    """
+    apps = {}
+    for entries in reversed(dir_entries):
+        apps.update(entries)
+
+    mapping = {}
+    for desktop_id, entry in apps.items():
+        if entry is None: continue
+        icon_str, executable, wm_class = entry
+        mapping[desktop_id.lower().replace(".desktop", "")] = icon_str
+        if executable:
+            mapping[executable] = icon_str
+        if wm_class:
+            mapping[wm_class] = icon_str
+    return mapping
+
+
+def load_icon_mapping(use_cache=True):
+    """ディスクキャッシュを使って索引を作る (どのスレッドからでも呼べる)
+
+    mtime が変わっていない .desktop ファイルはキャッシュの内容をそのまま使い、
+    追加・変更されたファイルだけ読み直す。
+    """
+    cached = {}
+    if use_cache:
+        try:
+            with open(cache_path(), encoding="utf-8") as f:
+                data = json.load(f)
+            if data.get("version") == CACHE_VERSION:
+                cached = data["dirs"]
+        except (OSError, ValueError, KeyError):
+            cached = {}
+
+    dirs = {}
+    dirty = False
+    for top in application_dirs():
+        old = cached.get(top)
+        files = scan_directory(top, old)
+        dirty = dirty or files != old
+        dirs[top] = files
+    # ディレクトリが消えた場合もキャッシュを書き直す
+    dirty = dirty or cached.keys() != dirs.keys()
+
+    if use_cache and dirty:
+        _write_cache(dirs)
+
+    # AppInfoMonitor の "changed" は GIO の索引が参照されるまで再発火しないので、
+    # 軽い問い合わせ (mimeapps のみ参照) で監視を再開させておく
+    Gio.AppInfo.get_default_for_type("text/plain", False)
+    return build_mapping([desktop_entries(files) for files in dirs.values()])
+
+
+def _write_cache(dirs):
+    path = cache_path()
+    try:
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = path + ".tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump({"version": CACHE_VERSION, "dirs": dirs}, f, separators=(",", ":"))
+        # 書きかけのファイルを読まないよう、置き換えは一発で
+        os.replace(tmp_path, path)
+    except OSError as e:
+        print(f"Failed to write app index cache: {e}")
+
+
+class AppIconIndex:
+    """アプリ名 -> アイコン文字列 の索引
+
+    .desktop ファイルの読み込みはワーカースレッドで行い、結果だけメインループに渡す。
+    構築が終わるまでは lookup() は None を返す (呼び出し側は代替アイコンを使う)。
+    """
+    def __init__(self, on_changed=None, use_cache=True):
+        # on_changed(changed_keys): 索引が更新され、アイコンが変わった名前の集合を受け取る
+        # (最初に構築できたときは None = 全部。索引に無い名前も代替アイコンから変わりうるため)
+        self.on_changed = on_changed
+        self.use_cache = use_cache
+        self.mapping = {}
+        self.ready = False
+        # 走査が重なったときに古い結果を捨てるための世代番号
+        self._generation = 0
+
+        # アプリのインストール・削除を監視して索引を作り直す
+        self.monitor = Gio.AppInfoMonitor.get()
+        self.monitor.connect("changed", lambda monitor: self.refresh())
+
+    def lookup(self, name):
+        return self.mapping.get(name)
+
+    def refresh(self):
+        """バックグラウンドで索引を作り直す (変更のあったファイルだけ読む)"""
+        self._generation += 1
+        worker = threading.Thread(target=self._scan, args=(self._generation,), daemon=True)
+        worker.start()
+
+    def _scan(self, generation):
+        # ワーカースレッド: GTKには触らず、結果をメインループへ渡すだけ
+        try:
+            mapping = load_icon_mapping(self.use_cache)
+        except Exception as e:
+            print(f"App index scan failed: {e}")
+            return
+        GLib.idle_add(self._apply, generation, mapping)
+
+    def _apply(self, generation, mapping):
+        # メインスレッド
+        if generation != self._generation:
+            return False  # より新しい走査が進行中
+
+        old = self.mapping
+        changed = {key for key in old.keys() | mapping.keys() if old.get(key) != mapping.get(key)}
+        self.mapping = mapping
+        first = not self.ready
+        self.ready = True
+        if self.on_changed and (first or changed):
+            self.on_changed(None if first else changed)
+        return False
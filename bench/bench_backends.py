@@ -0,0 +1,133 @@
+"""X11 バックエンドの比較: python-xlib vs xcffib
+
+1. 同じウィンドウ群に対して、両方のバックエンドの X11Helper が同じ結果を返すか確認する
+   (ウィンドウリスト・まとめ取得・アイコン・現在のデスクトップ)。違えば終了コード 1
+2. 1往復の時間 (get_active_window を繰り返す)
+3. まとめ取得 (get_window_metadata) の時間
+4. イベントの受信・デコード速度 (別の接続で大量のプロパティ変更を起こし、全部読み終えるまで)
+
+使い方: python3 bench/bench_backends.py [--windows 200] [--events 20000] [--repeat 5]
+(Xvfb と python-xlib・xcffib が必要)
+"""
+import argparse
+import select
+import sys
+import time
+
+from xvfb import xvfb, create_windows, measure
+
+
+def publish(creator, ids):
+    """WM の代わりにルートへ _NET_CLIENT_LIST などを書き、一部のウィンドウにアイコンを付ける"""
+    from Xlib import Xatom
+
+    root = creator.screen().root
+    atom = creator.intern_atom
+    root.change_property(atom('_NET_CLIENT_LIST'), Xatom.WINDOW, 32, ids)
+    root.change_property(atom('_NET_ACTIVE_WINDOW'), Xatom.WINDOW, 32, ids[:1])
+    root.change_property(atom('_NET_CURRENT_DESKTOP'), Xatom.CARDINAL, 32, [1])
+    for i, win_id in enumerate(ids):
+        win = creator.create_resource_object('window', win_id)
+        win.change_property(atom('_NET_WM_DESKTOP'), Xatom.CARDINAL, 32, [i % 4])
+        if i % 3 == 0:
+            # 16x16 と 32x32 の2枚 (ピクセル値は位置から作る)
+            icon = [16, 16] + [(0xFF << 24) | p for p in range(16 * 16)]
+            icon += [32, 32] + [(0x80 << 24) | p for p in range(32 * 32)]
+            win.change_property(atom('_NET_WM_ICON'), Xatom.CARDINAL, 32, icon)
+    creator.sync()
+
+
+def snapshot(helper):
+    ids = helper.get_window_list()
+    return {
+        'window_list': ids,
+        'metadata': helper.get_window_metadata(ids),
+        'icons': {win_id: helper.get_window_icon(win_id, 24) for win_id in ids},
+        'current_desktop': helper.get_current_desktop(),
+        'active_window': helper.get_active_window(),
+    }
+
+
+def check_consistency(helpers):
+    """全バックエンドの結果が同じかを確認し、違う項目を返す"""
+    results = {name: snapshot(helper) for name, helper in helpers.items()}
+    names = list(results)
+    reference = results[names[0]]
+    mismatches = []
+    for name in names[1:]:
+        for key, value in results[name].items():
+            if value != reference[key]:
+                mismatches.append(f"{key}: {names[0]} != {name}")
+    return mismatches
+
+
+def event_rate(helper, creator, ids, total):
+    """ids のプロパティを合計 total 回変更し、helper が全部読み終えるまでの速度 (イベント/秒)"""
+    helper.track_windows(ids)
+    helper.backend.sync()
+    atom_name = creator.intern_atom('_NET_WM_NAME')
+    atom_utf8 = creator.intern_atom('UTF8_STRING')
+    for i in range(total):
+        win = creator.create_resource_object('window', ids[i % len(ids)])
+        win.change_property(atom_name, atom_utf8, 8, f"title {i}".encode('utf-8'))
+    creator.sync()
+
+    fd = helper.backend.fileno()
+    received = 0
+    start = time.perf_counter()
+    while received < total:
+        events = helper.backend.poll_events()
+        received += sum(1 for kind, _, _ in events if kind == 'property')
+        if not events:
+            readable, _, _ = select.select([fd], [], [], 5)
+            if not readable:
+                break
+    elapsed = time.perf_counter() - start
+    for win_id in ids:
+        helper.untrack_window(win_id)
+    helper.backend.sync()
+    helper.backend.poll_events()
+    return received / elapsed if elapsed else 0.0, received
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--windows', type=int, default=200)
+    parser.add_argument('--events', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--round-trips', type=int, default=1000, help='1往復の計測に使う回数')
+    args = parser.parse_args()
+
+    with xvfb():
+        from Xlib import display
+        import x11_backends
+        from x11_helper import X11Helper
+
+        if not x11_backends.HAS_XCFFIB:
+            print("xcffib is not installed; only python-xlib can be measured")
+            return 1
+
+        creator = display.Display()
+        ids = create_windows(creator, args.windows)
+        publish(creator, ids)
+        helpers = {name: X11Helper(backend=name) for name in x11_backends.BACKENDS}
+
+        mismatches = check_consistency(helpers)
+        for line in mismatches:
+            print(f"MISMATCH {line}")
+        print(f"consistency: {'ok' if not mismatches else 'FAILED'} ({len(ids)} windows)")
+
+        print(f"{'backend':>8} {'round-trip(us)':>15} {'metadata(ms)':>13} {'events/s':>10}")
+        for name, helper in helpers.items():
+            count = args.round_trips
+            rtt, _ = measure(lambda: [helper.get_active_window() for _ in range(count)], args.repeat)
+            batch, _ = measure(lambda: helper.get_window_metadata(ids), args.repeat)
+            rate, received = event_rate(helper, creator, ids, args.events)
+            note = "" if received == args.events else f"  (received {received}/{args.events})"
+            print(f"{name:>8} {rtt * 1000 / count:>15.1f} {batch:>13.2f} {rate:>10.0f}{note}")
+
+        return 1 if mismatches else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
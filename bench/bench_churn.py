@@ -0,0 +1,167 @@
+"""ウィンドウの開閉を繰り返したときのメモリの増え方と、ボタン1つの追加にかかる時間
+
+Xvfb 上で fake_wm.py とドック全体を動かし、ダミーウィンドウを1つ開いてタスクバーに
+出たら閉じる、を --cycles 回 (既定 10000) 繰り返す。ボタンを使い回す場合
+(TASK_BUTTON_POOL) と毎回作り直す場合 (TASK_BUTTON_POOL = 0) を別プロセスで計り、
+- ModernDock._add_task_button / _remove_task の1回あたりの時間 (p50/p95)
+- 最初の --sample-every 回 (ウォームアップ) の後からの RSS と Python のオブジェクト数の増え方
+- 作ったボタンの数
+を表示する。
+
+使い方: python3 bench/bench_churn.py [--cycles 10000] [--set GROUP_WINDOWS=True]
+(Xvfb・GTK3・python-xlib が必要)
+"""
+import argparse
+import gc
+import json
+import os
+import subprocess
+import sys
+import time
+
+from xvfb import xvfb, create_windows, rss_kb, percentile, parse_overrides, run_child
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+CLASSES = ("xterm", "firefox", "code", "thunar", "gimp")
+# 1回の開閉でこれ以上かかったら打ち切る (秒)
+CYCLE_TIMEOUT = 10
+
+
+def fmt_ms(value):
+    return "-" if value is None else f"{value:.3f}"
+
+
+def child(pool_size, cycles, sample_every, overrides):
+    """計測対象のプロセス。結果を JSON 1行で標準出力に書く"""
+    import gi
+    gi.require_version('Gtk', '3.0')
+    from gi.repository import Gio, GLib
+    from Xlib import display
+
+    import config
+    for key, value in overrides.items():
+        setattr(config, key, value)
+    config.TASK_BUTTON_POOL = pool_size
+    from main import DockApp
+
+    wm = subprocess.Popen([sys.executable, os.path.join(BENCH_DIR, "fake_wm.py")])
+    disp = display.Display()
+    result = {"add_ms": [], "remove_ms": [], "samples": [], "timeouts": 0}
+    state = {"dock": None, "cycle": 0, "win_id": None, "open": False, "since": 0.0}
+
+    def timed(name, func):
+        def wrapper(*args):
+            start = time.perf_counter()
+            try:
+                return func(*args)
+            finally:
+                result[name].append((time.perf_counter() - start) * 1000)
+        return wrapper
+
+    def sample():
+        dock = state["dock"]
+        gc.collect()
+        result["samples"].append({
+            "cycle": state["cycle"], "rss_kb": rss_kb(), "objects": len(gc.get_objects()),
+            "buttons_created": dock.button_pool.created, "buttons_reused": dock.button_pool.reused,
+        })
+
+    def open_window():
+        wm_class = CLASSES[state["cycle"] % len(CLASSES)]
+        win_id = create_windows(disp, 1, (wm_class,))[0]
+        disp.create_resource_object('window', win_id).map()
+        disp.flush()
+        state.update(win_id=win_id, open=True, since=time.monotonic())
+
+    def close_window():
+        disp.create_resource_object('window', state["win_id"]).destroy()
+        disp.flush()
+        state.update(open=False, since=time.monotonic())
+
+    def poll():
+        tasks = state["dock"].tasks
+        if time.monotonic() - state["since"] > CYCLE_TIMEOUT:
+            # ドックに届かなかった (届いたことにして先へ進む)
+            result["timeouts"] += 1
+        elif (state["win_id"] in tasks) != state["open"]:
+            return True
+        if state["open"]:
+            close_window()
+            return True
+
+        state["cycle"] += 1
+        if state["cycle"] % sample_every == 0:
+            sample()
+        if state["cycle"] >= cycles:
+            print(json.dumps(result), flush=True)
+            app.quit()
+            return False
+        open_window()
+        return True
+
+    def wait_until_ready():
+        dock = state["dock"]
+        # X11 への接続は起動の段階処理 (startup_stages) の中で行われる
+        if not dock.get_mapped() or dock.startup_stages:
+            return True
+        # インスタンスの属性で包むので、ドック内部からの呼び出しも計測される
+        dock._add_task_button = timed("add_ms", dock._add_task_button)
+        dock._remove_task = timed("remove_ms", dock._remove_task)
+        sample()
+        open_window()
+        GLib.timeout_add(1, poll)
+        return False
+
+    def on_window_added(application, dock):
+        state["dock"] = dock
+        GLib.timeout_add(50, wait_until_ready)
+
+    try:
+        app = DockApp()
+        app.set_flags(Gio.ApplicationFlags.NON_UNIQUE)
+        app.connect("window-added", on_window_added)
+        app.run([])
+    finally:
+        wm.kill()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--cycles', type=int, default=10000)
+    parser.add_argument('--sample-every', type=int, default=1000,
+                        help='RSS とオブジェクト数を記録する間隔 (最初の1回はウォームアップとして比較から外す)')
+    parser.add_argument('--pool', type=int, default=None,
+                        help='使い回す場合のプールの大きさ (省略時は config.TASK_BUTTON_POOL)')
+    parser.add_argument('--set', action='append', default=[], metavar='KEY=VALUE',
+                        help='config の値を上書きする (例: GROUP_WINDOWS=True)')
+    parser.add_argument('--child', type=int, metavar='POOL', help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child is not None:
+        child(args.child, args.cycles, args.sample_every, parse_overrides(args.set))
+        return
+
+    import config
+    pool_size = config.TASK_BUTTON_POOL if args.pool is None else args.pool
+    with xvfb():
+        print(f"{'pool':>5} {'cycles':>7} {'add p50/p95(ms)':>16} {'remove p50/p95(ms)':>19} "
+              f"{'rss +KB/1k':>11} {'objects +/1k':>13} {'created':>8} {'timeouts':>8}")
+        for size in (pool_size, 0):
+            child_args = [size, "--cycles", args.cycles, "--sample-every", args.sample_every]
+            for item in args.set:
+                child_args += ["--set", item]
+            result = run_child(__file__, child_args)
+            add = "/".join(fmt_ms(percentile(result['add_ms'], pct)) for pct in (50, 95))
+            remove = "/".join(fmt_ms(percentile(result['remove_ms'], pct)) for pct in (50, 95))
+            # ウォームアップ (最初の間隔) の後から最後までの増え方を1000回あたりにならす
+            samples = result["samples"]
+            first, last = samples[min(1, len(samples) - 1)], samples[-1]
+            per_k = 1000 / max(last["cycle"] - first["cycle"], 1)
+            rss = (last["rss_kb"] - first["rss_kb"]) * per_k
+            objects = (last["objects"] - first["objects"]) * per_k
+            print(f"{size:>5} {args.cycles:>7} {add:>16} {remove:>19} {rss:>11.1f} {objects:>13.1f} "
+                  f"{last['buttons_created']:>8} {result['timeouts']:>8}")
+
+
+if __name__ == '__main__':
+    main()
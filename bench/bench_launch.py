@@ -0,0 +1,147 @@
+"""アプリ起動の計測: クリック -> ウィンドウが現れるまで、とUIスレッドが止まる時間
+
+一時的な XDG_DATA_HOME に fake_app.py を起動する .desktop を置き、
+AppLauncher (ドックと同じ起動・照合の処理) で順に起動する。アプリごとに
+- launch() が UIスレッドを止めた時間 (launch_uris_async) と、従来の同期的な launch() の時間
+- クリックから新しいウィンドウと照合できるまでの時間
+- どの手がかりで照合できたか (_NET_STARTUP_ID / _NET_WM_PID / WM_CLASS)
+を表示する。照合できなかった起動があれば終了コード 1。
+
+使い方: python3 bench/bench_launch.py [--repeat 5]
+(Xvfb・GTK3・python-xlib が必要)
+"""
+import argparse
+import os
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from xvfb import xvfb
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+
+# (デスクトップID, fake_app.py の --mode, ウィンドウを出すまでの時間 (ミリ秒), StartupNotify)
+APPS = [
+    ('bench-fast.desktop', 'startup-id', 50, True),
+    ('bench-slow.desktop', 'startup-id', 800, True),
+    ('bench-pid.desktop', 'pid', 200, False),
+    ('bench-fork.desktop', 'fork', 300, False),
+]
+
+
+def write_desktop_files(data_home):
+    directory = os.path.join(data_home, "applications")
+    os.makedirs(directory)
+    for desktop_id, mode, delay, notify in APPS:
+        wm_class = desktop_id[:-len(".desktop")]
+        with open(os.path.join(directory, desktop_id), "w") as f:
+            f.write("[Desktop Entry]\nType=Application\n"
+                    f"Name={wm_class}\nIcon=application-x-executable\n"
+                    f"Exec={sys.executable} {os.path.join(BENCH_DIR, 'fake_app.py')} "
+                    f"--class {wm_class} --mode {mode} --delay {delay}\n"
+                    f"StartupNotify={'true' if notify else 'false'}\n"
+                    f"StartupWMClass={wm_class}\n")
+
+
+def run(repeat):
+    import gi
+    gi.require_version('Gtk', '3.0')
+    gi.require_version('Gdk', '3.0')
+    from gi.repository import Gtk, Gdk
+
+    from launcher import AppLauncher
+    from x11_helper import X11Helper
+
+    x11 = X11Helper()
+    results = {desktop_id: {'latency': [], 'async': [], 'sync': [], 'matched_by': set(), 'missed': 0}
+               for desktop_id, *_ in APPS}
+    state = {'known': set(x11.get_window_list())}
+
+    def on_finished(launch, win_id):
+        result = results[launch.desktop_id]
+        if win_id is None:
+            result['missed'] += 1
+            return
+        result['latency'].append((time.perf_counter() - launch.started_at) * 1000)
+        info = x11.get_window_info(win_id)
+        if launch.startup_id and info['startup_id'] == launch.startup_id:
+            result['matched_by'].add('_NET_STARTUP_ID')
+        elif launch.pid and info['pid'] == launch.pid:
+            result['matched_by'].add('_NET_WM_PID')
+        else:
+            result['matched_by'].add('WM_CLASS')
+
+    launcher = AppLauncher(Gdk.Display.get_default(), on_finished, 5000)
+
+    def on_client_list():
+        # DockManager.update_window_list と同じく、新しいウィンドウだけを照合する
+        window_ids = x11.get_window_list()
+        added = [win_id for win_id in window_ids if win_id not in state['known']]
+        state['known'] = set(window_ids)
+        x11.track_windows(window_ids)
+        for win_id in added:
+            info = x11.get_window_info(win_id)
+            if info:
+                launcher.match_window(win_id, info)
+
+    x11.connect('client-list', on_client_list)
+    x11.start_monitoring()
+
+    def wait(condition, timeout):
+        deadline = time.monotonic() + timeout
+        while not condition() and time.monotonic() < deadline:
+            Gtk.main_iteration_do(False)
+            time.sleep(0.001)
+
+    for desktop_id, *_ in APPS:
+        result = results[desktop_id]
+        for _ in range(repeat):
+            start = time.perf_counter()
+            launch = launcher.launch(desktop_id, Gtk.get_current_event_time())
+            result['async'].append((time.perf_counter() - start) * 1000)
+            wait(lambda: launch not in launcher.pending, 10)
+
+            # 比較用: 従来の同期的な起動 (ウィンドウは待たない)
+            app_info = launcher.app_info(desktop_id)
+            start = time.perf_counter()
+            app_info.launch([], Gdk.Display.get_default().get_app_launch_context())
+            result['sync'].append((time.perf_counter() - start) * 1000)
+            # 前のウィンドウが閉じるまで待つ (次の照合に混ざらないように)
+            wait(lambda: False, 3.0)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as data_home:
+        write_desktop_files(data_home)
+        # GLib は最初に使うときにデータディレクトリを決めるので、読み込む前に差し替える
+        os.environ["XDG_DATA_HOME"] = data_home
+        with xvfb():
+            wm = subprocess.Popen([sys.executable, os.path.join(BENCH_DIR, "fake_wm.py")])
+            try:
+                results = run(args.repeat)
+            finally:
+                wm.kill()
+
+    print(f"{'app':<20} {'delay(ms)':>9} {'async launch(ms)':>17} {'sync launch(ms)':>16} "
+          f"{'click->window(ms)':>18}  matched by")
+    missed = 0
+    for desktop_id, mode, delay, notify in APPS:
+        result = results[desktop_id]
+        latency = f"{statistics.median(result['latency']):.1f}" if result['latency'] else "-"
+        note = f"  ({result['missed']} missed)" if result['missed'] else ""
+        missed += result['missed']
+        print(f"{desktop_id:<20} {delay:>9} {statistics.median(result['async']):>17.2f} "
+              f"{statistics.median(result['sync']):>16.2f} {latency:>18}  "
+              f"{', '.join(sorted(result['matched_by'])) or '-'}{note}")
+    return 1 if missed else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
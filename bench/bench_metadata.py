@@ -0,0 +1,48 @@
+"""ウィンドウ情報の取得: 1件ずつの往復 vs get_window_metadata のまとめ取得
+
+使い方: python3 bench/bench_metadata.py [--counts 10 100 500] [--repeat 5] [--backend xcb]
+(Xvfb と python-xlib が必要)
+"""
+import argparse
+
+from xvfb import xvfb, create_windows, measure
+
+
+def fetch_sequential(helper, win_ids):
+    """従来の方法: ウィンドウごと・プロパティごとに同期的に問い合わせる"""
+    result = {}
+    for win_id in win_ids:
+        info = {'wm_class': helper.get_window_class(win_id)}
+        for key, atom in helper.metadata_props[1:]:
+            info[key] = helper._get_full_property(win_id, atom)
+        result[win_id] = info
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--counts', type=int, nargs='+', default=[10, 100, 500])
+    parser.add_argument('--repeat', type=int, default=5)
+    parser.add_argument('--backend', choices=('xlib', 'xcb'), default='xlib')
+    args = parser.parse_args()
+
+    with xvfb():
+        from Xlib import display
+        from x11_helper import X11Helper
+
+        creator = display.Display()
+        helper = X11Helper(backend=args.backend)
+
+        print(f"{'windows':>8} {'sequential(ms)':>15} {'batched(ms)':>12} {'speedup':>8}")
+        for count in args.counts:
+            ids = create_windows(creator, count)
+            seq, _ = measure(lambda: fetch_sequential(helper, ids), args.repeat)
+            batch, _ = measure(lambda: helper.get_window_metadata(ids), args.repeat)
+            print(f"{count:>8} {seq:>15.2f} {batch:>12.2f} {seq / batch:>7.1f}x")
+            for win_id in ids:
+                creator.create_resource_object('window', win_id).destroy()
+            creator.sync()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,86 @@
+"""ホバー時のプレビューの取得: GetImage vs XComposite + MIT-SHM (xcffib)
+
+python-xlib のバックエンドは MIT-SHM を持たないのでプレビューを取得しない ("unavailable" と表示)。
+
+ウィンドウの大きさごとに、1回の取得にかかる時間・ソケットを通ったバイト数と、
+縮小 (capture_to_thumbnail) の時間を表示する。
+最後に、マウスを動かし続けたとき (60Hz で query-tooltip) に実際に取得した回数を表示する。
+
+使い方: python3 bench/bench_previews.py [--sizes 1920x1080 3840x2160] [--repeat 10]
+(Xvfb・GTK3・python-xlib・xcffib が必要)
+"""
+import argparse
+import time
+
+from xvfb import xvfb, measure
+
+
+def create_window(disp, width, height):
+    """縞模様を描いたウィンドウを作ってマップする"""
+    from Xlib import X
+
+    screen = disp.screen()
+    win = screen.root.create_window(0, 0, width, height, 0, screen.root_depth, X.InputOutput,
+                                    X.CopyFromParent, background_pixel=screen.white_pixel)
+    win.map()
+    gc = win.create_gc(foreground=0x3366cc)
+    for x in range(0, width, 64):
+        win.fill_rectangle(gc, x, 0, 32, height)
+    disp.sync()
+    return win
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--sizes', nargs='+', default=['1920x1080', '3840x2160'])
+    parser.add_argument('--repeat', type=int, default=10)
+    parser.add_argument('--thumb', type=int, default=240, help='縮小画像の長辺 (px)')
+    args = parser.parse_args()
+
+    with xvfb(screen="3840x2160x24"):
+        from Xlib import display, X
+        from x11_helper import X11Helper
+        from thumbnail_cache import ThumbnailCache, capture_to_thumbnail
+
+        creator = display.Display()
+        helpers = {name: X11Helper(backend=name) for name in ('xlib', 'xcb')}
+
+        print(f"{'size':>10} {'method':<16} {'capture(ms)':>12} {'socket bytes':>13} {'thumbnail(ms)':>14}")
+        for size in args.sizes:
+            width, height = (int(v) for v in size.split('x'))
+            win = create_window(creator, width, height)
+
+            # 従来の方法: 画面上のウィンドウを GetImage でソケット越しに丸ごと読む
+            ms, image = measure(lambda: win.get_image(0, 0, width, height, X.ZPixmap, 0xFFFFFFFF),
+                                args.repeat)
+            print(f"{size:>10} {'get_image':<16} {ms:>12.2f} {len(image.data):>13} {'-':>14}")
+
+            for name, helper in helpers.items():
+                ms, capture = measure(lambda: helper.capture_window(win.id), args.repeat)
+                if capture is None:
+                    print(f"{size:>10} {name + ' composite':<16} {'unavailable':>12}")
+                    continue
+                socket_bytes = 0 if capture.shared else len(capture.data)
+                label = name + (' comp+shm' if capture.shared else ' composite')
+                thumb_ms, _ = measure(lambda: capture_to_thumbnail(helper.capture_window(win.id), args.thumb),
+                                      args.repeat)
+                print(f"{size:>10} {label:<16} {ms:>12.2f} {socket_bytes:>13} {thumb_ms - ms:>14.2f}")
+
+            win.destroy()
+            creator.sync()
+
+        # 60Hz の query-tooltip を1秒間: 取得は PREVIEW_REFRESH_MS ごとに1回に抑えられる
+        win = create_window(creator, 1920, 1080)
+        helper = helpers['xcb']
+        cache = ThumbnailCache(helper.capture_window, 32 << 20, 500)
+        start = time.monotonic()
+        calls = 0
+        while time.monotonic() - start < 1.0:
+            cache.get(win.id, args.thumb)
+            calls += 1
+            time.sleep(1 / 60)
+        print(f"throttle: {calls} lookups in 1s -> {cache.captures} captures, {cache.total_bytes} bytes cached")
+
+
+if __name__ == '__main__':
+    main()
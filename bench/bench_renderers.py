@@ -0,0 +1,169 @@
+"""タスクバーの描き方の比較: ウィンドウごとの Gtk.Button (TaskStrip) vs 1枚の DrawingArea (IconStrip)
+
+ウィンドウ数ごとに、別プロセスで次を計る:
+- 全ボタンの入場アニメーション中の1フレームの処理時間 (before-paint -> after-paint)
+- マウスでタスクバーを端から端までなぞる間 (XTest で 60Hz) の1フレームの処理時間と、
+  1フレームごとに描き直した面積 (draw のクリップ領域の矩形の合計、IconStrip は拡大で変わった列だけ)
+- ボタンを作る前後の RSS の差
+
+使い方: python3 bench/bench_renderers.py [--counts 20 100 300]
+(Xvfb・GTK3・python-xlib (XTest) が必要)
+"""
+import argparse
+import json
+import statistics
+import time
+
+from xvfb import xvfb, rss_kb, run_child
+
+WIDTH = 1920
+ICONS = ("utilities-terminal", "text-editor", "folder", "web-browser", "application-x-executable")
+
+
+def child(renderer, count):
+    """計測対象のプロセス。結果を JSON 1行で標準出力に書く"""
+    import gi
+    gi.require_version('Gtk', '3.0')
+    from gi.repository import Gtk, Gdk, GLib
+    from Xlib import display, X
+    from Xlib.ext import xtest
+
+    import config
+    import animation
+    from dock_window import load_css
+    from icon_strip import IconStrip, StripItem
+    from task_strip import TaskStrip
+
+    height = config.DOCK_HEIGHT
+    icon_size = int(height * 0.7)
+    load_css(Gdk.Screen.get_default())
+    win = Gtk.Window()
+    win.set_decorated(False)
+    win.set_default_size(WIDTH, height)
+    win.move(0, 0)
+    box = Gtk.Box()
+    box.get_style_context().add_class("dock-container")
+    box.get_style_context().add_class("light")
+    win.add(box)
+    clock = animation.AnimationClock(win)
+    if renderer == 'cairo':
+        strip = IconStrip(clock, icon_size, padding=int(height * 0.1), spacing=20,
+                          magnification=config.MAGNIFICATION, height=height)
+        strip.set_colors(config.COLORS["light"])
+        load_size = strip.max_icon_size
+    else:
+        strip = TaskStrip(clock, spacing=12)
+        load_size = icon_size
+    box.pack_start(strip, True, True, 0)
+    win.show_all()
+
+    theme = Gtk.IconTheme.get_default()
+    pixbufs = [theme.load_icon(name, load_size, Gtk.IconLookupFlags.FORCE_SIZE) for name in ICONS]
+    pointer = display.Display()
+
+    result = {"enter_frames": [], "hover_frames": [], "hover_damage_px": []}
+    phase = {"name": None}
+    frame_start = [0.0]
+    frame_damage = [0]
+
+    def on_before_paint(frame_clock):
+        frame_start[0] = time.perf_counter()
+
+    def on_after_paint(frame_clock):
+        if phase["name"]:
+            result[phase["name"] + "_frames"].append((time.perf_counter() - frame_start[0]) * 1000)
+        if phase["name"] == "hover" and frame_damage[0]:
+            result["hover_damage_px"].append(frame_damage[0])
+        frame_damage[0] = 0
+
+    def on_draw(widget, cr):
+        if phase["name"] == "hover":
+            # バウンディングボックスではなく、実際に描き直す矩形ごとの面積を足す
+            frame_damage[0] += sum(int(rect.width * rect.height) for rect in cr.copy_clip_rectangle_list())
+        return False
+
+    def phase_enter():
+        frame_clock = win.get_frame_clock()
+        frame_clock.connect("before-paint", on_before_paint)
+        frame_clock.connect("after-paint", on_after_paint)
+        strip.connect("draw", on_draw)
+        before = rss_kb()
+        for i in range(count):
+            pixbuf = pixbufs[i % len(pixbufs)]
+            if renderer == 'cairo':
+                item = StripItem(pixbuf)
+            else:
+                item = Gtk.Button()
+                item.get_style_context().add_class("app-button")
+                item.add(Gtk.Image.new_from_pixbuf(pixbuf))
+            item.set_tooltip_text(f"window {i}")
+            strip.add(item)
+            item.show_all()
+            strip.animate_entry(item, 800, animation.Easing.ease_out_back)
+        phase["name"] = "enter"
+        result["rss_before_kb"] = before
+        GLib.timeout_add(1000, phase_hover)
+        return False
+
+    def phase_hover():
+        result["rss_kb"] = rss_kb() - result["rss_before_kb"]
+        result["strip_px"] = strip.get_allocated_width() * strip.get_allocated_height()
+        phase["name"] = "hover"
+        steps = 60
+        state = {"step": 0}
+
+        def move():
+            x = int(WIDTH * state["step"] / steps)
+            xtest.fake_input(pointer, X.MotionNotify, x=x, y=height // 2)
+            pointer.sync()
+            state["step"] += 1
+            if state["step"] <= steps:
+                return True
+            GLib.timeout_add(300, finish)
+            return False
+
+        GLib.timeout_add(1000 // 60, move)
+        return False
+
+    def finish():
+        phase["name"] = None
+        print(json.dumps(result), flush=True)
+        Gtk.main_quit()
+        return False
+
+    GLib.timeout_add(300, phase_enter)
+    Gtk.main()
+
+
+def summary(frames):
+    if not frames:
+        return "-", "-"
+    return f"{statistics.median(frames):.2f}", f"{max(frames):.2f}"
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--counts', type=int, nargs='+', default=[20, 100, 300])
+    parser.add_argument('--child', nargs=2, metavar=('RENDERER', 'COUNT'), help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        child(args.child[0], int(args.child[1]))
+        return
+
+    with xvfb():
+        print(f"{'renderer':<8} {'windows':>7} {'enter p50/max(ms)':>18} {'hover p50/max(ms)':>18} "
+              f"{'damage/frame p50/max(%)':>24} {'rss(KB)':>8}")
+        for count in args.counts:
+            for renderer in ('widgets', 'cairo'):
+                result = run_child(__file__, (renderer, count), timeout=120)
+                enter = "/".join(summary(result["enter_frames"]))
+                hover = "/".join(summary(result["hover_frames"]))
+                # 1フレームで描き直した面積を、タスクバー全体の面積に対する割合で
+                strip_px = max(result["strip_px"], 1)
+                damage = "/".join(summary([px * 100 / strip_px for px in result["hover_damage_px"]]))
+                print(f"{renderer:<8} {count:>7} {enter:>18} {hover:>18} {damage:>24} {result['rss_kb']:>8}")
+
+
+if __name__ == '__main__':
+    main()
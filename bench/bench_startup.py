@@ -0,0 +1,100 @@
+"""起動時間の計測: プロセス開始 -> 最初の show_all / アイコン索引の完成
+
+.desktop 索引のディスクキャッシュが無い場合 (毎回空の XDG_CACHE_HOME) と
+ある場合 (事前に1回起動して作成済み) を比較する。最初の表示の時点で読み込まれている
+モジュールの数も出すので、--set で機能を切り替えると使わない機能の読み込みの分が分かる。
+
+使い方: python3 bench/bench_startup.py [--repeat 5] [--set TASKBAR_RENDERER="'gtk'" --set WINDOW_PREVIEWS=False]
+(Xvfb・GTK3・python-xlib が必要)
+"""
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+
+from xvfb import xvfb, parse_overrides, run_child
+
+
+def child(overrides):
+    """計測対象のプロセス。結果を JSON 1行で標準出力に書く"""
+    import gi
+    gi.require_version('Gtk', '3.0')
+    from gi.repository import GLib, Gio
+
+    import config
+    for key, value in overrides.items():
+        setattr(config, key, value)
+    from main import DockApp
+
+    spawned_at = float(os.environ["DOCK_BENCH_SPAWNED_AT"])
+    result = {}
+
+    def elapsed_ms():
+        return (time.monotonic() - spawned_at) * 1000
+
+    def on_show(win):
+        result.setdefault("first_show_ms", elapsed_ms())
+        result.setdefault("modules", len(sys.modules))
+
+    def wait_for_index(app, win):
+        if not win.app_index.ready:
+            return True
+        result["index_ready_ms"] = elapsed_ms()
+        print(json.dumps(result), flush=True)
+        app.quit()
+        return False
+
+    def on_window_added(app, win):
+        # show_all より前 (ウィンドウ構築中) に呼ばれる
+        win.connect("show", on_show)
+        GLib.timeout_add(5, wait_for_index, app, win)
+
+    app = DockApp()
+    app.set_flags(Gio.ApplicationFlags.NON_UNIQUE)
+    app.connect("window-added", on_window_added)
+    app.run([])
+
+
+def run_once(cache_home, sets):
+    env = dict(os.environ, XDG_CACHE_HOME=cache_home, DOCK_BENCH_SPAWNED_AT=str(time.monotonic()))
+    return run_child(__file__, [arg for item in sets for arg in ("--set", item)], env=env, timeout=60)
+
+
+def summarize(label, runs):
+    show = statistics.median(r["first_show_ms"] for r in runs)
+    ready = statistics.median(r["index_ready_ms"] for r in runs)
+    modules = statistics.median(r["modules"] for r in runs)
+    print(f"{label:<10} {show:>16.1f} {ready:>18.1f} {modules:>9.0f}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                        help="config の値を上書きする (例: WINDOW_PREVIEWS=False)")
+    parser.add_argument("--child", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+    if args.child:
+        child(parse_overrides(args.set))
+        return
+
+    with xvfb():
+        cold = []
+        for _ in range(args.repeat):
+            with tempfile.TemporaryDirectory() as cache_home:
+                cold.append(run_once(cache_home, args.set))
+
+        with tempfile.TemporaryDirectory() as cache_home:
+            run_once(cache_home, args.set)  # キャッシュを作るための1回
+            warm = [run_once(cache_home, args.set) for _ in range(args.repeat)]
+
+    print(f"{'':<10} {'first show(ms)':>16} {'index ready(ms)':>18} {'modules':>9}")
+    summarize("no cache", cold)
+    summarize("cache", warm)
+
+
+if __name__ == "__main__":
+    main()
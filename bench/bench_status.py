@@ -0,0 +1,273 @@
+"""ステータス領域のプロバイダーの確認と計測 (専用のセッションバスと偽のサービスで動かす)
+
+Gio.TestDBus で専用の dbus-daemon を立て、NetworkManager・UPower・PulseAudio の
+D-Bus インターフェースを真似たオブジェクトを公開する。プロパティやシグナルを順に変えて、
+各プロバイダーのアイコンが期待どおりに変わるかと、変化から反映までの時間を表示する。
+最後に何も起きない状態で待ち、更新もタイマーも走らない (起きない) ことを確かめる。
+期待どおりでなければ終了コード 1。
+
+使い方: python3 bench/bench_status.py [--idle 2]
+(dbus-daemon・PyGObject が必要。X サーバーは不要)
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+from xvfb import REPO_DIR  # noqa: F401  (リポジトリ直下を import できるようにする)
+
+from gi.repository import Gio, GLib
+
+from status_providers import NetworkProvider, BatteryProvider, VolumeProvider
+
+INTROSPECTION = """
+<node>
+  <interface name='org.freedesktop.NetworkManager'>
+    <property name='State' type='u' access='read'/>
+    <property name='PrimaryConnection' type='o' access='read'/>
+    <property name='PrimaryConnectionType' type='s' access='read'/>
+  </interface>
+  <interface name='org.freedesktop.NetworkManager.Connection.Active'>
+    <property name='Type' type='s' access='read'/>
+    <property name='SpecificObject' type='o' access='read'/>
+  </interface>
+  <interface name='org.freedesktop.NetworkManager.AccessPoint'>
+    <property name='Strength' type='y' access='read'/>
+    <property name='Ssid' type='ay' access='read'/>
+  </interface>
+  <interface name='org.freedesktop.UPower.Device'>
+    <property name='IsPresent' type='b' access='read'/>
+    <property name='IconName' type='s' access='read'/>
+    <property name='Percentage' type='d' access='read'/>
+    <property name='State' type='u' access='read'/>
+  </interface>
+  <interface name='org.PulseAudio.ServerLookup1'>
+    <property name='Address' type='s' access='read'/>
+  </interface>
+  <interface name='org.PulseAudio.Core1'>
+    <method name='ListenForSignal'>
+      <arg name='signal' type='s' direction='in'/>
+      <arg name='objects' type='ao' direction='in'/>
+    </method>
+    <property name='FallbackSink' type='o' access='read'/>
+    <signal name='FallbackSinkUpdated'><arg type='o'/></signal>
+    <signal name='FallbackSinkUnset'/>
+  </interface>
+  <interface name='org.PulseAudio.Core1.Device'>
+    <property name='Volume' type='au' access='read'/>
+    <property name='Mute' type='b' access='read'/>
+    <signal name='VolumeUpdated'><arg type='au'/></signal>
+    <signal name='MuteUpdated'><arg type='b'/></signal>
+  </interface>
+</node>
+"""
+NODE = Gio.DBusNodeInfo.new_for_xml(INTROSPECTION)
+
+NM_PATH = '/org/freedesktop/NetworkManager'
+WIFI_CONNECTION = NM_PATH + '/ActiveConnection/1'
+WIRED_CONNECTION = NM_PATH + '/ActiveConnection/2'
+ACCESS_POINT = NM_PATH + '/AccessPoint/1'
+SINK = '/org/pulseaudio/core1/sink0'
+
+
+class MockObject:
+    """D-Bus に公開する偽のオブジェクト (プロパティの値を持ち、変更を通知する)"""
+
+    def __init__(self, connection, path, interface, **props):
+        self.connection = connection
+        self.path = path
+        self.interface = interface
+        self.props = props
+        self.calls = []
+        connection.register_object_with_closures(
+            path, NODE.lookup_interface(interface), self._on_call, self._on_get, None)
+
+    def _on_get(self, connection, sender, path, interface, prop):
+        return self.props[prop]
+
+    def _on_call(self, connection, sender, path, interface, method, params, invocation):
+        self.calls.append((method, params.unpack()))
+        invocation.return_value(None)
+
+    def set(self, **props):
+        """プロパティを変えて PropertiesChanged を送る"""
+        self.props.update(props)
+        self.connection.emit_signal(None, self.path, 'org.freedesktop.DBus.Properties', 'PropertiesChanged',
+                                    GLib.Variant('(sa{sv}as)', (self.interface, props, [])))
+
+    def emit(self, signal, params=None):
+        self.connection.emit_signal(None, self.path, self.interface, signal, params)
+
+
+class MockPulseServer:
+    """PulseAudio の D-Bus プロトコル (バスを通らない1対1の接続) を真似るサーバー"""
+
+    def __init__(self, directory):
+        self.server = Gio.DBusServer.new_sync(
+            f"unix:path={os.path.join(directory, 'pulse-dbus')}", Gio.DBusServerFlags.NONE,
+            Gio.dbus_generate_guid(), None, None)
+        self.server.connect('new-connection', self._on_new_connection)
+        self.server.start()
+        self.sinks = []
+
+    def address(self):
+        return self.server.get_client_address()
+
+    def _on_new_connection(self, server, connection):
+        MockObject(connection, '/org/pulseaudio/core1', 'org.PulseAudio.Core1',
+                   FallbackSink=GLib.Variant('o', SINK))
+        self.sinks.append(MockObject(connection, SINK, 'org.PulseAudio.Core1.Device',
+                                     Volume=GLib.Variant('au', [0x8000, 0x8000]),
+                                     Mute=GLib.Variant('b', False)))
+        return True
+
+    def emit(self, signal, params):
+        for sink in self.sinks:
+            sink.emit(signal, params)
+
+
+def connect(address):
+    flags = Gio.DBusConnectionFlags.AUTHENTICATION_CLIENT | Gio.DBusConnectionFlags.MESSAGE_BUS_CONNECTION
+    return Gio.DBusConnection.new_for_address_sync(address, flags, None, None)
+
+
+def call_bus(connection, method, params):
+    connection.call_sync('org.freedesktop.DBus', '/org/freedesktop/DBus', 'org.freedesktop.DBus',
+                         method, params, None, Gio.DBusCallFlags.NONE, -1, None)
+
+
+def wait_for(condition, timeout=2.0):
+    """メインループを回しながら condition() が真になるのを待つ"""
+    context = GLib.MainContext.default()
+    deadline = time.monotonic() + timeout
+    # 何も来ないときに iteration() から抜けるための見張り
+    guard = GLib.timeout_add(20, lambda: True)
+    try:
+        while not condition():
+            if time.monotonic() > deadline:
+                return False
+            context.iteration(True)
+        return True
+    finally:
+        GLib.source_remove(guard)
+
+
+def context_switches():
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("voluntary_ctxt_switches:"):
+                return int(line.split()[1])
+    return 0
+
+
+def run(idle_seconds):
+    with tempfile.TemporaryDirectory() as directory:
+        test_bus = Gio.TestDBus.new(Gio.TestDBusFlags.NONE)
+        test_bus.up()
+        try:
+            return scenario(test_bus.get_bus_address(), directory, idle_seconds)
+        finally:
+            test_bus.down()
+
+
+def scenario(address, directory, idle_seconds):
+    service = connect(address)
+    for name in ('org.freedesktop.NetworkManager', 'org.freedesktop.UPower', 'org.PulseAudio1'):
+        call_bus(service, 'RequestName', GLib.Variant('(su)', (name, 0)))
+
+    nm = MockObject(service, NM_PATH, 'org.freedesktop.NetworkManager',
+                    State=GLib.Variant('u', 70),
+                    PrimaryConnection=GLib.Variant('o', WIFI_CONNECTION),
+                    PrimaryConnectionType=GLib.Variant('s', '802-11-wireless'))
+    MockObject(service, WIFI_CONNECTION, 'org.freedesktop.NetworkManager.Connection.Active',
+               Type=GLib.Variant('s', '802-11-wireless'), SpecificObject=GLib.Variant('o', ACCESS_POINT))
+    MockObject(service, WIRED_CONNECTION, 'org.freedesktop.NetworkManager.Connection.Active',
+               Type=GLib.Variant('s', '802-3-ethernet'), SpecificObject=GLib.Variant('o', '/'))
+    access_point = MockObject(service, ACCESS_POINT, 'org.freedesktop.NetworkManager.AccessPoint',
+                              Strength=GLib.Variant('y', 90), Ssid=GLib.Variant('ay', b'home'))
+    battery = MockObject(service, '/org/freedesktop/UPower/devices/DisplayDevice', 'org.freedesktop.UPower.Device',
+                         IsPresent=GLib.Variant('b', True), IconName=GLib.Variant('s', 'battery-good-symbolic'),
+                         Percentage=GLib.Variant('d', 80.0), State=GLib.Variant('u', 2))
+    pulse = MockPulseServer(directory)
+    MockObject(service, '/org/pulseaudio/server_lookup1', 'org.PulseAudio.ServerLookup1',
+               Address=GLib.Variant('s', pulse.address()))
+
+    # ドックと同じく、別の接続からプロバイダーを動かす
+    client = connect(address)
+    updates = []
+
+    def on_changed(provider):
+        updates.append((provider.name, provider.icon_name, time.perf_counter()))
+
+    providers = {cls.name: cls(on_changed, bus=client) for cls in (NetworkProvider, BatteryProvider, VolumeProvider)}
+    for provider in providers.values():
+        provider.start()
+
+    steps = [
+        ("initial state", None, 'network', 'network-wireless-signal-excellent-symbolic'),
+        ("initial state", None, 'battery', 'battery-good-symbolic'),
+        ("initial state", None, 'volume', 'audio-volume-medium-symbolic'),
+        ("AP strength 90 -> 40", lambda: access_point.set(Strength=GLib.Variant('y', 40)),
+         'network', 'network-wireless-signal-ok-symbolic'),
+        ("NM disconnected", lambda: nm.set(State=GLib.Variant('u', 20)),
+         'network', 'network-offline-symbolic'),
+        ("NM switched to wired", lambda: nm.set(State=GLib.Variant('u', 70),
+                                                PrimaryConnection=GLib.Variant('o', WIRED_CONNECTION),
+                                                PrimaryConnectionType=GLib.Variant('s', '802-3-ethernet')),
+         'network', 'network-wired-symbolic'),
+        ("battery 5%", lambda: battery.set(IconName=GLib.Variant('s', 'battery-caution-symbolic'),
+                                           Percentage=GLib.Variant('d', 5.0)),
+         'battery', 'battery-caution-symbolic'),
+        ("battery removed", lambda: battery.set(IsPresent=GLib.Variant('b', False)), 'battery', None),
+        ("sink muted", lambda: pulse.emit('MuteUpdated', GLib.Variant('(b)', (True,))),
+         'volume', 'audio-volume-muted-symbolic'),
+        ("sink unmuted at 100%", lambda: (pulse.emit('MuteUpdated', GLib.Variant('(b)', (False,))),
+                                          pulse.emit('VolumeUpdated', GLib.Variant('(au)', ([0x10000, 0x10000],)))),
+         'volume', 'audio-volume-high-symbolic'),
+        ("NetworkManager exited", lambda: call_bus(service, 'ReleaseName',
+                                                   GLib.Variant('(s)', ('org.freedesktop.NetworkManager',))),
+         'network', None),
+    ]
+
+    failures = 0
+    print(f"{'step':<24} {'provider':<9} {'latency(ms)':>12}  result")
+    for label, action, name, expected in steps:
+        provider = providers[name]
+        start = time.perf_counter()
+        mark = len(updates)
+        if action is not None:
+            action()
+        ok = wait_for(lambda: provider.icon_name == expected and (action is None or len(updates) > mark))
+        latency = next((at for n, _, at in updates[mark:] if n == name), None)
+        latency_text = f"{(latency - start) * 1000:.2f}" if action is not None and latency else "-"
+        result = "ok" if ok else f"FAILED (got {provider.icon_name}, expected {expected})"
+        failures += not ok
+        print(f"{label:<24} {name:<9} {latency_text:>12}  {result}")
+
+    # 何も変わらないあいだは更新も起床も無いこと (ポーリングしていないこと)
+    mark = len(updates)
+    switches = context_switches()
+    loop = GLib.MainLoop()
+    GLib.timeout_add(int(idle_seconds * 1000), loop.quit)
+    loop.run()
+    idle_updates = len(updates) - mark
+    print(f"idle {idle_seconds:.1f}s: {idle_updates} updates, {context_switches() - switches} voluntary context switches")
+    failures += idle_updates
+
+    for provider in providers.values():
+        provider.stop()
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--idle', type=float, default=2.0, help='何も起きない状態で待つ秒数')
+    args = parser.parse_args()
+    failures = run(args.idle)
+    print("status providers: " + ("ok" if not failures else f"{failures} FAILED"))
+    return 1 if failures else 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,91 @@
+"""テーマ切り替えの時間: CSSを毎回読み直す方式 vs クラスの付け替えだけの方式
+
+100個のアプリボタンを表示した状態で、ライト/ダークを交互に切り替え、
+切り替えてから次のフレームの描画が終わるまでの時間を計る。
+
+使い方: python3 bench/bench_theme_switch.py [--buttons 100] [--switches 20]
+(Xvfb・GTK3 が必要)
+"""
+import argparse
+import statistics
+import time
+
+from xvfb import xvfb
+
+
+def run(button_count, switches, reload_css):
+    import gi
+    gi.require_version('Gtk', '3.0')
+    from gi.repository import Gtk, Gdk, GLib
+
+    import config
+    import dock_window
+
+    screen = Gdk.Screen.get_default()
+    provider = dock_window.load_css(screen)
+
+    win = Gtk.Window()
+    win.set_default_size(1920, config.DOCK_HEIGHT)
+    main_box = Gtk.Box()
+    main_box.get_style_context().add_class("dock-container")
+    main_box.get_style_context().add_class("light")
+    for _ in range(button_count):
+        btn = Gtk.Button()
+        btn.get_style_context().add_class("app-button")
+        btn.add(Gtk.Image.new_from_icon_name("application-x-executable", Gtk.IconSize.DND))
+        main_box.pack_start(btn, False, False, 0)
+    win.add(main_box)
+    win.show_all()
+
+    samples = []
+    state = {"start": None, "dark": False}
+
+    def switch():
+        style = main_box.get_style_context()
+        state["dark"] = not state["dark"]
+        state["start"] = time.perf_counter()
+        if reload_css:
+            # 従来の方式: スタイルシートを作り直して読み込み直す
+            provider.load_from_data(dock_window.build_css(config.DOCK_HEIGHT).encode('utf-8'))
+        style.remove_class("light" if state["dark"] else "dark")
+        style.add_class("dark" if state["dark"] else "light")
+        return False
+
+    def on_after_paint(frame_clock):
+        if state["start"] is None:
+            return
+        samples.append((time.perf_counter() - state["start"]) * 1000)
+        state["start"] = None
+        if len(samples) >= switches:
+            Gtk.main_quit()
+        else:
+            GLib.timeout_add(50, switch)
+
+    def begin():
+        win.get_frame_clock().connect("after-paint", on_after_paint)
+        switch()
+        return False
+
+    GLib.timeout_add(300, begin)
+    Gtk.main()
+    win.destroy()
+    return samples
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--buttons', type=int, default=100)
+    parser.add_argument('--switches', type=int, default=20)
+    args = parser.parse_args()
+
+    with xvfb():
+        before = run(args.buttons, args.switches, reload_css=True)
+        after = run(args.buttons, args.switches, reload_css=False)
+
+    print(f"{'':<16} {'median(ms)':>11} {'max(ms)':>9}")
+    print(f"{'reload CSS':<16} {statistics.median(before):>11.2f} {max(before):>9.2f}")
+    print(f"{'toggle class':<16} {statistics.median(after):>11.2f} {max(after):>9.2f}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,92 @@
+"""入退場アニメーションのフレーム時間: 50個のボタンを同時に動かす
+
+1フレームあたりの処理時間 (before-paint -> after-paint) と、
+アニメーション中に TaskStrip の size-allocate が何回走ったかを表示する。
+
+使い方: python3 bench/bench_transitions.py [--buttons 50]
+(Xvfb・GTK3 が必要)
+"""
+import argparse
+import statistics
+import time
+
+from xvfb import xvfb
+
+FRAME_BUDGET_MS = 1000 / 60
+
+
+def run(button_count):
+    import gi
+    gi.require_version('Gtk', '3.0')
+    from gi.repository import Gtk, GLib
+
+    import animation
+    from task_strip import TaskStrip
+
+    win = Gtk.Window()
+    win.set_default_size(1920, 60)
+    clock = animation.AnimationClock(win)
+    strip = TaskStrip(clock, spacing=12, duration_ms=250)
+    win.add(strip)
+    win.show_all()
+
+    frame_times = []
+    allocations = [0]
+    frame_start = [0.0]
+    strip.connect("size-allocate", lambda w, a: allocations.__setitem__(0, allocations[0] + 1))
+
+    def on_before_paint(frame_clock):
+        frame_start[0] = time.perf_counter()
+
+    def on_after_paint(frame_clock):
+        if clock.live_count:
+            frame_times.append((time.perf_counter() - frame_start[0]) * 1000)
+
+    buttons = []
+
+    def phase_enter():
+        frame_clock = win.get_frame_clock()
+        frame_clock.connect("before-paint", on_before_paint)
+        frame_clock.connect("after-paint", on_after_paint)
+        for _ in range(button_count):
+            btn = Gtk.Button()
+            btn.add(Gtk.Image.new_from_icon_name("application-x-executable", Gtk.IconSize.DND))
+            strip.add(btn)
+            btn.show_all()
+            strip.animate_entry(btn, 800, animation.Easing.ease_out_back)
+            buttons.append(btn)
+        GLib.timeout_add(1000, phase_exit)
+        return False
+
+    def phase_exit():
+        # 1つおきに消して、残りが詰めるアニメーションも同時に走らせる
+        for btn in buttons[::2]:
+            strip.remove_animated(btn)
+        GLib.timeout_add(1000, Gtk.main_quit)
+        return False
+
+    GLib.timeout_add(200, phase_enter)
+    Gtk.main()
+    return frame_times, allocations[0]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--buttons', type=int, default=50)
+    args = parser.parse_args()
+
+    with xvfb():
+        frame_times, allocations = run(args.buttons)
+
+    frame_times.sort()
+    p95 = frame_times[int(len(frame_times) * 0.95) - 1] if frame_times else 0
+    print(f"buttons:          {args.buttons}")
+    print(f"animated frames:  {len(frame_times)}")
+    print(f"frame time mean:  {statistics.mean(frame_times):.2f} ms")
+    print(f"frame time p95:   {p95:.2f} ms")
+    print(f"frame time max:   {max(frame_times):.2f} ms (budget {FRAME_BUDGET_MS:.1f} ms)")
+    print(f"strip size-allocate calls: {allocations}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,52 @@
+"""ベンチマーク用: 起動に時間のかかるアプリの代わり
+
+--delay ミリ秒待ってからウィンドウを1つマップし、--linger 秒後に終了する。
+--mode でドックがウィンドウを見分ける手がかりを変える:
+  startup-id  起動通知のID (DESKTOP_STARTUP_ID) を _NET_STARTUP_ID に書く (GTK などのアプリと同じ)
+  pid         _NET_WM_PID だけを書く
+  fork        別のプロセスにウィンドウを作らせる (ID も PID も合わず、WM_CLASS だけが手がかり)
+
+使い方 (.desktop の Exec から): python3 bench/fake_app.py --class NAME --delay 300 --mode pid
+"""
+import argparse
+import os
+import subprocess
+import sys
+import time
+
+from Xlib import display
+
+
+def open_window(wm_class, startup_id, linger):
+    disp = display.Display()
+    win = disp.screen().root.create_window(0, 0, 200, 100, 0, disp.screen().root_depth)
+    win.set_wm_class(wm_class, wm_class.capitalize())
+    utf8 = disp.intern_atom('UTF8_STRING')
+    win.change_property(disp.intern_atom('_NET_WM_PID'), disp.intern_atom('CARDINAL'), 32, [os.getpid()])
+    if startup_id:
+        win.change_property(disp.intern_atom('_NET_STARTUP_ID'), utf8, 8, startup_id.encode('utf-8'))
+    win.map()
+    disp.sync()
+    time.sleep(linger)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument('--class', dest='wm_class', required=True)
+    parser.add_argument('--delay', type=int, default=0, help='ウィンドウを出すまでの時間 (ミリ秒)')
+    parser.add_argument('--mode', choices=('startup-id', 'pid', 'fork'), default='startup-id')
+    parser.add_argument('--linger', type=float, default=2.0)
+    args = parser.parse_args()
+
+    # 起動通知のIDは環境変数で渡される (子プロセスには引き継がない)
+    startup_id = os.environ.pop('DESKTOP_STARTUP_ID', None)
+    time.sleep(args.delay / 1000)
+    if args.mode == 'fork':
+        subprocess.Popen([sys.executable, os.path.abspath(__file__), '--class', args.wm_class,
+                          '--mode', 'pid', '--linger', str(args.linger)])
+        return
+    open_window(args.wm_class, startup_id if args.mode == 'startup-id' else None, args.linger)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,62 @@
+"""ベンチマーク用の最小限の EWMH ウィンドウマネージャー (の代わり)
+
+実際の配置や装飾は一切せず、ルートウィンドウの
+_NET_CLIENT_LIST と _NET_ACTIVE_WINDOW だけを管理する。
+- マップされたトップレベルウィンドウをクライアントリストに追加 (ドックは除く)
+- 新しくマップされたウィンドウをアクティブにする
+- _NET_ACTIVE_WINDOW の ClientMessage でアクティブを切り替える
+
+使い方: DISPLAY=:N python3 bench/fake_wm.py
+"""
+from Xlib import display, X, Xatom
+
+
+def main():
+    disp = display.Display()
+    root = disp.screen().root
+    atom_client_list = disp.intern_atom('_NET_CLIENT_LIST')
+    atom_active = disp.intern_atom('_NET_ACTIVE_WINDOW')
+    atom_type = disp.intern_atom('_NET_WM_WINDOW_TYPE')
+    atom_type_dock = disp.intern_atom('_NET_WM_WINDOW_TYPE_DOCK')
+
+    clients = []
+
+    def publish(active):
+        root.change_property(atom_client_list, Xatom.WINDOW, 32, clients)
+        root.change_property(atom_active, Xatom.WINDOW, 32, [active])
+        disp.flush()
+
+    def is_dock(win):
+        try:
+            prop = win.get_full_property(atom_type, Xatom.ATOM)
+        except Exception:
+            return False
+        return bool(prop) and atom_type_dock in prop.value
+
+    root.change_attributes(event_mask=X.SubstructureNotifyMask)
+    publish(0)
+    active = 0
+
+    while True:
+        event = disp.next_event()
+        if event.type == X.MapNotify:
+            if event.override or event.window.id in clients or is_dock(event.window):
+                continue
+            clients.append(event.window.id)
+            active = event.window.id
+            publish(active)
+        elif event.type in (X.UnmapNotify, X.DestroyNotify):
+            if event.window.id not in clients:
+                continue
+            clients.remove(event.window.id)
+            if active == event.window.id:
+                active = clients[-1] if clients else 0
+            publish(active)
+        elif event.type == X.ClientMessage and event.client_type == atom_active:
+            if event.window.id in clients:
+                active = event.window.id
+                publish(active)
+
+
+if __name__ == '__main__':
+    main()
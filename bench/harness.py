@@ -0,0 +1,227 @@
+"""ドック全体のベンチマーク・回帰チェック
+
+Xvfb 上で fake_wm.py (最小限の EWMH WM) と ModernDock を動かし、
+spawner.py で WM_CLASS の違うダミーウィンドウを N 個開いて閉じる。
+ウィンドウごとに「マップ/破棄 -> ドックの描画完了」までの時間を計り、
+あわせて X11 の往復回数・CPU時間・RSS を記録して JSON に書き出す。
+ベースラインの JSON と比較し、悪化していれば終了コード 1 を返す。
+ベースラインはマシンごとに違うのでリポジトリには入れていない。最初に --save-baseline で作る
+(無いまま実行すると、計測せずに案内を出して終了コード 2)。
+
+使い方:
+  python3 bench/harness.py --save-baseline              # 最初に1回: bench/baseline.json を作る
+  python3 bench/harness.py --counts 10 50 100 --output result.json
+  python3 bench/harness.py --set X11_EVENT_THREAD=True  # config の値を変えて計測
+  python3 bench/harness.py --set "X11_BACKEND='xcb'"    # xcffib のバックエンドで計測
+(Xvfb・GTK3・python-xlib が必要)
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+
+from xvfb import xvfb, rss_kb, percentile, parse_overrides, REPO_DIR
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+DEFAULT_BASELINE = os.path.join(BENCH_DIR, "baseline.json")
+# 1回の開閉でこれ以上かかったら打ち切る (秒)
+PHASE_TIMEOUT = 30
+# ベースラインと比べる指標 (どれも小さいほど良い)
+METRICS = ("open_p50_ms", "open_p95_ms", "close_p50_ms", "close_p95_ms", "round_trips", "cpu_ms", "rss_kb")
+
+
+class Harness:
+    """GLib のメインループ上で開閉のシナリオを順に進める"""
+
+    def __init__(self, app, spawner, counts):
+        self.app = app
+        self.spawner = spawner
+        self.phases = [(command, count) for count in counts for command in ("open", "close")]
+        self.results = {}
+        self.dock = None
+        self.phase = None
+
+    # --- 準備 ---
+
+    def on_window_added(self, app, dock):
+        self.dock = dock
+        from gi.repository import GLib
+        GLib.timeout_add(50, self._wait_until_ready)
+
+    @property
+    def round_trips(self):
+        """X11Helper が数えている返答待ちの回数 (バックエンドに関係なく数えられる)"""
+        import instrument
+        return instrument.snapshot()["counters"].get("x11.round_trips", 0)
+
+    def _wait_until_ready(self):
+        # X11 への接続は起動の段階処理 (startup_stages) の中で行われる
+        if not (self.dock.get_mapped() and self.dock.app_index.ready) or self.dock.startup_stages:
+            return True
+        self.dock.get_frame_clock().connect("after-paint", self._on_after_paint)
+        from gi.repository import GLib
+        GLib.io_add_watch(self.spawner.stdout, GLib.IO_IN, self._on_spawner_reply)
+        self._start_next_phase()
+        return False
+
+    # --- シナリオ ---
+
+    def _start_next_phase(self):
+        from gi.repository import GLib
+        if not self.phases:
+            self.app.quit()
+            return
+        command, count = self.phases.pop(0)
+        self.phase = {
+            "command": command, "count": count, "pending": None, "event_time": None,
+            "latencies": [], "cpu": time.process_time(), "round_trips": self.round_trips,
+        }
+        self.phase["timeout_id"] = GLib.timeout_add_seconds(PHASE_TIMEOUT, self._on_timeout)
+        self.spawner.stdin.write(f"{command} {count}\n" if command == "open" else "close\n")
+        self.spawner.stdin.flush()
+
+    def _on_spawner_reply(self, source, condition):
+        reply = json.loads(self.spawner.stdout.readline())
+        self.phase["pending"] = set(reply["ids"])
+        self.phase["event_time"] = reply["time"]
+        # すでに描画済みの場合もあるので一度確認する
+        self._check_pending()
+        return True
+
+    def _on_after_paint(self, frame_clock):
+        if self.phase and self.phase["pending"]:
+            self._check_pending()
+
+    def _check_pending(self):
+        phase = self.phase
+        buttons = self.dock.tasks
+        opening = phase["command"] == "open"
+        done = {win_id for win_id in phase["pending"] if (win_id in buttons) == opening}
+        if done:
+            latency = (time.monotonic() - phase["event_time"]) * 1000
+            phase["latencies"].extend([latency] * len(done))
+            phase["pending"] -= done
+        if not phase["pending"]:
+            self._finish_phase()
+
+    def _on_timeout(self):
+        print(f"timeout: {len(self.phase['pending'] or ())} windows never reached the dock", file=sys.stderr)
+        self.phase["timeout_id"] = None
+        self._finish_phase()
+        return False
+
+    def _finish_phase(self):
+        from gi.repository import GLib
+        phase, self.phase = self.phase, None
+        if phase["timeout_id"] is not None:
+            GLib.source_remove(phase["timeout_id"])
+
+        result = self.results.setdefault(str(phase["count"]), {"round_trips": 0, "cpu_ms": 0.0})
+        prefix = phase["command"]
+        result[f"{prefix}_p50_ms"] = percentile(phase["latencies"], 50)
+        result[f"{prefix}_p95_ms"] = percentile(phase["latencies"], 95)
+        result[f"{prefix}_max_ms"] = max(phase["latencies"], default=None)
+        result[f"{prefix}_missed"] = len(phase["pending"] or ())
+        result["round_trips"] += self.round_trips - phase["round_trips"]
+        result["cpu_ms"] += (time.process_time() - phase["cpu"]) * 1000
+        result["rss_kb"] = rss_kb()
+        # 退場アニメーションが終わるのを待ってから次へ
+        GLib.timeout_add(500, lambda: self._start_next_phase() or False)
+
+
+def run_dock(counts, overrides):
+    """Xvfb の中で WM・ドック・ウィンドウ生成役を起動してシナリオを実行する"""
+    import gi
+    gi.require_version('Gtk', '3.0')
+    from gi.repository import Gio
+
+    import config
+    import instrument
+    for key, value in overrides.items():
+        setattr(config, key, value)
+    # 往復回数などのカウンタだけ使う (定期出力やソケットは不要)
+    instrument.enabled = True
+    from main import DockApp
+
+    wm = subprocess.Popen([sys.executable, os.path.join(BENCH_DIR, "fake_wm.py")])
+    spawner = subprocess.Popen(
+        [sys.executable, os.path.join(BENCH_DIR, "spawner.py")],
+        stdin=subprocess.PIPE, stdout=subprocess.PIPE, text=True
+    )
+    try:
+        app = DockApp()
+        app.set_flags(Gio.ApplicationFlags.NON_UNIQUE)
+        harness = Harness(app, spawner, counts)
+        app.connect("window-added", harness.on_window_added)
+        app.run([])
+        return harness.results
+    finally:
+        spawner.kill()
+        wm.kill()
+
+
+def compare(results, baseline, tolerance):
+    """ベースラインより tolerance (割合) を超えて悪化した指標を返す"""
+    regressions = []
+    for count, metrics in results.items():
+        base = baseline.get("results", {}).get(count, {})
+        for name in METRICS:
+            current, before = metrics.get(name), base.get(name)
+            if current is None or not before:
+                continue
+            status = "REGRESSED" if current > before * (1 + tolerance) else "ok"
+            if status != "ok":
+                regressions.append((count, name))
+            print(f"{count:>6} {name:<14} {before:>12.1f} {current:>12.1f} {current / before:>7.2f}x {status}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--counts", type=int, nargs="+", default=[10, 50, 100])
+    parser.add_argument("--output", help="結果の JSON を書き出すファイル")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save-baseline", action="store_true", help="結果をベースラインとして保存する")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="許容する悪化の割合 (0.25 = 25%%)")
+    parser.add_argument("--set", action="append", default=[], metavar="KEY=VALUE",
+                        help="config の値を上書きする (例: GROUP_WINDOWS=True)")
+    args = parser.parse_args()
+
+    if not args.save_baseline and not os.path.exists(args.baseline):
+        # 比べる相手が無いのに成功扱いにすると回帰チェックが黙って素通りになるので、
+        # 計測を始める前に最初の手順を案内して止める
+        print(f"no baseline at {args.baseline}.\n"
+              f"Record one on this machine first:  python3 bench/harness.py --save-baseline"
+              + (f" --baseline {args.baseline}" if args.baseline != DEFAULT_BASELINE else ""),
+              file=sys.stderr)
+        return 2
+
+    overrides = parse_overrides(args.set)
+    with xvfb():
+        os.chdir(REPO_DIR)
+        results = run_dock(args.counts, overrides)
+
+    report = {"counts": args.counts, "config": overrides, "results": results}
+    text = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, "w") as f:
+            f.write(text + "\n")
+    else:
+        print(text)
+
+    if args.save_baseline:
+        with open(args.baseline, "w") as f:
+            f.write(text + "\n")
+        print(f"baseline saved to {args.baseline}")
+        return 0
+    with open(args.baseline) as f:
+        baseline = json.load(f)
+    print(f"{'count':>6} {'metric':<14} {'baseline':>12} {'current':>12} {'ratio':>8}")
+    regressions = compare(results, baseline, args.tolerance)
+    return 1 if regressions else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,43 @@
+"""ベンチマーク用: 標準入力のコマンドに従ってダミーウィンドウを開閉する
+
+コマンド (1行ずつ):
+  open N      WM_CLASS を変えながら N 個のウィンドウを作ってマップする
+  close       開いているウィンドウを全部破棄する
+各コマンドの完了後、{"ids": [...], "time": マップ/破棄した時刻 (time.monotonic)} を1行出力する。
+"""
+import json
+import sys
+import time
+
+from Xlib import display
+
+from xvfb import create_windows
+
+CLASSES = ("xterm", "firefox", "code", "thunar", "gimp")
+
+
+def main():
+    disp = display.Display()
+    windows = []
+    for line in sys.stdin:
+        command = line.split()
+        if not command:
+            continue
+        if command[0] == "open":
+            ids = create_windows(disp, int(command[1]), CLASSES)
+            for win_id in ids:
+                disp.create_resource_object('window', win_id).map()
+            disp.sync()
+            windows.extend(ids)
+        elif command[0] == "close":
+            ids, windows = windows, []
+            for win_id in ids:
+                disp.create_resource_object('window', win_id).destroy()
+            disp.sync()
+        else:
+            continue
+        print(json.dumps({"ids": ids, "time": time.monotonic()}), flush=True)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,125 @@
+"""ベンチマーク用のヘルパー (Xvfb の起動・ダミーウィンドウの作成・計測の小道具・子プロセスでの計測)"""
+import ast
+import json
+import os
+import statistics
+import sys
+import time
+import subprocess
+import contextlib
+
+# リポジトリ直下のモジュール (x11_helper など) を import できるようにする
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if REPO_DIR not in sys.path:
+    sys.path.insert(0, REPO_DIR)
+
+
+def _free_display_number(start=90):
+    """使われていないディスプレイ番号を探す"""
+    num = start
+    while os.path.exists(f"/tmp/.X{num}-lock") or os.path.exists(f"/tmp/.X11-unix/X{num}"):
+        num += 1
+    return num
+
+
+@contextlib.contextmanager
+def xvfb(screen="1920x1080x24", extra_args=()):
+    """Xvfb を起動し、その間だけ DISPLAY を差し替える"""
+    num = _free_display_number()
+    proc = subprocess.Popen(
+        ["Xvfb", f":{num}", "-screen", "0", screen, "-nolisten", "tcp", *extra_args],
+        stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL
+    )
+    # ソケットができるまで待つ
+    deadline = time.monotonic() + 10
+    while not os.path.exists(f"/tmp/.X11-unix/X{num}"):
+        if proc.poll() is not None or time.monotonic() > deadline:
+            proc.kill()
+            raise RuntimeError("Xvfb failed to start")
+        time.sleep(0.05)
+
+    old_display = os.environ.get("DISPLAY")
+    os.environ["DISPLAY"] = f":{num}"
+    try:
+        yield f":{num}"
+    finally:
+        if old_display is None:
+            os.environ.pop("DISPLAY", None)
+        else:
+            os.environ["DISPLAY"] = old_display
+        proc.terminate()
+        proc.wait()
+
+
+def create_windows(disp, count, classes=("xterm", "firefox", "code")):
+    """WM_CLASS などを設定したダミーウィンドウを count 個作ってIDのリストを返す"""
+    from Xlib import X
+
+    root = disp.screen().root
+    atom_name = disp.intern_atom('_NET_WM_NAME')
+    atom_pid = disp.intern_atom('_NET_WM_PID')
+    atom_utf8 = disp.intern_atom('UTF8_STRING')
+    atom_cardinal = disp.intern_atom('CARDINAL')
+
+    ids = []
+    for i in range(count):
+        win = root.create_window(0, 0, 100, 100, 0, X.CopyFromParent)
+        wm_class = classes[i % len(classes)]
+        win.set_wm_class(wm_class, wm_class.capitalize())
+        win.change_property(atom_name, atom_utf8, 8, f"{wm_class} #{i}".encode('utf-8'))
+        win.change_property(atom_pid, atom_cardinal, 32, [os.getpid()])
+        ids.append(win.id)
+    disp.sync()
+    return ids
+
+
+def rss_kb():
+    """このプロセスの RSS (KB)"""
+    with open("/proc/self/status") as f:
+        for line in f:
+            if line.startswith("VmRSS:"):
+                return int(line.split()[1])
+    return 0
+
+
+def percentile(values, pct):
+    """pct パーセンタイル (値が無ければ None)"""
+    if not values:
+        return None
+    values = sorted(values)
+    return values[min(len(values) - 1, int(len(values) * pct / 100))]
+
+
+def measure(func, repeat):
+    """func を repeat 回呼び、時間 (ミリ秒) の中央値と最後の戻り値を返す"""
+    samples = []
+    result = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = func()
+        samples.append((time.perf_counter() - start) * 1000)
+    return statistics.median(samples), result
+
+
+def parse_overrides(items):
+    """--set KEY=VALUE の並びを config の上書き用の dict にする (値は Python のリテラル)"""
+    overrides = {}
+    for item in items:
+        key, _, value = item.partition("=")
+        overrides[key] = ast.literal_eval(value)
+    return overrides
+
+
+def run_child(script, args=(), env=None, timeout=None):
+    """script を --child 付きの別プロセスで動かし、最後に出力した JSON 1行を返す
+
+    子プロセス側は結果を json.dumps で1行にして標準出力に書く (GTK の警告などは無視される)。
+    """
+    out = subprocess.run(
+        [sys.executable, os.path.abspath(script), "--child", *map(str, args)],
+        cwd=REPO_DIR, env=env, capture_output=True, text=True, timeout=timeout
+    )
+    lines = [line for line in out.stdout.splitlines() if line.startswith("{")]
+    if not lines:
+        raise RuntimeError(f"child failed: {out.stderr.strip()}")
+    return json.loads(lines[-1])
@@ -11,12 +11,76 @@ CONTROL_RATIO = 0.8   # 右側ステータスバーの高さの割合 (1.0でシ
 # 起動したいアプリの .desktop ファイルIDを指定してね
 # 例: "io.github.libredeb.lightpad.desktop" や "firefox.desktop" など
 LAUNCHER_CMD = "io.github.libredeb.lightpad.desktop"
+# ランチャーの右に並べるアプリ (.desktop ファイルID)
+# 例: ["firefox.desktop", "org.gnome.Terminal.desktop"]
+PINNED_APPS = []
+# 起動してからウィンドウが現れるまで、タスクバーに仮のボタンを出しておく
+LAUNCH_FEEDBACK = True
+# この時間 (ミリ秒) 内にウィンドウが現れなければ仮のボタンを消す
+LAUNCH_TIMEOUT_MS = 15000
 
 # --- アニメーション設定 (New!) ---
 ANIMATION_ENABLED = True     # アニメーションを有効にするか
 ANIMATION_DURATION = 800     # アニメーションの時間 (ミリ秒)
 # イージングの種類: 'linear', 'ease_out_quad', 'ease_out_back' (ポコンと出るやつ)
 ANIMATION_EASING = 'ease_out_back' 
+# ボタンが消える・隣が詰める・並び替えのアニメーション時間 (ミリ秒)
+LAYOUT_ANIMATION_DURATION = 250
+
+# X11イベントを専用スレッドで受信する (UIスレッドはまとめられた変更だけを処理する)
+X11_EVENT_THREAD = False
+# 最初のイベントからこの時間 (ミリ秒) 内に届いたイベントを1回の更新にまとめる
+X11_COALESCE_MS = 10
+# X11 との通信に使うライブラリ: 'xlib' (python-xlib) か 'xcb' (xcffib)
+# 'xcb' は返答のデコードを libxcb が行うので、ウィンドウが多いときの負荷が小さい
+# (xcffib が無ければ python-xlib を使う。main.py --x11-backend xcb でも切り替えられる)
+X11_BACKEND = 'xlib'
+
+# モニターごとにドックを置き、そのモニターにあるウィンドウだけを表示する
+# False ならプライマリモニターだけに置き、全ウィンドウを表示する
+ALL_MONITORS = True
+
+# 今のデスクトップ (ワークスペース) にあるウィンドウだけを表示する
+# 切り替えたときはボタンの表示・非表示を切り替えるだけで、作り直しはしない
+CURRENT_DESKTOP_ONLY = False
+
+# 同じアプリ (WM_CLASS) のウィンドウを1つのボタンにまとめる
+# クリックで順番に切り替え、中クリックでまとめて最小化
+GROUP_WINDOWS = False
+
+# タスクボタンにマウスを乗せたときに、ツールチップにウィンドウの縮小画像を表示する
+# XComposite の画像を MIT-SHM (共有メモリ) で受け取るので X11_BACKEND = 'xcb' のときだけ出る
+# ('xlib' では画像がソケットを丸ごと通って UI が止まるため、文字だけのツールチップになる)
+WINDOW_PREVIEWS = True
+PREVIEW_SIZE = 240         # プレビューの長辺 (px)
+PREVIEW_REFRESH_MS = 500   # 表示中に取り直す間隔 (同じウィンドウはこれより短い間隔では取得しない)
+PREVIEW_CACHE_MB = 32      # 縮小画像のキャッシュの上限
+
+# タスクバーの描き方
+#   'widgets' -> ウィンドウごとに Gtk.Button (CSS でホバーなどを表現)
+#   'cairo'   -> 1枚の DrawingArea に全アイコンを描く (ウィンドウが多いときに軽く、ホバーで拡大する)
+TASKBAR_RENDERER = 'widgets'
+# 'cairo' のとき、マウスの下のアイコンを何倍まで拡大するか (1.0 で拡大しない)
+# ドックの高さは変えないので、DOCK_HEIGHT に収まる大きさまでに抑えられる
+MAGNIFICATION = 1.5
+# 閉じたウィンドウのタスクボタンを破棄せずに取っておく数 (次に開いたウィンドウで使い回す)
+TASK_BUTTON_POOL = 16
+
+# アイコンキャッシュに保持する Pixbuf の最大数 (アイコン名・サイズ・スケールの組ごと)
+ICON_CACHE_SIZE = 64
+
+# .desktop の索引を $XDG_CACHE_HOME/gtk-dock-x11 に保存して次回起動を速くする
+APP_INDEX_CACHE = True
+
+# 起動から最初の描画 (空のシェルフ) までの目標時間 (ミリ秒)
+# main.py --profile-startup の結果がこれを超えると OVER TARGET と表示される
+FIRST_PAINT_TARGET_MS = 150
+
+# ステータス領域に並べるアイコン (左から順に)
+# どれも D-Bus のシグナルで変化したときだけ更新する (定期的な問い合わせはしない)
+#   'network' -> NetworkManager, 'volume' -> PulseAudio (PipeWire は pactl subscribe), 'battery' -> UPower
+# 自作のものは status_providers.register_provider() で登録すると名前で指定できる
+STATUS_PROVIDERS = ['battery', 'network', 'volume']
 
 # テーマカラー設定 (必要ならここも調整できるようにしておいたよ)
 COLORS = {
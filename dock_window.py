@@ -1,24 +1,391 @@
-import os
 import datetime
+import time
 import gi
 
 gi.require_version('Gtk', '3.0')
-from gi.repository import Gtk, Gdk, GLib, Gio, GdkPixbuf
+from gi.repository import Gtk, Gdk, GLib, Gio, Pango
 
 # 分割したファイルをインポート
 import config
-from x11_helper import X11Helper
+import instrument
 import animation  # アニメーションモジュール
+from icon_cache import PixbufCache, WindowIconCache
+from app_index import AppIconIndex
+from task_strip import TaskStrip, TaskButton
+from task_pool import TaskRecord, ButtonPool
+# 設定で使わないかもしれない機能 (icon_strip・thumbnail_cache・status_providers・launcher) は
+# 使うところで読み込む (cairo・PangoCairo の読み込みも起動時には払わない)
 
-class ModernDock(Gtk.ApplicationWindow):
+# ドックの高さごとに1つだけ作る CssProvider (画面全体で共有)
+_css_providers = {}
+
+
+def build_css(dock_height):
+    """ドックのスタイルシートを作る
+
+    サイズ関係のルールは共通で、色だけライト/ダークの2通りを
+    .dock-container.light / .dock-container.dark の下に書いておく。
+    """
+    radius = int(dock_height * config.RADIUS_RATIO)
+    btn_padding = int(dock_height * 0.1)
+    control_height = int(dock_height * config.CONTROL_RATIO)
+    pill_padding_v = 0 
+    pill_padding_h = 12
+    
+    # CSS transition はホバーエフェクト用に残しておく
+    css = f"""
+    window {{ background-color: transparent; }}
+    .dock-container {{
+        border-radius: {radius}px {radius}px 0px 0px; 
+        padding: 0px 10px;
+    }}
+    .app-button {{
+        background-color: transparent;
+        border: none;
+        padding: {btn_padding}px;
+        border-radius: 12px;
+        margin: 0 4px;
+        transition: background-color 200ms;
+    }}
+    .window-badge {{
+        border-radius: 8px;
+        padding: 0px 4px;
+        font-size: {int(dock_height * 0.18)}px;
+        font-weight: bold;
+    }}
+    .app-button.launching {{ opacity: 0.5; }}
+    .launcher-button {{
+        background-color: transparent;
+        border: none;
+        border-radius: 50%;
+        min-width: {int(dock_height * 0.7)}px;
+        min-height: {int(dock_height * 0.7)}px;
+    }}
+    .clock-label {{
+        font-size: {int(dock_height * 0.25)}px;
+        font-weight: 500;
+    }}
+    .status-pill {{
+        border-radius: 20px;
+        padding: {pill_padding_v}px {pill_padding_h}px;
+        min-height: {control_height}px;
+    }}
+    .status-icon {{ opacity: 0.8; }}
+    """
+    for name, theme_colors in config.COLORS.items():
+        theme = f".dock-container.{name}"
+        css += f"""
+    {theme} {{ background-color: {theme_colors["bg"]}; }}
+    {theme} .app-button:hover {{ background-color: {theme_colors["hover"]}; }}
+    {theme} .app-button.active {{ background-color: {theme_colors["hover"]}; }}
+    {theme} .window-badge {{
+        background-color: {theme_colors["text"]};
+        color: {theme_colors["bg"]};
+    }}
+    {theme} .clock-label {{ color: {theme_colors["text"]}; }}
+    {theme} .status-pill {{ background-color: {theme_colors["hover"]}; }}
+    {theme} .status-icon {{ color: {theme_colors["text"]}; }}
+    """
+    return css
+
+
+def load_css(screen):
+    """現在の DOCK_HEIGHT 用のスタイルシートを読み込む (同じ高さなら2回目以降は何もしない)"""
+    provider = _css_providers.get(config.DOCK_HEIGHT)
+    if provider is None:
+        provider = Gtk.CssProvider()
+        provider.load_from_data(build_css(config.DOCK_HEIGHT).encode('utf-8'))
+        Gtk.StyleContext.add_provider_for_screen(
+            screen, 
+            provider, 
+            Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION
+        )
+        _css_providers[config.DOCK_HEIGHT] = provider
+    return provider
+
+
+class DockManager:
+    """モニターごとのドックと、全ドックで共有するものを管理する
+
+    X11接続・ウィンドウ情報のキャッシュ・アイコンのキャッシュ・.desktop の索引は
+    ここに1つだけ持ち、X11のイベントもここで1回だけ処理してから各ドックに配る。
+    """
     def __init__(self, app):
+        self.app = app
+        self.display = Gdk.Display.get_default()
+        # X11への接続は最初のドックの起動処理 (attach) で行う
+        self.x11 = None
+        self.window_ids = []
+        self.current_desktop = None
+        self.active_win_id = None
+        # モニター -> ドック / X11の更新を受け取るドック (起動処理が済んだもの)
+        self.docks = {}
+        self.attached = []
+
+        # CSS設定 (ライト/ダーク両方入りのスタイルシートを1回だけ読み込む)
+        self.css_provider = load_css(Gdk.Screen.get_default())
+        self.settings = Gtk.Settings.get_default()
+        self.settings.connect("notify::gtk-theme-name", lambda s, p: self._for_each_dock('update_css'))
+        self.settings.connect("notify::gtk-application-prefer-dark-theme",
+                              lambda s, p: self._for_each_dock('update_css'))
+
+        # アイコン関連
+        self.icon_theme = Gtk.IconTheme.get_default()
+        # 読み込み済みPixbufの共有キャッシュ (テーマ変更で自動的に空になる)
+        self.pixbuf_cache = PixbufCache(self.icon_theme, config.ICON_CACHE_SIZE)
+        # キャッシュが空になった後で、表示中のアイコンを新しいテーマで読み直す
+        self.icon_theme.connect("changed", lambda theme: self._for_each_dock('refresh_task_icons'))
+        # テーマにアイコンが無いアプリは、ウィンドウ自身のアイコン (_NET_WM_ICON) を使う
+        self.window_icons = WindowIconCache(lambda win_id, size: self.x11.get_window_icon(win_id, size))
+        # ホバー時のプレビュー (同じウィンドウは PREVIEW_REFRESH_MS より短い間隔では取り直さない)
+        self.thumbnails = None
+        if config.WINDOW_PREVIEWS:
+            from thumbnail_cache import ThumbnailCache
+            self.thumbnails = ThumbnailCache(lambda win_id: self.x11.capture_window(win_id),
+                                             config.PREVIEW_CACHE_MB << 20, config.PREVIEW_REFRESH_MS)
+        # .desktop の索引はバックグラウンドで作る (完成までは代替アイコンで表示)
+        self.app_index = AppIconIndex(on_changed=self.on_app_index_changed,
+                                      use_cache=config.APP_INDEX_CACHE)
+        self.app_index.refresh()
+        # ステータス領域の中身 (購読は最初のドックのステータス領域を作るときに始める)
+        self.status_providers = None
+        # アプリの起動 (新しいウィンドウが現れるまで追跡する。最初に起動するときに作る)
+        self.launcher = None
+        self._register_stats()
+
+        # モニターの抜き差し・解像度の変更 (GDK が RandR のイベントから通知する)
+        Gdk.Screen.get_default().connect("monitors-changed", lambda screen: self.update_docks())
+        self.update_docks()
+        self._watch_clock_events()
+
+    def present(self):
+        for dock in self.docks.values():
+            dock.present()
+
+    def monitors(self):
+        """ドックを置くモニター"""
+        if config.ALL_MONITORS:
+            return [self.display.get_monitor(i) for i in range(self.display.get_n_monitors())]
+        return [self.display.get_primary_monitor() or self.display.get_monitor(0)]
+
+    def update_docks(self):
+        """モニターの構成に合わせてドックを作る・消す・置き直す"""
+        monitors = self.monitors()
+        for monitor in list(self.docks):
+            if monitor not in monitors:
+                self.docks.pop(monitor).destroy()
+        for monitor in monitors:
+            dock = self.docks.get(monitor)
+            if dock is None:
+                self.docks[monitor] = ModernDock(self.app, self, monitor)
+            else:
+                dock.update_geometry()
+                dock.align_to_bottom()
+        # ウィンドウの担当モニターが変わっているかもしれない
+        for dock in self.attached:
+            dock.refilter_windows()
+
+    def attach(self, dock):
+        """ドックに X11 の更新を配り始め、今のウィンドウ一覧で埋める
+
+        接続と監視の開始は最初のドックのときに1回だけ行う。
+        """
+        if self.x11 is None:
+            # python-xlib / xcffib の読み込みも含めて、ここまで遅らせる
+            from x11_helper import X11Helper
+            self.x11 = X11Helper(
+                event_thread=config.X11_EVENT_THREAD,
+                coalesce_ms=config.X11_COALESCE_MS,
+                backend=config.X11_BACKEND
+            )
+            if self.x11.enabled:
+                self.x11.connect('client-list', self.update_window_list)
+                self.x11.connect('current-desktop', self.update_current_desktop)
+                self.x11.connect('active-window', self.update_active_window)
+                self.x11.connect('window-changed', self.on_window_changed)
+                self.x11.start_monitoring()
+                self.current_desktop = self.x11.get_current_desktop()
+                self.update_window_list()
+                self.update_active_window()
+        if self.x11.enabled:
+            self.attached.append(dock)
+            dock.update_window_list(self.window_ids)
+            dock.update_active_window(self.active_win_id)
+        return self.x11
+
+    def detach(self, dock):
+        if dock in self.attached:
+            self.attached.remove(dock)
+        if self.docks.get(dock.monitor) is dock:
+            del self.docks[dock.monitor]
+
+    def monitor_for_window(self, info):
+        """ウィンドウの中心があるモニター (どこにも無ければ一番近いもの)"""
+        if info['geometry'] is None:
+            return self.display.get_primary_monitor() or self.display.get_monitor(0)
+        x, y, width, height = info['geometry']
+        # X11 の座標は実ピクセル、GDK の座標はスケール後の論理ピクセル
+        scale = self.display.get_monitor(0).get_scale_factor()
+        return self.display.get_monitor_at_point((x + width // 2) // scale, (y + height // 2) // scale)
+
+    def update_window_list(self):
+        """クライアントリストを1回だけ取得し、監視とキャッシュを更新してから各ドックに配る"""
+        window_ids = list(self.x11.get_window_list())
+        current = set(window_ids)
+        # 閉じられたウィンドウは DestroyNotify で先にキャッシュ (x11.windows) から外れているので、
+        # 前回のリストと比べる (アイコン・プレビュー・Composite のリダイレクトを確実に片付ける)
+        for win_id in (set(self.window_ids) | self.x11.windows.keys()) - current:
+            self.x11.untrack_window(win_id)
+            self.window_icons.invalidate(win_id)
+            if self.thumbnails is not None:
+                self.thumbnails.invalidate(win_id)
+        added_ids = [win_id for win_id in window_ids if win_id not in self.x11.windows]
+        # 新しいウィンドウは監視を始めてキャッシュに載せる (1往復でまとめて取得)
+        self.x11.track_windows(window_ids)
+        self.window_ids = window_ids
+        # 起動中のアプリのウィンドウなら、各ドックが仮のボタンと置き換えられるようにする
+        if self.launcher is not None and self.launcher.pending:
+            for win_id in added_ids:
+                info = self.x11.get_window_info(win_id)
+                if info:
+                    self.launcher.match_window(win_id, info)
+        for dock in self.attached:
+            dock.update_window_list(window_ids)
+
+    def update_current_desktop(self):
+        self.current_desktop = self.x11.get_current_desktop()
+        for dock in self.attached:
+            dock.update_desktop_visibility()
+
+    def update_active_window(self):
+        self.active_win_id = self.x11.get_active_window()
+        for dock in self.attached:
+            dock.update_active_window(self.active_win_id)
+
+    def on_window_changed(self, win_id, key):
+        if key == 'icon':
+            # 取り直すのは次に使うとき
+            self.window_icons.invalidate(win_id)
+        for dock in self.attached:
+            dock.on_window_changed(win_id, key)
+
+    def start_status_providers(self):
+        """D-Bus の購読を1回だけ始め、全ドック共通のプロバイダーを返す"""
+        if self.status_providers is None:
+            import status_providers
+            self.status_providers = status_providers.create_providers(
+                config.STATUS_PROVIDERS, self.on_status_changed)
+            for provider in self.status_providers:
+                provider.start()
+        return self.status_providers
+
+    def get_launcher(self):
+        """アプリの起動を追跡する AppLauncher (最初に使うときに作る)"""
+        if self.launcher is None:
+            from launcher import AppLauncher
+            self.launcher = AppLauncher(self.display, self.on_launch_finished, config.LAUNCH_TIMEOUT_MS)
+        return self.launcher
+
+    def on_status_changed(self, provider):
+        instrument.count('status.updates')
+        for dock in self.docks.values():
+            dock.update_status_icon(provider)
+
+    def on_launch_finished(self, launch, win_id):
+        for dock in self.docks.values():
+            dock.end_launch_feedback(launch, win_id)
+
+    def on_app_index_changed(self, changed_keys):
+        """索引の構築・更新が終わったら、アイコンが変わったボタンだけ差し替える (None なら全部)"""
+        for dock in self.docks.values():
+            dock.refresh_task_icons(changed_keys)
+
+    def _for_each_dock(self, method):
+        for dock in self.docks.values():
+            getattr(dock, method)()
+
+    def _register_stats(self):
+        """計測 (instrument) の統計に載せる値を登録する (評価は問い合わせ時だけ)"""
+        cache = self.pixbuf_cache
+        instrument.gauge('icon_cache.hits', lambda: cache.hits)
+        instrument.gauge('icon_cache.misses', lambda: cache.misses)
+        instrument.gauge('icon_cache.hit_ratio',
+                         lambda: round(cache.hits / max(cache.hits + cache.misses, 1), 3))
+        instrument.gauge('icon_cache.entries', lambda: len(cache))
+        instrument.gauge('icon_cache.window_icons', lambda: len(self.window_icons))
+        if self.thumbnails is not None:
+            instrument.gauge('previews.entries', lambda: len(self.thumbnails))
+            instrument.gauge('previews.bytes', lambda: self.thumbnails.total_bytes)
+            instrument.gauge('previews.captures', lambda: self.thumbnails.captures)
+        instrument.gauge('docks', lambda: len(self.docks))
+        instrument.gauge('widgets.task_buttons',
+                         lambda: sum(len(dock.center_box.children) for dock in self.docks.values()))
+        instrument.gauge('widgets.tracked_windows',
+                         lambda: sum(len(dock.tasks) for dock in self.docks.values()))
+        instrument.gauge('widgets.pooled_buttons',
+                         lambda: sum(len(dock.button_pool.free) for dock in self.docks.values()))
+        instrument.gauge('launch.pending', lambda: len(self.launcher.pending) if self.launcher else 0)
+        instrument.gauge('animation.live',
+                         lambda: sum(dock.animation_clock.live_count for dock in self.docks.values()))
+        # X11 の値は接続 (attach) までは取れない (エラーとして表示される)
+        instrument.gauge('x11.raw_events', lambda: self.x11.stats['raw_events'])
+        instrument.gauge('x11.dispatches', lambda: self.x11.stats['dispatches'])
+        instrument.gauge('x11.cached_windows', lambda: len(self.x11.windows))
+
+    def _watch_clock_events(self):
+        """スリープ復帰とタイムゾーン変更で全ドックの時計を合わせ直す"""
+        # タイムゾーン: /etc/localtime の置き換えを監視
+        try:
+            self.localtime_monitor = Gio.File.new_for_path("/etc/localtime").monitor_file(
+                Gio.FileMonitorFlags.NONE, None)
+            self.localtime_monitor.connect("changed", self._on_timezone_changed)
+        except Exception as e:
+            print(f"Failed to watch timezone: {e}")
+
+        # スリープ復帰: logind の PrepareForSleep(false) を購読
+        # (スリープ中は単調時計が止まるので、予約したタイマーが遅れる)
+        def on_bus_ready(source, result):
+            try:
+                self.system_bus = Gio.bus_get_finish(result)
+            except Exception as e:
+                print(f"System bus unavailable: {e}")
+                return
+            self.system_bus.signal_subscribe(
+                "org.freedesktop.login1", "org.freedesktop.login1.Manager",
+                "PrepareForSleep", "/org/freedesktop/login1", None,
+                Gio.DBusSignalFlags.NONE, self._on_prepare_for_sleep)
+
+        Gio.bus_get(Gio.BusType.SYSTEM, None, on_bus_ready)
+
+    def _on_prepare_for_sleep(self, connection, sender, path, interface, signal, params):
+        going_to_sleep, = params.unpack()
+        if not going_to_sleep:
+            self._update_clocks()
+
+    def _on_timezone_changed(self, monitor, file, other_file, event_type):
+        # C ライブラリが読み込んだタイムゾーン情報を更新してから表示し直す
+        time.tzset()
+        self._update_clocks()
+
+    def _update_clocks(self):
+        # 時計がまだ無い (起動処理の途中の) ドックは飛ばす
+        for dock in self.docks.values():
+            if dock.clock_timer_id is not None:
+                dock.update_clock()
+
+
+class ModernDock(Gtk.ApplicationWindow):
+    def __init__(self, app, manager, monitor):
         super().__init__(application=app)
         
         self.set_title("Modern Dock")
         self.set_type_hint(Gdk.WindowTypeHint.DOCK)
         
-        # X11ヘルパーの初期化
-        self.x11 = X11Helper()
+        # 共有のものは DockManager が持つ
+        self.manager = manager
+        self.monitor = monitor  # このドックを置くモニター (Gdk.Monitor)
+        # X11への接続は最初の描画の後 (_start_x11) で行う
+        self.x11 = None
         
         # 初期サイズ設定
         self.dock_w = 0 # update_geometryで設定される
@@ -38,52 +405,123 @@ class ModernDock(Gtk.ApplicationWindow):
         if visual and self.get_screen().is_composited():
             self.set_visual(visual)
 
-        # CSS設定
-        self.css_provider = Gtk.CssProvider()
-        Gtk.StyleContext.add_provider_for_screen(
-            Gdk.Screen.get_default(), 
-            self.css_provider, 
-            Gtk.STYLE_PROVIDER_PRIORITY_APPLICATION
-        )
-        
-        self.settings = Gtk.Settings.get_default()
-        self.settings.connect("notify::gtk-theme-name", lambda s, p: self.update_css())
-        self.update_css()
-        
-        # アイコン関連
-        self.icon_theme = Gtk.IconTheme.get_default()
-        self.icon_cache = {}
-        self.build_icon_cache()
+        self.settings = manager.settings
+        self.pixbuf_cache = manager.pixbuf_cache
+        self.window_icons = manager.window_icons
+        self.thumbnails = manager.thumbnails
+        self.app_index = manager.app_index
 
-        # 実行中のアニメーション保持用
-        self.running_animations = []
+        # 全アニメーション共通の時計 (フレームごとに1回だけ起きる)
+        self.animation_clock = animation.AnimationClock(self)
+
+        # ウィンドウID -> TaskRecord (クラス名とボタン) の索引 (毎回 get_children() から作り直さない)
+        # クラス名はキャッシュから消えた後でもグループを引けるように持っておく
+        # グループ表示では同じクラスのウィンドウが同じボタンを指す
+        self.tasks = {}
+        # グループ表示用: クラス名 -> [ウィンドウID], クラス名 -> ボタン
+        self.groups = {}
+        self.group_buttons = {}
+        # 除外対象と判定済みのウィンドウ (毎回クラス名を問い合わせないため)
+        self.ignored_windows = set()
+        # 他のモニターにあるウィンドウ (移ってきたらボタンを出す)
+        self.other_windows = set()
+        self.active_win_id = None
+        self.active_btn = None
+        # ホバー時のプレビュー (ツールチップに入れる部品は最初のホバーで作る)
+        self.preview_box = None
+        self.preview_win_id = None
+        self.preview_timer_id = None
+        # 起動中のアプリの仮のボタン: Launch -> ボタン
+        # ウィンドウが現れたら win_id -> ボタン に移し、本物のボタンをその位置に置く
+        self.launch_placeholders = {}
+        self.replacing = {}
             
         # --- レイアウト構築 ---
         self.main_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=0)
         self.main_box.get_style_context().add_class("dock-container")
         self.add(self.main_box)
+        # 左右の箱だけ先に置き、中身 (ランチャー・ステータス) は最初の描画の後で作る
+        self.left_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL)
+        self.left_box.set_valign(Gtk.Align.CENTER)
+        self.right_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
+        self.right_box.set_valign(Gtk.Align.CENTER)
+        # TASKBAR_RENDERER = 'cairo' のときのタスクバー (IconStrip)
+        self.icon_strip = None
+        # テーマ切り替えは dock-container のクラスを付け替えるだけ
+        self.update_css()
         
-        self._setup_launcher()     # 左: ランチャー
+        self.main_box.pack_start(self.left_box, False, False, 0)
         self._setup_taskbar()      # 中: タスクバー
-        self._setup_status_area()  # 右: ステータス
-        
-        # 定期実行タスク
-        GLib.timeout_add_seconds(1, self.update_clock)
-        
-        # X11イベント監視を開始
-        if self.x11.enabled:
-            self.x11.start_monitoring(self.update_window_list)
-            # 初回描画
-            self.update_window_list()
+        self.main_box.pack_start(self.right_box, False, False, 0)
 
-        self.connect("realize", lambda w: self.align_to_bottom())
+        self.clock_text = None
+        self.clock_timer_id = None
+        # プロバイダー名 -> ステータス領域のアイコン
+        self.status_icons = {}
+
+        # 空の枠を最初に表示し、残りは描画の後にアイドル優先度で1段ずつ進める
+        # (段の名前は --profile-startup の内訳に使う)
+        self.startup_stages = [
+            ('x11', self._start_x11),             # 中: X11に接続してウィンドウ一覧を表示
+            ('status', self._setup_status_area),  # 右: ステータス・時計
+            ('launcher', self._setup_launcher),   # 左: ランチャー
+        ]
+        self.first_paint_id = None
+        self.startup_idle_id = None
+
+        self.connect("realize", self._on_realize)
         self.connect("map-event", lambda w, e: self.align_to_bottom())
+        self.connect("destroy", self._on_destroy)
         self.show_all()
+        instrument.mark('window')
+
+    def _on_realize(self, widget):
+        self.align_to_bottom()
+        frame_clock = self.get_frame_clock()
+        self.first_paint_id = frame_clock.connect("after-paint", self._on_first_paint)
+
+    def _on_first_paint(self, frame_clock):
+        frame_clock.disconnect(self.first_paint_id)
+        self.first_paint_id = None
+        instrument.mark('first-paint')
+        self.startup_idle_id = GLib.idle_add(self._run_startup_stage)
+
+    def _run_startup_stage(self):
+        """起動処理を1段だけ進める (段の間で描画やイベント処理が入れるように)"""
+        name, stage = self.startup_stages.pop(0)
+        try:
+            stage()
+        except Exception as e:
+            # 1段失敗しても残りの段は続ける
+            print(f"Startup stage '{name}' failed: {e}")
+        instrument.mark(name)
+        if self.startup_stages:
+            return True
+        self.startup_idle_id = None
+        instrument.startup_finished()
+        return False
+
+    def _start_x11(self):
+        # 接続は全ドックで共有 (2つ目以降のドックは一覧を受け取るだけ)
+        self.x11 = self.manager.attach(self)
+        # Strut は接続前に設定できなかったので、ここで改めて設定する
+        self.align_to_bottom()
+
+    def _on_destroy(self, widget):
+        """モニターが外されたとき: 共有の更新から外し、タイマーを止める"""
+        self.manager.detach(self)
+        if self.startup_idle_id is not None:
+            GLib.source_remove(self.startup_idle_id)
+            self.startup_idle_id = None
+        if self.clock_timer_id is not None:
+            GLib.source_remove(self.clock_timer_id)
+            self.clock_timer_id = None
+        if self.preview_timer_id is not None:
+            GLib.source_remove(self.preview_timer_id)
+            self.preview_timer_id = None
+        self.button_pool.clear()
 
     def _setup_launcher(self):
-        left_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL)
-        left_box.set_valign(Gtk.Align.CENTER)
-        
         self.launcher_btn = Gtk.Button()
         self.launcher_btn.get_style_context().add_class("launcher-button")
         
@@ -91,18 +529,65 @@ class ModernDock(Gtk.ApplicationWindow):
         self.launcher_btn.add(launcher_icon)
         self.launcher_btn.connect("clicked", self.on_launcher_clicked)
         
-        left_box.pack_start(self.launcher_btn, False, False, 0)
-        self.main_box.pack_start(left_box, False, False, 0)
+        self.left_box.pack_start(self.launcher_btn, False, False, 0)
+
+        # ピン留めしたアプリ (見つからない .desktop は飛ばす)
+        for desktop_id in config.PINNED_APPS:
+            app_info = self.manager.get_launcher().app_info(desktop_id)
+            if app_info is None:
+                print(f"Pinned app not found: {desktop_id}")
+                continue
+            btn = Gtk.Button()
+            btn.get_style_context().add_class("app-button")
+            btn.set_tooltip_text(app_info.get_display_name())
+            btn.add(self._create_app_icon(app_info))
+            btn.connect("clicked", lambda b, desktop_id: self.launch_app(desktop_id), desktop_id)
+            self.left_box.pack_start(btn, False, False, 0)
+        self.left_box.show_all()
+
+    def _create_app_icon(self, app_info):
+        """.desktop のアイコンをタスクボタンと同じ大きさで読む"""
+        img = Gtk.Image()
+        pixbuf = self._load_app_pixbuf(app_info, int(config.DOCK_HEIGHT * 0.7))
+        if pixbuf: self._set_image_pixbuf(img, pixbuf)
+        return img
+
+    def _load_app_pixbuf(self, app_info, size):
+        icon = app_info.get_icon()
+        return icon and self.load_icon_pixbuf(icon.to_string(), size)
 
     def _setup_taskbar(self):
-        self.center_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=12)
-        self.center_box.set_halign(Gtk.Align.CENTER)
-        self.center_box.set_valign(Gtk.Align.CENTER)
-        self.main_box.pack_start(self.center_box, True, False, 0)
+        # タスクボタンのアイコンの大きさ (IconStrip では拡大したときの大きさで読み込む)
+        self.task_icon_size = int(config.DOCK_HEIGHT * 0.7)
+        if config.TASKBAR_RENDERER == 'cairo':
+            from icon_strip import IconStrip
+            # 全アイコンを1枚に描く (大きさ・間隔は .app-button の CSS に合わせる)
+            self.center_box = self.icon_strip = IconStrip(
+                self.animation_clock,
+                self.task_icon_size,
+                padding=int(config.DOCK_HEIGHT * 0.1),
+                spacing=12 + 8,
+                duration_ms=config.LAYOUT_ANIMATION_DURATION,
+                animate=config.ANIMATION_ENABLED,
+                magnification=config.MAGNIFICATION,
+                height=config.DOCK_HEIGHT,
+                badge_font_px=int(config.DOCK_HEIGHT * 0.18)
+            )
+            self.icon_strip.set_colors(config.COLORS["dark" if self._is_dark_theme() else "light"])
+            self.task_icon_size = self.icon_strip.max_icon_size
+        else:
+            # 中央寄せは TaskStrip 自身が行う (入退場・並び替えを描画だけでアニメーションさせる)
+            self.center_box = TaskStrip(
+                self.animation_clock,
+                spacing=12,
+                duration_ms=config.LAYOUT_ANIMATION_DURATION,
+                animate=config.ANIMATION_ENABLED
+            )
+        self.main_box.pack_start(self.center_box, True, True, 0)
+        # 閉じたウィンドウのボタンは破棄せず、次に開いたウィンドウで使い回す
+        self.button_pool = ButtonPool(self._new_task_button, config.TASK_BUTTON_POOL)
 
     def _setup_status_area(self):
-        right_box = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=10)
-        right_box.set_valign(Gtk.Align.CENTER)
         status_container = Gtk.Box(orientation=Gtk.Orientation.HORIZONTAL, spacing=8)
         status_container.get_style_context().add_class("status-pill")
         
@@ -110,74 +595,52 @@ class ModernDock(Gtk.ApplicationWindow):
         self.clock_label.get_style_context().add_class("clock-label")
         status_container.pack_end(self.clock_label, False, False, 0)
         
-        for icon in ["audio-volume-medium-symbolic", "network-wireless-symbolic"]:
-            img = Gtk.Image.new_from_icon_name(icon, Gtk.IconSize.MENU)
+        # アイコンは D-Bus のシグナルが来たときだけ update_status_icon で差し替える
+        for provider in reversed(self.manager.start_status_providers()):
+            img = Gtk.Image()
             img.get_style_context().add_class("status-icon")
+            img.set_no_show_all(True)
             status_container.pack_end(img, False, False, 0)
+            self.status_icons[provider.name] = img
+            self.update_status_icon(provider)
             
-        right_box.pack_start(status_container, False, False, 0)
-        self.main_box.pack_start(right_box, False, False, 0)
+        self.right_box.pack_start(status_container, False, False, 0)
+        self.right_box.show_all()
+
+        # 時計は分が変わる瞬間にだけ起きる (スリープ復帰などは DockManager が知らせる)
+        self.update_clock()
 
+    def update_status_icon(self, provider):
+        """プロバイダーの状態をアイコンに反映する (サービスが無いときは隠す)"""
+        img = self.status_icons.get(provider.name)
+        if img is None:
+            return
+        if provider.icon_name is None:
+            img.hide()
+            return
+        img.set_from_icon_name(provider.icon_name, Gtk.IconSize.MENU)
+        img.set_tooltip_text(provider.tooltip)
+        img.show()
+
+    @instrument.timed('dock.update_css')
     def update_css(self):
+        """ライト/ダークの切り替え (CSSは読み直さず、クラスを付け替えるだけ)"""
         is_dark = self._is_dark_theme()
-        theme_colors = config.COLORS["dark"] if is_dark else config.COLORS["light"]
-        
-        radius = int(config.DOCK_HEIGHT * config.RADIUS_RATIO)
-        btn_padding = int(config.DOCK_HEIGHT * 0.1)
-        control_height = int(config.DOCK_HEIGHT * config.CONTROL_RATIO)
-        pill_padding_v = 0 
-        pill_padding_h = 12
-        
-        # CSS transition はホバーエフェクト用に残しておく
-        css = f"""
-        window {{ background-color: transparent; }}
-        .dock-container {{
-            background-color: {theme_colors["bg"]};
-            border-radius: {radius}px {radius}px 0px 0px; 
-            padding: 0px 10px;
-        }}
-        .app-button {{
-            background-color: transparent;
-            border: none;
-            padding: {btn_padding}px;
-            border-radius: 12px;
-            margin: 0 4px;
-            transition: background-color 200ms;
-        }}
-        .app-button:hover {{ background-color: {theme_colors["hover"]}; }}
-        .launcher-button {{
-            background-color: transparent;
-            border: none;
-            border-radius: 50%;
-            min-width: {int(config.DOCK_HEIGHT * 0.7)}px;
-            min-height: {int(config.DOCK_HEIGHT * 0.7)}px;
-        }}
-        .clock-label {{
-            font-size: {int(config.DOCK_HEIGHT * 0.25)}px;
-            font-weight: 500;
-            color: {theme_colors["text"]};
-        }}
-        .status-pill {{
-            background-color: {theme_colors["hover"]};
-            border-radius: 20px;
-            padding: {pill_padding_v}px {pill_padding_h}px;
-            min-height: {control_height}px;
-        }}
-        .status-icon {{ color: {theme_colors["text"]}; opacity: 0.8; }}
-        """
-        self.css_provider.load_from_data(css.encode('utf-8'))
+        style = self.main_box.get_style_context()
+        if style.has_class("dark") == is_dark and style.has_class("light") != is_dark:
+            return
+        style.remove_class("light" if is_dark else "dark")
+        style.add_class("dark" if is_dark else "light")
+        if self.icon_strip is not None:
+            self.icon_strip.set_colors(config.COLORS["dark" if is_dark else "light"])
 
     def update_geometry(self):
-        gdk_display = Gdk.Display.get_default()
-        monitor = gdk_display.get_primary_monitor() or gdk_display.get_monitor(0)
-        rect = monitor.get_geometry()
+        rect = self.monitor.get_geometry()
         self.dock_w = int(rect.width * config.WIDTH_RATIO)
         self.set_default_size(self.dock_w, config.DOCK_HEIGHT)
 
     def align_to_bottom(self):
-        gdk_display = Gdk.Display.get_default()
-        monitor = gdk_display.get_primary_monitor() or gdk_display.get_monitor(0)
-        geo = monitor.get_geometry()
+        geo = self.monitor.get_geometry()
         
         x = geo.x + (geo.width - self.dock_w) // 2
         y = geo.y + geo.height - config.DOCK_HEIGHT
@@ -185,151 +648,481 @@ class ModernDock(Gtk.ApplicationWindow):
         self.move(x, y)
         self.resize(self.dock_w, config.DOCK_HEIGHT)
         
-        if self.x11.enabled:
+        if self.x11 and self.x11.enabled:
             try:
                 win_id = self.get_window().get_xid()
+                screen = Gdk.Screen.get_default()
+                # GDK の座標は論理ピクセルだが、_NET_WM_STRUT(_PARTIAL) は X の (デバイス) ピクセルで書く
+                scale = self.get_scale_factor()
                 self.x11.set_strut(
-                    win_id, 
-                    x, y, 
-                    self.dock_w, config.DOCK_HEIGHT,
-                    geo.width, geo.height
+                    win_id,
+                    x * scale, y * scale,
+                    self.dock_w * scale, config.DOCK_HEIGHT * scale,
+                    screen.get_width() * scale, screen.get_height() * scale
                 )
             except Exception as e:
                 print(f"Failed to set strut: {e}")
                 
         return False
 
-    def build_icon_cache(self):
-        apps = Gio.AppInfo.get_all()
-        for app in apps:
-            icon = app.get_icon()
-            if not icon: continue
-            icon_str = icon.to_string()
-            
-            if app.get_id(): 
-                self.icon_cache[app.get_id().lower().replace(".desktop","")] = icon_str
-            if app.get_executable():
-                try: 
-                    self.icon_cache[os.path.basename(app.get_executable()).lower()] = icon_str
-                except: pass
-            if isinstance(app, Gio.DesktopAppInfo) and app.get_startup_wm_class():
-                self.icon_cache[app.get_startup_wm_class().lower()] = icon_str
-
+    @instrument.timed('dock.load_icon_pixbuf')
     def load_icon_pixbuf(self, icon_string, size):
-        if not icon_string: return None
-        try:
-            if self.icon_theme.has_icon(icon_string):
-                return self.icon_theme.load_icon(icon_string, size, Gtk.IconLookupFlags.FORCE_SIZE)
-            elif os.path.exists(icon_string):
-                return GdkPixbuf.Pixbuf.new_from_file_at_scale(icon_string, size, size, True)
-            return self.icon_theme.load_icon("application-default-icon", size, 0)
-        except: return None
+        """共有キャッシュ経由でPixbufを取得する (HiDPIではスケール分大きい画像になる)"""
+        return self.pixbuf_cache.get(icon_string, size, self.get_scale_factor())
 
-    def update_window_list(self):
-        """ウィンドウリストを更新する（差分更新・アニメーション付き）"""
-        window_ids = self.x11.get_window_list()
-        
-        # 現在表示されているボタンの情報を取得
-        # {win_id: button_widget} の辞書を作る
-        current_buttons = {}
-        for child in self.center_box.get_children():
-            if hasattr(child, 'win_id'):
-                current_buttons[child.win_id] = child
+    def _load_task_icon(self, app_class, win_id):
+        """タスクボタン用のアイコン (テーマに無ければウィンドウの _NET_WM_ICON)
+
+        索引ができるまでは代替アイコンにしておく。_NET_WM_ICON の読み込みはウィンドウごとに
+        往復が何回もあるので、起動直後に全ウィンドウ分読まず、索引でも解決できなかった
+        クラスだけ索引ができてから (on_app_index_changed で) 読む。
+        """
+        icon_size = self.task_icon_size
+        icon_string = self._get_icon_string_for_class(app_class)
+        if self.app_index.ready and not self.pixbuf_cache.can_load(icon_string):
+            pixbuf = self.window_icons.get(win_id, icon_size * self.get_scale_factor())
+            if pixbuf:
+                return pixbuf
+        return self.load_icon_pixbuf(icon_string, icon_size)
+
+    def _set_task_icon(self, btn, pixbuf):
+        if self.icon_strip is not None:
+            btn.set_icon(pixbuf)
+        else:
+            self._set_image_pixbuf(btn.image, pixbuf)
+
+    def _set_image_pixbuf(self, img, pixbuf):
+        """スケールを考慮して Gtk.Image に Pixbuf を設定する"""
+        scale = self.get_scale_factor()
+        if scale > 1:
+            surface = Gdk.cairo_surface_create_from_pixbuf(pixbuf, scale, self.get_window())
+            img.set_from_surface(surface)
+        else:
+            img.set_from_pixbuf(pixbuf)
+
+    def refresh_task_icons(self, app_classes=None):
+        """表示中のボタンのアイコンを読み直す
+
+        app_classes を渡すと、そのクラスのボタンだけを対象にする。
+        """
+        if config.GROUP_WINDOWS:
+            # グループのアイコンは先頭のウィンドウのものを使う
+            buttons = ((self.groups[app_class][0], app_class, btn) for app_class, btn in self.group_buttons.items())
+        else:
+            buttons = ((record.win_id, record.app_class, record.button) for record in self.tasks.values())
+
+        for win_id, app_class, btn in buttons:
+            if app_classes is not None and app_class not in app_classes: continue
+            pixbuf = self._load_task_icon(app_class, win_id)
+            if pixbuf:
+                self._set_task_icon(btn, pixbuf)
+
+    @instrument.timed('dock.update_window_list')
+    def update_window_list(self, window_ids):
+        """ウィンドウリストを更新する（差分更新・アニメーション付き）
+
+        window_ids と各ウィンドウの情報は DockManager が取得済み。
+        """
+        # 索引との差分を集合演算で求める (python-xlibの配列に対する線形探索を避ける)
+        new_ids = set(window_ids)
+        known_ids = self.tasks.keys() | self.ignored_windows | self.other_windows
+        removed_ids = known_ids - new_ids
 
         # --- 削除処理 ---
-        # 新しいリストに含まれないIDのボタンを削除
-        for win_id, btn in list(current_buttons.items()):
-            if win_id not in window_ids:
-                # フェードアウトして消すなどの処理も入れられるが、今回は即削除
-                self.center_box.remove(btn)
-                del current_buttons[win_id]
+        for win_id in removed_ids:
+            self.ignored_windows.discard(win_id)
+            self.other_windows.discard(win_id)
+            self._remove_task(win_id)
 
         # --- 追加処理 ---
-        # 新しいIDを追加
-        icon_size = int(config.DOCK_HEIGHT * 0.7)
+        # リストの並び順を保つため window_ids の順に見る
+        added_ids = [win_id for win_id in window_ids if win_id not in known_ids]
+        for win_id in added_ids:
+            info = self.x11.get_window_info(win_id)
+            if info:
+                self._add_task_button(win_id, info)
+
+        # 仮のボタンと入れ替わらなかったもの (既存のグループに入った・他のモニターに出たなど)
+        for placeholder in self.replacing.values():
+            self.center_box.remove_animated(placeholder, self._release_task_button)
+        self.replacing.clear()
         
-        for win_id in window_ids:
-            # すでに表示されているならスキップ
-            if win_id in current_buttons:
-                continue
+        return True
 
-            try:
-                app_class = self.x11.get_window_class(win_id)
-                if not app_class: continue
-                
-                # 除外リスト
-                if config.APP_ID in app_class or "modern dock" in app_class: continue
-                if app_class in ["desktop_window", "dock", "gnome-shell", "xfce4-panel"]: continue
+    def _add_task_button(self, win_id, info):
+        """ウィンドウ1つ分のボタンを作って索引に登録する"""
+        try:
+            app_class = info['wm_class']
+            # クラス名が無いもの・除外リストのものは無視する
+            # (WM_CLASS が後から付いたら on_window_changed で再判定)
+            if not app_class or self._is_excluded_class(app_class):
+                self.ignored_windows.add(win_id)
+                return
+            # 他のモニターにあるウィンドウは、そのモニターのドックが表示する
+            if not self.owns_window(info):
+                self.other_windows.add(win_id)
+                return
 
-                icon_str = self._get_icon_string_for_class(app_class)
-                pixbuf = self.load_icon_pixbuf(icon_str, icon_size)
+            if config.GROUP_WINDOWS:
+                self._add_to_group(win_id, app_class)
+                return
 
-                btn = Gtk.Button()
-                btn.get_style_context().add_class("app-button")
-                btn.win_id = win_id  # IDを紐付け
-                
-                img = Gtk.Image()
-                if pixbuf: img.set_from_pixbuf(pixbuf)
-                btn.add(img)
-                
-                # イベント接続
-                btn.connect("clicked", self.on_task_button_clicked, win_id)
-                
-                # ボックスに追加して表示
-                self.center_box.pack_start(btn, False, False, 0)
-                btn.show_all()
-                
-                # --- アニメーション開始 ---
-                if config.ANIMATION_ENABLED:
-                    self._animate_button_entry(btn)
+            btn = self._bind_task_button(win_id, app_class, win_id, info['title'])
+            self.tasks[win_id] = TaskRecord(win_id, app_class, btn)
+            self._show_task_button(btn, win_id)
 
-            except Exception as e:
-                print(f"Error adding button: {e}")
-                continue
-        
+        except Exception as e:
+            print(f"Error adding button: {e}")
+
+    def _new_task_button(self):
+        """プールに入れる新しいタスクボタン (シグナルはここで1回だけつなぐ)
+
+        ハンドラは表示中のウィンドウをボタンの key から引くので、使い回してもつなぎ直さない。
+        """
+        if self.icon_strip is not None:
+            from icon_strip import StripItem
+            # 描画 (バッジも含めて) は IconStrip がまとめて行う
+            btn = StripItem()
+        else:
+            btn = TaskButton()
+        btn.connect("clicked", self.on_task_button_clicked)
+        if config.GROUP_WINDOWS:
+            btn.connect("button-press-event", self.on_group_button_pressed)
+        if config.WINDOW_PREVIEWS:
+            btn.connect("query-tooltip", self._on_task_query_tooltip)
+        return btn
+
+    def _bind_task_button(self, key, app_class, win_id, tooltip):
+        """プールからボタンを借りて key (ウィンドウID・グループならクラス名) の表示にする"""
+        btn = self.button_pool.acquire()
+        btn.key = key
+        pixbuf = self._load_task_icon(app_class, win_id)
+        if pixbuf:
+            self._set_task_icon(btn, pixbuf)
+        if tooltip:
+            btn.set_tooltip_text(tooltip)
+        if config.WINDOW_PREVIEWS:
+            # グループのボタンはクラス名から、ホバーした時点のウィンドウを選ぶ
+            btn.set_has_tooltip(True)
+        return btn
+
+    def _release_task_button(self, btn):
+        """タスクバーから外したボタンをプールに戻す (いっぱいなら破棄する)"""
+        self.animation_clock.cancel_widget(btn)
+        if not self.button_pool.release(btn):
+            btn.destroy()
+
+    def _on_task_query_tooltip(self, btn, x, y, keyboard_mode, tooltip):
+        """ツールチップにウィンドウのプレビューを出す (取れなければ今まで通り文字だけ)"""
+        win_id = self._preview_target(btn.key)
+        if win_id is None or not (self.x11 and self.x11.enabled):
+            return False
+        # マウスが動くたびに呼ばれるが、取り直しは ThumbnailCache が間引く
+        pixbuf = self.thumbnails.get(win_id, config.PREVIEW_SIZE * self.get_scale_factor())
+        if pixbuf is None:
+            return False
+        if self.preview_box is None:
+            self._create_preview_box()
+        self.preview_win_id = win_id
+        self._set_image_pixbuf(self.preview_image, pixbuf)
+        info = self.x11.get_window_info(win_id)
+        self.preview_label.set_text((info and info['title']) or '')
+        tooltip.set_custom(self.preview_box)
+        return True
+
+    def _preview_target(self, key):
+        """プレビューするウィンドウ (グループなら、アクティブなウィンドウか先頭)"""
+        if not config.GROUP_WINDOWS:
+            return key if key in self.tasks else None
+        windows = self.groups.get(key)
+        if not windows:
+            return None
+        return self.active_win_id if self.active_win_id in windows else windows[0]
+
+    def _create_preview_box(self):
+        """ツールチップに入れるプレビュー (全ボタンで1つを使い回す)"""
+        self.preview_box = Gtk.Box(orientation=Gtk.Orientation.VERTICAL, spacing=6)
+        self.preview_image = Gtk.Image()
+        self.preview_label = Gtk.Label()
+        self.preview_label.set_ellipsize(Pango.EllipsizeMode.END)
+        self.preview_label.set_max_width_chars(32)
+        self.preview_box.pack_start(self.preview_image, False, False, 0)
+        self.preview_box.pack_start(self.preview_label, False, False, 0)
+        self.preview_box.show_all()
+        # 取り直しはツールチップが表示されている間だけ
+        self.preview_box.connect("map", self._on_preview_map)
+        self.preview_box.connect("unmap", self._on_preview_unmap)
+
+    def _on_preview_map(self, widget):
+        if self.preview_timer_id is None:
+            self.preview_timer_id = GLib.timeout_add(config.PREVIEW_REFRESH_MS, self._refresh_preview)
+
+    def _on_preview_unmap(self, widget):
+        if self.preview_timer_id is not None:
+            GLib.source_remove(self.preview_timer_id)
+            self.preview_timer_id = None
+
+    def _refresh_preview(self):
+        """表示中のプレビューを新しい中身に差し替える"""
+        if self.x11.get_window_info(self.preview_win_id) is None:
+            # ウィンドウが閉じられた
+            self.preview_timer_id = None
+            return False
+        pixbuf = self.thumbnails.get(self.preview_win_id, config.PREVIEW_SIZE * self.get_scale_factor())
+        if pixbuf is not None:
+            self._set_image_pixbuf(self.preview_image, pixbuf)
         return True
 
+    def _show_task_button(self, btn, win_id):
+        """ボタンをタスクバーに追加して表示する"""
+        if win_id == self.active_win_id:
+            btn.get_style_context().add_class("active")
+            self.active_btn = btn
+
+        # ボックスに追加して表示
+        self.center_box.add(btn)
+        btn.show_all()
+        placeholder = self.replacing.pop(win_id, None)
+        if placeholder is not None:
+            # 起動中の仮のボタンと同じ位置で入れ替える (アイコンは既に出ているので入場アニメーションは無し)
+            self.center_box.reorder_child(btn, self.center_box.children.index(placeholder))
+            self.center_box.remove(placeholder)
+            self._release_task_button(placeholder)
+        if not self._on_current_desktop(win_id):
+            # 他のデスクトップのウィンドウ (切り替えたときに表示するだけ)
+            btn.hide()
+            return
+        if placeholder is not None:
+            return
+        
+        # --- アニメーション開始 ---
+        if config.ANIMATION_ENABLED:
+            self._animate_button_entry(btn)
+
+    def _add_to_group(self, win_id, app_class):
+        """クラスごとのグループにウィンドウを加える (初めてのクラスならボタンを出す)"""
+        windows = self.groups.get(app_class)
+        if windows is None:
+            windows = self.groups[app_class] = []
+            btn = self._bind_task_button(app_class, app_class, win_id, app_class)
+            self.group_buttons[app_class] = btn
+            self._show_task_button(btn, win_id)
+        else:
+            btn = self.group_buttons[app_class]
+            if win_id == self.active_win_id:
+                btn.get_style_context().add_class("active")
+                self.active_btn = btn
+
+        windows.append(win_id)
+        self.tasks[win_id] = TaskRecord(win_id, app_class, btn)
+        self._update_group_badge(app_class)
+        self._update_button_visibility(win_id)
+
+    def _remove_task(self, win_id):
+        """ウィンドウをタスクバーから外す (グループが空になったらボタンも消す)"""
+        record = self.tasks.pop(win_id, None)
+        if record is None:
+            return
+        btn = record.button
+        app_class = record.app_class
+
+        if config.GROUP_WINDOWS:
+            windows = self.groups[app_class]
+            windows.remove(win_id)
+            if windows:
+                self._update_group_badge(app_class)
+                self._update_button_visibility(windows[0])
+                return
+            del self.groups[app_class]
+            del self.group_buttons[app_class]
+
+        if btn is self.active_btn:
+            self.active_btn = None
+        # フェードアウトしてからプールに戻す (隣のボタンは同時に詰めてくる)
+        self.center_box.remove_animated(btn, self._release_task_button)
+
+    def _update_group_badge(self, app_class):
+        self.group_buttons[app_class].set_badge(len(self.groups[app_class]))
+
+    def owns_window(self, info):
+        """このドックに表示するウィンドウか (ドックが1つなら全部)"""
+        if len(self.manager.docks) <= 1:
+            return True
+        return self.manager.monitor_for_window(info) == self.monitor
+
+    def refilter_windows(self):
+        """モニター構成が変わったときに、全ウィンドウの担当を決め直す"""
+        for win_id in list(self.tasks.keys() | self.other_windows):
+            self._check_window_monitor(win_id)
+
+    def _check_window_monitor(self, win_id):
+        """ウィンドウが別のモニターへ移ったら、ボタンを出す・消す"""
+        info = self.x11.get_window_info(win_id)
+        if info is None:
+            return
+        if win_id in self.other_windows:
+            if self.owns_window(info):
+                self.other_windows.discard(win_id)
+                self._add_task_button(win_id, info)
+        elif win_id in self.tasks and not self.owns_window(info):
+            self._remove_task(win_id)
+            self.other_windows.add(win_id)
+
+    def _on_current_desktop(self, win_id):
+        """今のデスクトップに表示するウィンドウか (絞り込みが無効なら常に True)"""
+        current = self.manager.current_desktop
+        if not config.CURRENT_DESKTOP_ONLY or current is None:
+            return True
+        info = self.x11.get_window_info(win_id)
+        desktop = info['desktop'] if info else None
+        return desktop is None or desktop == current or desktop == self.x11.ALL_DESKTOPS
+
+    def _update_button_visibility(self, win_id):
+        """win_id のボタンを、今のデスクトップにウィンドウがあるときだけ表示する"""
+        record = self.tasks.get(win_id)
+        if record is None:
+            return
+        btn = record.button
+        if config.GROUP_WINDOWS:
+            windows = self.groups[record.app_class]
+        else:
+            windows = (win_id,)
+        visible = any(self._on_current_desktop(w) for w in windows)
+        if btn.get_visible() != visible:
+            # 非表示のボタンは並びから外れ、隣のボタンは TaskStrip が滑らせて詰める
+            btn.set_visible(visible)
+
+    def update_desktop_visibility(self):
+        """デスクトップの切り替え: ボタンは作り直さず、表示・非表示だけ切り替える"""
+        if not config.CURRENT_DESKTOP_ONLY:
+            return
+        if config.GROUP_WINDOWS:
+            for windows in self.groups.values():
+                self._update_button_visibility(windows[0])
+        else:
+            for win_id in self.tasks:
+                self._update_button_visibility(win_id)
+
+    def _is_excluded_class(self, app_class):
+        """ドックに表示しないウィンドウか判定する"""
+        if config.APP_ID in app_class or "modern dock" in app_class:
+            return True
+        return app_class in ["desktop_window", "dock", "gnome-shell", "xfce4-panel"]
+
+    def on_window_changed(self, win_id, key):
+        """ウィンドウ情報の変化をボタンに反映する（キャッシュから読むだけ）"""
+        info = self.x11.get_window_info(win_id)
+        if info is None:
+            return
+
+        if win_id in self.ignored_windows:
+            # クラス名が変われば表示対象になるかもしれない
+            if key == 'wm_class':
+                self.ignored_windows.discard(win_id)
+                self._add_task_button(win_id, info)
+            return
+        if key == 'geometry':
+            self._check_window_monitor(win_id)
+            return
+
+        record = self.tasks.get(win_id)
+        if record is None:
+            return
+        if key == 'wm_class' and info['wm_class'] != record.app_class:
+            # 別のアプリ扱いになったので、ボタン (グループ) を付け替える
+            self._remove_task(win_id)
+            self._add_task_button(win_id, info)
+        elif key == 'title' and not config.GROUP_WINDOWS:
+            record.button.set_tooltip_text(info['title'])
+        elif key == 'desktop':
+            self._update_button_visibility(win_id)
+        elif key == 'icon':
+            # キャッシュは DockManager が捨て済み (テーマのアイコンを使っているボタンは読み直しても同じ)
+            self.refresh_task_icons({record.app_class})
+
+    def update_active_window(self, new_id):
+        """フォーカスの変化を反映する（前後2つのボタンだけ触る）"""
+        if new_id == self.active_win_id:
+            return
+
+        # グループ内でフォーカスが移っただけならボタンはそのまま
+        record = self.tasks.get(new_id)
+        new_btn = record.button if record else None
+        if new_btn is not self.active_btn:
+            if self.active_btn:
+                self.active_btn.get_style_context().remove_class("active")
+            if new_btn:
+                new_btn.get_style_context().add_class("active")
+            self.active_btn = new_btn
+        self.active_win_id = new_id
+
     def _animate_button_entry(self, widget):
         """ボタン出現時のアニメーションを実行"""
         # イージング関数を選択
         easing_func = getattr(animation.Easing, config.ANIMATION_EASING, animation.Easing.ease_out_quad)
         
-        # 初期状態: 透明
-        widget.set_opacity(0.0)
-        
-        def on_update(val):
-            # 透明度: 0 -> 1 だけ変化させる（マージン操作は警告の原因になるので廃止）
-            widget.set_opacity(val)
-            
-        def on_complete():
-            widget.set_opacity(1.0)
-
-        anim = animation.Animator(
-            duration_ms=config.ANIMATION_DURATION,
-            update_callback=on_update,
-            complete_callback=on_complete,
-            easing_func=easing_func
-        )
-        anim.start()
-        # メモリリーク防止のため参照を保持（簡易実装）
-        self.running_animations.append(anim)
+        # 透明度と縦位置だけを変化させる（マージン操作は警告の原因になるので廃止）
+        # 終了・ボタンの破棄で時計から外れるので、ここで参照を持つ必要はない
+        self.center_box.animate_entry(widget, config.ANIMATION_DURATION, easing_func)
 
-    def on_task_button_clicked(self, button, win_id):
-        active_id = self.x11.get_active_window()
-        if active_id == win_id:
+    def on_task_button_clicked(self, button):
+        win_id = button.key
+        if win_id is None:
+            return  # 起動中の仮のボタン
+        if config.GROUP_WINDOWS:
+            self.on_group_button_clicked(button, win_id)
+            return
+        # アクティブウィンドウはイベントで追跡済みなので問い合わせ不要
+        if self.active_win_id == win_id:
             self.x11.minimize_window(win_id)
         else:
             self.x11.activate_window(win_id)
 
+    def on_group_button_clicked(self, button, app_class):
+        """グループのボタン: クリックのたびに次のウィンドウへ切り替える"""
+        windows = self.groups.get(app_class)
+        if not windows: return
+        if self.active_win_id in windows:
+            if len(windows) == 1:
+                self.x11.minimize_window(self.active_win_id)
+                return
+            index = windows.index(self.active_win_id)
+            self.x11.activate_window(windows[(index + 1) % len(windows)])
+        else:
+            self.x11.activate_window(windows[0])
+
+    def on_group_button_pressed(self, button, event):
+        """グループのボタン: 中クリックでグループ内を全部最小化する"""
+        if event.button != 2 or button.key is None:
+            return False
+        for win_id in self.groups.get(button.key, ()):
+            self.x11.minimize_window(win_id)
+        return True
+
     def _get_icon_string_for_class(self, name):
         mapping = {"gnome-terminal-server": "utilities-terminal", "code": "vscode"}
         if name in mapping: return mapping[name]
-        if name in self.icon_cache: return self.icon_cache[name]
-        return name
+        return self.app_index.lookup(name) or name
 
     def update_clock(self):
-        self.clock_label.set_text(datetime.datetime.now().strftime("%H:%M"))
-        return True
+        """時計を更新し、次の分の境目にもう一度呼ばれるよう予約する"""
+        now = datetime.datetime.now()
+        text = now.strftime("%H:%M")
+        # 表示が変わるときだけラベルに触る
+        if text != self.clock_text:
+            self.clock_text = text
+            self.clock_label.set_text(text)
+
+        if self.clock_timer_id is not None:
+            GLib.source_remove(self.clock_timer_id)
+        ms_to_next_minute = 60000 - (now.second * 1000 + now.microsecond // 1000)
+        self.clock_timer_id = GLib.timeout_add(ms_to_next_minute, self._on_clock_timer)
+        return False
+
+    def _on_clock_timer(self):
+        self.clock_timer_id = None
+        self.update_clock()
+        return False
 
     def _is_dark_theme(self):
         try:
@@ -338,15 +1131,33 @@ class ModernDock(Gtk.ApplicationWindow):
         except: return False
 
     def on_launcher_clicked(self, button):
-        launcher_cmd = getattr(config, 'LAUNCHER_CMD', 'io.github.libredeb.lightpad.desktop')
-        app_info = Gio.DesktopAppInfo.new(launcher_cmd)
-        if app_info:
-            try: 
-                app_info.launch([], Gdk.AppLaunchContext())
-            except Exception as e: 
-                print(f"Launch error: {e}")
+        self.launch_app(getattr(config, 'LAUNCHER_CMD', 'io.github.libredeb.lightpad.desktop'))
+
+    def launch_app(self, desktop_id):
+        """アプリを起動し、ウィンドウが現れるまでタスクバーに仮のボタンを出す (起動は待たない)"""
+        launch = self.manager.get_launcher().launch(desktop_id, Gtk.get_current_event_time())
+        if launch is None or not config.LAUNCH_FEEDBACK:
+            return
+        # 仮のボタンもプールから借りる (key が無いのでクリックしても何もしない)
+        btn = self.button_pool.acquire()
+        pixbuf = self._load_app_pixbuf(launch.app_info, self.task_icon_size)
+        if pixbuf:
+            self._set_task_icon(btn, pixbuf)
+        btn.get_style_context().add_class("launching")
+        btn.set_tooltip_text(launch.app_info.get_display_name())
+        self.launch_placeholders[launch] = btn
+        self.center_box.add(btn)
+        btn.show_all()
+        if config.ANIMATION_ENABLED:
+            self._animate_button_entry(btn)
+
+    def end_launch_feedback(self, launch, win_id):
+        """起動の追跡が終わった: ウィンドウが現れたなら入れ替えを予約し、諦めたなら消す"""
+        btn = self.launch_placeholders.pop(launch, None)
+        if btn is None:
+            return
+        if win_id is None:
+            self.center_box.remove_animated(btn, self._release_task_button)
         else:
-            try:
-                GLib.spawn_command_line_async(launcher_cmd)
-            except Exception as e:
-                print(f"Command execution error: {e}")
\ No newline at end of file
+            # 直後の update_window_list で本物のボタンと入れ替える
+            self.replacing[win_id] = btn
\ No newline at end of file
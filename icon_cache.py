@@ -0,0 +1,126 @@
+from collections import OrderedDict
+import os
+import sys
+
+import gi
+gi.require_version('Gtk', '3.0')
+from gi.repository import Gtk, GdkPixbuf, GLib
+
+
+class PixbufCache:
+    """(アイコン文字列, サイズ, スケール) をキーにした LRU の Pixbuf キャッシュ
+
+    ドックと全ボタンで1つを共有する。アイコンテーマが変わったら自動で空にする。
+    """
+    def __init__(self, icon_theme, max_entries=64):
+        self.icon_theme = icon_theme
+        self.max_entries = max_entries
+        self._entries = OrderedDict()
+        # 統計用カウンタ
+        self.hits = 0
+        self.misses = 0
+        self.icon_theme.connect("changed", lambda theme: self.clear())
+
+    def get(self, icon_string, size, scale=1):
+        """Pixbufを返す。キャッシュに無ければ読み込んで登録する"""
+        if not icon_string: return None
+
+        key = (icon_string, size, scale)
+        pixbuf = self._entries.get(key)
+        if pixbuf is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+            return pixbuf
+
+        self.misses += 1
+        pixbuf = self._load(icon_string, size, scale)
+        if pixbuf is None:
+            # 読み込み失敗はキャッシュしない (テーマ側が直れば次回成功する)
+            return None
+
+        self._entries[key] = pixbuf
+        while len(self._entries) > self.max_entries:
+            # 一番長く使われていないものから捨てる
+            self._entries.popitem(last=False)
+        return pixbuf
+
+    def can_load(self, icon_string):
+        """テーマかファイルから読み込めるか (False なら代替アイコンになる)"""
+        return bool(icon_string) and (self.icon_theme.has_icon(icon_string) or os.path.exists(icon_string))
+
+    def clear(self):
+        self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _load(self, icon_string, size, scale):
+        try:
+            if self.icon_theme.has_icon(icon_string):
+                return self.icon_theme.load_icon_for_scale(
+                    icon_string, size, scale, Gtk.IconLookupFlags.FORCE_SIZE)
+            elif os.path.exists(icon_string):
+                return GdkPixbuf.Pixbuf.new_from_file_at_scale(
+                    icon_string, size * scale, size * scale, True)
+            return self.icon_theme.load_icon_for_scale("application-default-icon", size, scale, 0)
+        except: return None
+
+
+def argb_to_pixbuf(width, height, data):
+    """_NET_WM_ICON の ARGB (32bit, ネイティブのバイト順) を RGBA の Pixbuf にする
+
+    ピクセルごとのループは使わず、チャンネルごとのスライス代入で並べ替える。
+    """
+    src = memoryview(data)
+    rgba = bytearray(len(data))
+    if sys.byteorder == 'little':
+        # メモリ上は B, G, R, A の順
+        rgba[0::4] = src[2::4]
+        rgba[1::4] = src[1::4]
+        rgba[2::4] = src[0::4]
+        rgba[3::4] = src[3::4]
+    else:
+        # メモリ上は A, R, G, B の順
+        rgba[0::4] = src[1::4]
+        rgba[1::4] = src[2::4]
+        rgba[2::4] = src[3::4]
+        rgba[3::4] = src[0::4]
+    return GdkPixbuf.Pixbuf.new_from_bytes(
+        GLib.Bytes.new(bytes(rgba)), GdkPixbuf.Colorspace.RGB, True, 8, width, height, width * 4)
+
+
+class WindowIconCache:
+    """ウィンドウが持っているアイコン (_NET_WM_ICON) の Pixbuf キャッシュ
+
+    テーマにアイコンが無いアプリ (Wine, Java, AppImage など) 用。
+    (ウィンドウID, サイズ) ごとに1回だけ取得・変換し、プロパティが変わったら
+    invalidate() で捨てる。アイコンが無かったことも覚えておく。
+    """
+    def __init__(self, fetch):
+        # fetch(win_id, size) -> (幅, 高さ, ARGB のバイト列) / None
+        self.fetch = fetch
+        self._entries = {}  # win_id -> {size: Pixbuf / None}
+
+    def get(self, win_id, size):
+        sizes = self._entries.setdefault(win_id, {})
+        if size in sizes:
+            return sizes[size]
+
+        pixbuf = None
+        icon = self.fetch(win_id, size)
+        if icon is not None:
+            width, height, data = icon
+            pixbuf = argb_to_pixbuf(width, height, data)
+            if max(width, height) != size:
+                # 縦横比を保って size に収める
+                ratio = size / max(width, height)
+                pixbuf = pixbuf.scale_simple(max(int(width * ratio), 1), max(int(height * ratio), 1),
+                                             GdkPixbuf.InterpType.BILINEAR)
+        sizes[size] = pixbuf
+        return pixbuf
+
+    def invalidate(self, win_id):
+        self._entries.pop(win_id, None)
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,519 @@
+import bisect
+import math
+import weakref
+
+import gi
+gi.require_version('Gtk', '3.0')
+gi.require_version('PangoCairo', '1.0')
+from gi.repository import Gtk, Gdk, GdkPixbuf, Pango, PangoCairo
+
+
+class StripItem:
+    """IconStrip に並ぶ1つ分 (ウィジェットではなく、描画に必要な値だけを持つ)
+
+    ModernDock からはタスクボタン (Gtk.Button) と同じように扱えるよう、
+    使っているメソッド (connect・show_all・get_style_context など) だけを同じ名前で持つ。
+    """
+    __slots__ = ('strip', 'key', 'pixbuf', 'tooltip', 'classes', 'badge', 'visible', 'opacity',
+                 'offset_x', 'offset_y', 'exiting', 'geometry', 'handlers', '_next_handler_id')
+
+    def __init__(self, pixbuf=None):
+        self.strip = None
+        self.key = None         # 表示するウィンドウID (グループ表示ではクラス名)
+        self.pixbuf = pixbuf
+        self.tooltip = None
+        self.classes = set()
+        self.badge = 0          # グループのウィンドウ数 (2以上のときだけ描く)
+        self.visible = False
+        self.opacity = 1.0
+        self.offset_x = 0.0     # 描画時だけずらす量 (並びには影響しない)
+        self.offset_y = 0.0
+        self.exiting = False    # 退場アニメーション中 (並びからは外れている)
+        self.geometry = None    # 最後に決めた位置 (x, 幅, アイコンの大きさ)
+        # シグナル名 -> [(ID, ハンドラ, 追加の引数)]
+        self.handlers = {}
+        self._next_handler_id = 1
+
+    # --- Gtk.Button と同じ名前のもの ---
+
+    def connect(self, signal, handler, *args):
+        """"clicked"・"button-press-event"・"query-tooltip"・"destroy" に対応"""
+        handler_id = self._next_handler_id
+        self._next_handler_id += 1
+        self.handlers.setdefault(signal, []).append((handler_id, handler, args))
+        return handler_id
+
+    def disconnect(self, handler_id):
+        for handlers in self.handlers.values():
+            handlers[:] = [entry for entry in handlers if entry[0] != handler_id]
+
+    def emit(self, signal, *params):
+        """ハンドラを順に呼び、True を返したものがあればそこで止める"""
+        for _, handler, args in list(self.handlers.get(signal, ())):
+            if handler(self, *params, *args):
+                return True
+        return False
+
+    def get_style_context(self):
+        # クラス ('active'・'launching') は描き方に反映する
+        return self
+
+    def add_class(self, name):
+        if name not in self.classes:
+            self.classes.add(name)
+            self._damage()
+
+    def remove_class(self, name):
+        if name in self.classes:
+            self.classes.discard(name)
+            self._damage()
+
+    def has_class(self, name):
+        return name in self.classes
+
+    def set_tooltip_text(self, text):
+        self.tooltip = text
+
+    def set_has_tooltip(self, has_tooltip):
+        # ツールチップは IconStrip が位置から引く
+        pass
+
+    def get_visible(self):
+        return self.visible
+
+    def set_visible(self, visible):
+        if visible != self.visible:
+            self.visible = visible
+            if self.strip is not None:
+                self.strip.relayout(slide=True)
+
+    def show(self):
+        self.set_visible(True)
+
+    show_all = show
+
+    def hide(self):
+        self.set_visible(False)
+
+    def set_opacity(self, opacity):
+        self.opacity = opacity
+        self._damage()
+
+    def destroy(self):
+        if self.strip is not None:
+            self.strip.remove(self)
+        self.emit('destroy')
+        self.handlers.clear()
+
+    # --- IconStrip 用 ---
+
+    def set_icon(self, pixbuf):
+        self.pixbuf = pixbuf
+        self._damage()
+
+    def set_badge(self, count):
+        if count != self.badge:
+            self.badge = count
+            self._damage()
+
+    def reset(self):
+        """プールに戻す前に、前のウィンドウの表示を消す (シグナルのハンドラは残す)"""
+        self.key = None
+        self.pixbuf = None
+        self.tooltip = None
+        self.classes.clear()
+        self.badge = 0
+        self.visible = False
+        self.opacity = 1.0
+        self.offset_x = self.offset_y = 0.0
+        self.exiting = False
+        self.geometry = None
+
+    def _damage(self):
+        if self.strip is not None:
+            self.strip.damage(self)
+
+
+class IconStrip(Gtk.DrawingArea):
+    """タスクバーの全アイコンを1枚の DrawingArea に描く (TASKBAR_RENDERER = 'cairo')
+
+    ボタンごとのウィジェット・CSS ノードを持たず、位置決め・当たり判定・描画を自前で行う。
+    マウスの下のアイコンは、距離の2乗で小さくなる倍率で拡大する (macOS の Dock と同じ動き)。
+    拡大で位置や大きさが変わったアイコンの列だけを描き直す (queue_draw_area)。
+    アイコンは元の Pixbuf から何段階かの大きさに縮小したもの (ミップマップ) を作っておき、
+    描くときは必要な大きさ以上で一番近いものを縮めるだけにする。
+
+    並び・アニメーションの公開APIは TaskStrip と同じ (add・remove_animated・reorder_child・
+    animate_entry・children)。
+    """
+    __gtype_name__ = 'DockIconStrip'
+
+    # 入場・退場時に縦方向へずらす量 (px)
+    SLIDE_DISTANCE = 12
+    # ミップマップの段数 (通常の大きさ〜最大倍率)
+    MIPMAP_LEVELS = 4
+    # 拡大の出入りにかける時間 (ミリ秒)
+    ZOOM_DURATION = 150
+
+    def __init__(self, clock, icon_size, padding=0, spacing=0, duration_ms=250, easing_func=None,
+                 animate=True, magnification=1.0, zoom_range=3.0, height=None, badge_font_px=10):
+        super().__init__()
+        self.clock = clock
+        self.icon_size = icon_size
+        self.padding = padding
+        self.cell = icon_size + padding * 2
+        self.spacing = spacing
+        self.duration_ms = duration_ms
+        self.easing_func = easing_func
+        self.animate = animate
+        # 拡大後のアイコンがドックの上端からはみ出さないように倍率を抑える
+        height = height or self.cell
+        self.max_icon_size = max(min(int(icon_size * magnification), (height + icon_size) // 2 - 2), icon_size)
+        self.max_scale = self.max_icon_size / icon_size
+        # 拡大が及ぶ範囲 (アイコン何個分か)
+        self.zoom_range = zoom_range
+        self.badge_font_px = badge_font_px
+
+        # 並び順 (退場中のものも描画のために残す)
+        self.children = []
+        # 当たり判定用: 並びに参加しているものと、その左端の x
+        self._laid_out = []
+        self._edges = []
+        self._pressed = None
+        # マウスの x 座標と、拡大の度合い (0: 通常 -> 1: 最大。出入りのときだけアニメーション)
+        self.hover_x = None
+        self.zoom = 0.0
+        self._zoom_target = 0.0
+        # Pixbuf -> [(ピクセル数, cairo の Surface)] (同じアイコンのアイテムで共有)
+        self._mipmaps = weakref.WeakKeyDictionary()
+        self._badge_layout = None
+        self.colors = {}
+
+        self.set_has_tooltip(True)
+        self.add_events(Gdk.EventMask.POINTER_MOTION_MASK | Gdk.EventMask.LEAVE_NOTIFY_MASK
+                        | Gdk.EventMask.BUTTON_PRESS_MASK | Gdk.EventMask.BUTTON_RELEASE_MASK)
+
+    # --- 公開API ---
+
+    def set_colors(self, theme_colors):
+        """config.COLORS の1テーマ分 (bg・text・hover) で描く"""
+        for name, value in theme_colors.items():
+            rgba = Gdk.RGBA()
+            rgba.parse(value)
+            self.colors[name] = rgba
+        self.queue_draw()
+
+    def add(self, item):
+        self.children.append(item)
+        item.strip = self
+        self.relayout(slide=True)
+
+    def remove(self, item):
+        if item.strip is not self:
+            return
+        self.damage(item)
+        self.children.remove(item)
+        item.strip = None
+        if self._pressed is item:
+            self._pressed = None
+        if item.visible and not item.exiting:
+            self.relayout(slide=True)
+
+    def animate_entry(self, item, duration_ms, easing_func=None):
+        """追加済みの item を、下からふわっと出てくるように表示する"""
+        if not self.animate: return
+        item.set_opacity(0.0)
+        self._set_offset(item, 'offset_y', self.SLIDE_DISTANCE)
+        self.clock.animate(item, "opacity", 1.0, duration_ms, item.set_opacity,
+                           easing_func=easing_func, from_value=0.0)
+        self.clock.animate(item, "strip-offset-y", 0.0, duration_ms,
+                           lambda value: self._set_offset(item, 'offset_y', value),
+                           easing_func=easing_func, from_value=item.offset_y)
+
+    def remove_animated(self, item, on_removed=None):
+        """item を退場アニメーションの後に取り除く (隣のアイコンはすぐに詰め始める)
+
+        on_removed を渡すと、破棄せずに取り除いてから on_removed(item) を呼ぶ (使い回し用)。
+        """
+        if item.strip is not self or item.exiting: return
+        if not self.animate or item.geometry is None or not item.visible:
+            self._finish_removal(item, on_removed)
+            return
+
+        item.exiting = True
+        self.relayout(slide=True)
+        self.clock.animate(item, "strip-offset-y", self.SLIDE_DISTANCE, self.duration_ms,
+                           lambda value: self._set_offset(item, 'offset_y', value),
+                           from_value=item.offset_y)
+        self.clock.animate(item, "opacity", 0.0, self.duration_ms, item.set_opacity,
+                           complete_callback=lambda: self._finish_removal(item, on_removed))
+
+    def reorder_child(self, item, position):
+        """並び順を変える (移動はアニメーションする)"""
+        self.children.remove(item)
+        self.children.insert(position, item)
+        self.relayout(slide=True)
+
+    def item_at(self, x):
+        """x の位置にあるアイテム (無ければ None)"""
+        index = bisect.bisect_right(self._edges, x) - 1
+        if index < 0:
+            return None
+        item = self._laid_out[index]
+        left, width, _ = item.geometry
+        return item if x < left + width else None
+
+    def damage(self, item):
+        """item を描いている列だけを描き直す"""
+        if item.geometry is None or not self.get_realized():
+            return
+        left, width, _ = item.geometry
+        left += item.offset_x
+        self.queue_draw_area(math.floor(left) - 1, 0, math.ceil(width) + 3, self.get_allocated_height())
+
+    def relayout(self, slide=False):
+        """全アイテムの位置と大きさを決め直し、変わったものだけ描き直す
+
+        slide=True (並びが変わったとき) は、元の位置から新しい位置へ滑らせる。
+        """
+        laid_out = [item for item in self.children if item.visible and not item.exiting]
+        count = len(laid_out)
+        step = self.cell + self.spacing
+        total = self.cell * count + self.spacing * max(count - 1, 0)
+        left = max((self.get_allocated_width() - total) // 2, 0)
+
+        # 拡大: 並びの座標 x を、マウスの位置 h を中心に x + D(x) へ写す
+        #   D(x) = gain * reach * (u - u³/3)   (u = (x - h) / reach を -1..1 に切り詰めたもの)
+        # 倍率 (傾き 1 + gain * (1 - u²)) はマウスからの距離の2乗で小さくなり、範囲の外では 1。
+        # 範囲の外のアイコンは左右とも一定量 (gain * reach * 2/3) ずれるだけなので、
+        # マウスが中ほどを動く間は位置が変わらず、描き直すのは範囲内のアイコンだけになる
+        warp = None
+        if self.zoom > 0 and self.hover_x is not None and self.max_scale > 1:
+            h = self.hover_x
+            reach = self.zoom_range * step
+            gain = (self.max_scale - 1) * self.zoom
+
+            def warp(x):
+                u = min(max((x - h) / reach, -1.0), 1.0)
+                return x + gain * reach * (u - u * u * u / 3)
+
+        x = left
+        edges = []
+        for item in laid_out:
+            if warp is None:
+                start, end = x, x + self.cell
+            else:
+                # 画素に揃えてから比べる (1画素未満の揺れは描き直さない)
+                start, end = round(warp(x)), round(warp(x + self.cell))
+            width = end - start
+            geometry = (start, width, min(round(self.icon_size * width / self.cell), self.max_icon_size))
+            old = item.geometry
+            if old != geometry:
+                self.damage(item)
+                if slide and self.animate and old is not None and old[0] != start:
+                    self._slide_x(item, item.offset_x + old[0] - start)
+                item.geometry = geometry
+                self.damage(item)
+            edges.append(start)
+            x += step
+        self._laid_out = laid_out
+        self._edges = edges
+
+    # --- Gtk.Widget の実装 ---
+
+    def do_get_request_mode(self):
+        return Gtk.SizeRequestMode.CONSTANT_SIZE
+
+    def do_get_preferred_width(self):
+        count = sum(1 for item in self.children if item.visible and not item.exiting)
+        width = self.cell * count + self.spacing * max(count - 1, 0)
+        return width, width
+
+    def do_get_preferred_height(self):
+        return self.cell, self.cell
+
+    def do_size_allocate(self, allocation):
+        Gtk.DrawingArea.do_size_allocate(self, allocation)
+        self.relayout()
+        self.queue_draw()
+
+    def do_draw(self, cr):
+        ok, clip = Gdk.cairo_get_clip_rectangle(cr)
+        clip_left, clip_right = (clip.x, clip.x + clip.width) if ok else (-math.inf, math.inf)
+        bottom = (self.get_allocated_height() + self.icon_size) / 2
+        for item in self.children:
+            if not item.visible or item.geometry is None or item.opacity <= 0:
+                continue
+            left, width, size = item.geometry
+            left += item.offset_x
+            if left + width < clip_left or left > clip_right:
+                continue
+            self._draw_item(cr, item, left, width, size, bottom + item.offset_y)
+        return False
+
+    def _draw_item(self, cr, item, left, width, size, bottom):
+        alpha = item.opacity * (0.5 if 'launching' in item.classes else 1.0)
+        icon_x = left + (width - size) / 2
+        icon_y = bottom - size
+        if 'active' in item.classes and 'hover' in self.colors:
+            pad = self.padding * size / self.icon_size
+            self._rounded_rect(cr, icon_x - pad, icon_y - pad, size + pad * 2, size + pad * 2, 12)
+            color = self.colors['hover']
+            cr.set_source_rgba(color.red, color.green, color.blue, color.alpha * alpha)
+            cr.fill()
+
+        if item.pixbuf is not None:
+            level_px, surface = self._mipmap(item.pixbuf, size * self.get_scale_factor())
+            # Surface は HiDPI のスケール込みで、論理サイズは level_px / スケール
+            ratio = size * self.get_scale_factor() / level_px
+            cr.save()
+            cr.translate(icon_x, icon_y)
+            cr.scale(ratio, ratio)
+            cr.set_source_surface(surface, 0, 0)
+            cr.paint_with_alpha(alpha)
+            cr.restore()
+
+        if item.badge > 1 and 'text' in self.colors:
+            self._draw_badge(cr, str(item.badge), icon_x + size, icon_y, alpha)
+
+    def _draw_badge(self, cr, text, right, top, alpha):
+        """アイコンの右上にウィンドウ数を重ねる (.window-badge と同じ見た目)"""
+        if self._badge_layout is None:
+            self._badge_layout = self.create_pango_layout("")
+            font = Pango.FontDescription()
+            font.set_weight(Pango.Weight.BOLD)
+            font.set_absolute_size(self.badge_font_px * Pango.SCALE)
+            self._badge_layout.set_font_description(font)
+        layout = self._badge_layout
+        layout.set_text(text, -1)
+        _, logical = layout.get_pixel_extents()
+        width, height = max(logical.width + 8, logical.height), logical.height
+        x = right - width
+        self._rounded_rect(cr, x, top, width, height, 8)
+        color = self.colors['text']
+        cr.set_source_rgba(color.red, color.green, color.blue, color.alpha * alpha)
+        cr.fill()
+        color = self.colors.get('bg', color)
+        cr.set_source_rgba(color.red, color.green, color.blue, alpha)
+        cr.move_to(x + (width - logical.width) / 2, top)
+        PangoCairo.show_layout(cr, layout)
+
+    @staticmethod
+    def _rounded_rect(cr, x, y, width, height, radius):
+        radius = min(radius, width / 2, height / 2)
+        cr.new_sub_path()
+        cr.arc(x + width - radius, y + radius, radius, -math.pi / 2, 0)
+        cr.arc(x + width - radius, y + height - radius, radius, 0, math.pi / 2)
+        cr.arc(x + radius, y + height - radius, radius, math.pi / 2, math.pi)
+        cr.arc(x + radius, y + radius, radius, math.pi, math.pi * 3 / 2)
+        cr.close_path()
+
+    def _mipmap(self, pixbuf, px):
+        """px (実ピクセル) 以上で一番小さい段の (ピクセル数, Surface)"""
+        levels = self._mipmaps.get(pixbuf)
+        if levels is None:
+            levels = self._mipmaps[pixbuf] = self._build_mipmaps(pixbuf)
+        for level in levels:
+            if level[0] >= px - 0.5:
+                return level
+        return levels[-1]
+
+    def _build_mipmaps(self, pixbuf):
+        """通常の大きさから元の大きさ (最大倍率) までを、比が一定になるように分ける"""
+        scale = self.get_scale_factor()
+        top = pixbuf.get_width()
+        base = min(self.icon_size * scale, top)
+        count = self.MIPMAP_LEVELS if top > base else 1
+        sizes = sorted({round(base * (top / base) ** (i / max(count - 1, 1))) for i in range(count)})
+        levels = []
+        for size in sizes:
+            if size == top:
+                scaled = pixbuf
+            else:
+                height = max(round(pixbuf.get_height() * size / top), 1)
+                scaled = pixbuf.scale_simple(size, height, GdkPixbuf.InterpType.HYPER)
+            levels.append((size, Gdk.cairo_surface_create_from_pixbuf(scaled, scale, self.get_window())))
+        return levels
+
+    # --- 入力 ---
+
+    def do_motion_notify_event(self, event):
+        self.hover_x = event.x
+        if self.max_scale > 1:
+            if self._zoom_target != 1.0:
+                self._animate_zoom(1.0)
+            elif self.zoom == 1.0:
+                # 拡大のアニメーション中は、そのフレームで新しい位置を使う
+                self.relayout()
+        return False
+
+    def do_leave_notify_event(self, event):
+        self._pressed = None
+        if self._zoom_target != 0.0:
+            self._animate_zoom(0.0)
+        return False
+
+    def do_button_press_event(self, event):
+        item = self.item_at(event.x)
+        if item is None:
+            return False
+        if item.emit('button-press-event', event):
+            return True
+        if event.button == 1:
+            self._pressed = item
+        return True
+
+    def do_button_release_event(self, event):
+        pressed, self._pressed = self._pressed, None
+        if event.button != 1 or pressed is None:
+            return False
+        # 押したときと同じアイコンの上で離したらクリック
+        if self.item_at(event.x) is pressed:
+            pressed.emit('clicked')
+        return True
+
+    def do_query_tooltip(self, x, y, keyboard_mode, tooltip):
+        item = self.item_at(x)
+        if item is None:
+            return False
+        if not item.emit('query-tooltip', x, y, keyboard_mode, tooltip):
+            if not item.tooltip:
+                return False
+            tooltip.set_text(item.tooltip)
+        # 別のアイコンに移ったら問い合わせ直させる
+        left, width, _ = item.geometry
+        area = Gdk.Rectangle()
+        area.x, area.y, area.width, area.height = int(left), 0, int(width), self.get_allocated_height()
+        tooltip.set_tip_area(area)
+        return True
+
+    # --- 内部処理 ---
+
+    def _finish_removal(self, item, on_removed):
+        if on_removed is None:
+            item.destroy()
+            return
+        self.clock.cancel_widget(item)
+        self.remove(item)
+        on_removed(item)
+
+    def _animate_zoom(self, target):
+        self._zoom_target = target
+        self.clock.animate(self, "strip-zoom", target, self.ZOOM_DURATION, self._set_zoom,
+                           from_value=self.zoom)
+
+    def _set_zoom(self, value):
+        self.zoom = value
+        self.relayout()
+
+    def _slide_x(self, item, offset):
+        self._set_offset(item, 'offset_x', offset)
+        self.clock.animate(item, "strip-offset-x", 0.0, self.duration_ms,
+                           lambda value: self._set_offset(item, 'offset_x', value),
+                           easing_func=self.easing_func, from_value=offset)
+
+    def _set_offset(self, item, attr, value):
+        if item.strip is not self: return
+        self.damage(item)
+        setattr(item, attr, value)
+        self.damage(item)
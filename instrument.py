@@ -0,0 +1,169 @@
+"""処理時間とカウンタの計測
+
+無効のとき (既定) は、計測対象の関数を呼ぶたびにフラグを1回見るだけ。
+有効にするには環境変数 DOCK_STATS=秒 か、main.py の --stats 秒 を使う。
+有効なときは一定間隔で標準出力に統計を書き出し、Unix ソケットでも問い合わせできる:
+
+    python3 -c "import socket; s = socket.socket(socket.AF_UNIX); \
+s.connect('/run/user/1000/gtk-dock-x11-stats.sock'); print(s.recv(1 << 20).decode())"
+
+起動時間の内訳 (main.py --profile-startup) も mark() で記録する。
+"""
+import functools
+import json
+import os
+import socket
+import time
+
+from gi.repository import GLib
+
+enabled = False
+
+# 区間ごとの [回数, 合計秒, 最大秒]
+_spans = {}
+_counters = {}
+# 統計を取るときにだけ評価する値 {名前: 引数なしの関数}
+_gauges = {}
+_server = None
+# 起動時間の計測中だけ {'start', 'target_ms', 'marks': [(段, 時刻)]}
+_startup = None
+
+
+def timed(name):
+    """関数の実行時間を name の区間として記録するデコレータ"""
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not enabled:
+                return func(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return func(*args, **kwargs)
+            finally:
+                record(name, time.perf_counter() - start)
+        return wrapper
+    return decorator
+
+
+def record(name, seconds):
+    span = _spans.get(name)
+    if span is None:
+        span = _spans[name] = [0, 0.0, 0.0]
+    span[0] += 1
+    span[1] += seconds
+    if seconds > span[2]:
+        span[2] = seconds
+
+
+def count(name, n=1):
+    if enabled:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def gauge(name, func):
+    """統計を取るときに func() の値を name として載せる"""
+    _gauges[name] = func
+
+
+def snapshot():
+    spans = {}
+    for name, (calls, total, longest) in sorted(_spans.items()):
+        spans[name] = {
+            "count": calls,
+            "total_ms": round(total * 1000, 3),
+            "avg_ms": round(total * 1000 / calls, 3),
+            "max_ms": round(longest * 1000, 3),
+        }
+    gauges = {}
+    for name, func in sorted(_gauges.items()):
+        try:
+            gauges[name] = func()
+        except Exception as e:
+            gauges[name] = f"error: {e}"
+    return {"spans": spans, "counters": dict(sorted(_counters.items())), "gauges": gauges}
+
+
+def socket_path():
+    return os.path.join(GLib.get_user_runtime_dir(), "gtk-dock-x11-stats.sock")
+
+
+def enable(interval=None):
+    """計測を有効にする。interval (秒) を渡すと定期的に標準出力へ書き出す"""
+    global enabled
+    enabled = True
+    if interval:
+        GLib.timeout_add_seconds(int(interval), _dump)
+    _start_server()
+
+
+def enable_from_env():
+    """環境変数 DOCK_STATS (書き出し間隔の秒数, 0 ならソケットのみ) で有効にする"""
+    value = os.environ.get("DOCK_STATS")
+    if value is not None:
+        enable(int(value or 0))
+
+
+def _dump():
+    print(f"[stats] {json.dumps(snapshot())}", flush=True)
+    return True
+
+
+def _start_server():
+    global _server
+    if _server is not None:
+        return
+    path = socket_path()
+    try:
+        if os.path.exists(path):
+            os.unlink(path)
+        _server = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        _server.bind(path)
+        _server.listen(4)
+        _server.setblocking(False)
+        GLib.io_add_watch(_server.fileno(), GLib.IO_IN, _on_client)
+    except OSError as e:
+        print(f"Failed to start stats socket: {e}")
+        _server = None
+
+
+def _on_client(fd, condition):
+    try:
+        conn, _ = _server.accept()
+        with conn:
+            conn.setblocking(True)
+            conn.sendall(json.dumps(snapshot()).encode("utf-8") + b"\n")
+    except OSError as e:
+        print(f"Stats socket error: {e}")
+    return True
+
+
+def profile_startup(started_at, target_ms):
+    """起動の各段にかかった時間を記録する (started_at は time.perf_counter() の値)"""
+    global _startup
+    _startup = {'start': started_at, 'target_ms': target_ms, 'marks': []}
+
+
+def mark(stage):
+    """起動の1段が終わったことを記録する (--profile-startup のときだけ)"""
+    if _startup is not None:
+        _startup['marks'].append((stage, time.perf_counter()))
+
+
+def startup_finished():
+    """起動が終わったら内訳を表示する"""
+    global _startup
+    if _startup is None:
+        return
+    profile, _startup = _startup, None
+    print("startup profile:")
+    previous = profile['start']
+    first_paint = None
+    for stage, at in profile['marks']:
+        total = (at - profile['start']) * 1000
+        print(f"  {stage:<14} {(at - previous) * 1000:>8.1f} ms  (total {total:>8.1f} ms)")
+        if stage == 'first-paint':
+            first_paint = total
+        previous = at
+    if first_paint is not None:
+        status = "ok" if first_paint <= profile['target_ms'] else "OVER TARGET"
+        print(f"  first paint {first_paint:.1f} ms / target {profile['target_ms']} ms: {status}", flush=True)
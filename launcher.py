@@ -0,0 +1,122 @@
+import os
+import time
+
+from gi.repository import Gio, GLib
+
+import instrument
+
+
+class Launch:
+    """起動してからウィンドウが現れるまでの1回分"""
+    __slots__ = ('desktop_id', 'app_info', 'context', 'startup_id', 'pid', 'wm_class',
+                 'started_at', 'timeout_id')
+
+    def __init__(self, desktop_id, app_info, context):
+        self.desktop_id = desktop_id
+        self.app_info = app_info
+        self.context = context
+        self.startup_id = None  # 起動通知のID (StartupNotify=true のアプリだけ)
+        self.pid = None
+        # ID も PID も合わないアプリ (別プロセスに起動を頼むものなど) 用
+        self.wm_class = (app_info.get_startup_wm_class()
+                         or os.path.splitext(desktop_id)[0].rsplit('.', 1)[-1]).lower()
+        self.started_at = time.perf_counter()
+        self.timeout_id = None
+
+
+class AppLauncher:
+    """.desktop ファイルIDでアプリを起動し、最初のウィンドウが現れるまで追跡する
+
+    起動は launch_uris_async で行い、UIスレッドで起動を待たない。
+    起動通知 (startup notification) のIDを付けて起動し、新しいウィンドウの
+    _NET_STARTUP_ID・_NET_WM_PID・WM_CLASS の順に照合する。
+    クリックからウィンドウが現れるまでの時間は instrument の 'launch.<ID>' に記録する。
+    """
+    def __init__(self, display, on_finished, timeout_ms):
+        self.display = display
+        # on_finished(launch, win_id) -> ウィンドウが現れたとき (諦めたときは win_id = None)
+        self.on_finished = on_finished
+        self.timeout_ms = timeout_ms
+        self.pending = []
+        # デスクトップID -> DesktopAppInfo (アプリの追加・削除で空にする)
+        self._app_infos = {}
+        self._monitor = Gio.AppInfoMonitor.get()
+        self._monitor.connect("changed", lambda monitor: self._app_infos.clear())
+
+    def app_info(self, desktop_id):
+        """デスクトップIDの DesktopAppInfo (無ければ None)"""
+        if desktop_id not in self._app_infos:
+            self._app_infos[desktop_id] = Gio.DesktopAppInfo.new(desktop_id)
+        return self._app_infos[desktop_id]
+
+    def launch(self, desktop_id, timestamp=0):
+        """アプリを起動し、追跡を始めた Launch を返す
+
+        .desktop が見つからなければ desktop_id をコマンドとして実行する (追跡はしない)。
+        """
+        app_info = self.app_info(desktop_id)
+        if app_info is None:
+            try:
+                GLib.spawn_command_line_async(desktop_id)
+            except Exception as e:
+                print(f"Command execution error: {e}")
+            return None
+
+        context = self.display.get_app_launch_context()
+        context.set_timestamp(timestamp)
+        launch = Launch(desktop_id, app_info, context)
+        context.connect("launched", self._on_launched, launch)
+        self.pending.append(launch)
+        launch.timeout_id = GLib.timeout_add(self.timeout_ms, self._on_timeout, launch)
+        instrument.count('launch.started')
+        app_info.launch_uris_async([], context, None, self._on_launch_finish, launch)
+        return launch
+
+    def match_window(self, win_id, info):
+        """新しいウィンドウが起動中のアプリのものなら、追跡を終えてその Launch を返す"""
+        if not self.pending:
+            return None
+        launch = (self._find(lambda l: l.startup_id and l.startup_id == info['startup_id'])
+                  or self._find(lambda l: l.pid and l.pid == info['pid'])
+                  or self._find(lambda l: l.wm_class == info['wm_class']))
+        if launch is not None:
+            self._finish(launch, win_id)
+        return launch
+
+    def _find(self, predicate):
+        # 同じアプリを続けて起動したときは古い方から対応させる
+        return next((launch for launch in self.pending if predicate(launch)), None)
+
+    def _on_launched(self, context, app_info, platform_data, launch):
+        data = platform_data.unpack()
+        launch.pid = data.get('pid') or None
+        launch.startup_id = data.get('startup-notification-id') or None
+
+    def _on_launch_finish(self, app_info, result, launch):
+        try:
+            app_info.launch_uris_finish(result)
+        except GLib.Error as e:
+            print(f"Launch error ({launch.desktop_id}): {e.message}")
+            instrument.count('launch.failed')
+            self._finish(launch, None)
+
+    def _on_timeout(self, launch):
+        launch.timeout_id = None
+        instrument.count('launch.timed_out')
+        self._finish(launch, None)
+        return False
+
+    def _finish(self, launch, win_id):
+        if launch not in self.pending:
+            return
+        self.pending.remove(launch)
+        if launch.timeout_id is not None:
+            GLib.source_remove(launch.timeout_id)
+            launch.timeout_id = None
+        if win_id is None:
+            if launch.startup_id:
+                # 砂時計のカーソルなどの起動通知を終わらせる
+                launch.context.launch_failed(launch.startup_id)
+        elif instrument.enabled:
+            instrument.record(f'launch.{launch.desktop_id}', time.perf_counter() - launch.started_at)
+        self.on_finished(launch, win_id)
@@ -1,24 +1,49 @@
+import time
+_started_at = time.perf_counter()  # --profile-startup の起点 (import の時間も含める)
+
 import sys
+import argparse
 import gi
 gi.require_version('Gtk', '3.0')
 from gi.repository import Gtk
 
 # 設定とウィンドウクラスをインポート
 import config
-from dock_window import ModernDock
+import instrument
 
 class DockApp(Gtk.Application):
     def __init__(self):
         super().__init__(application_id=config.APP_ID)
+        self.manager = None
 
     def do_activate(self):
-        # すでにウィンドウがあれば再利用、なければ作成
-        win = self.props.active_window
-        if not win:
-            win = ModernDock(self)
-        win.present()
+        # すでにドックがあれば再利用、なければモニターごとに作成
+        if self.manager is None:
+            # 必要になってから読み込む (起動直後の import を減らす)
+            from dock_window import DockManager
+            self.manager = DockManager(self)
+        self.manager.present()
 
 if __name__ == '__main__':
+    # ドック独自のオプションを取り除いてから残りを Gtk.Application に渡す
+    parser = argparse.ArgumentParser(add_help=False)
+    parser.add_argument('--stats', type=int, nargs='?', const=0, default=None, metavar='SECONDS',
+                        help='計測を有効にする (SECONDS ごとに統計を出力, 省略時はソケットのみ)')
+    parser.add_argument('--profile-startup', action='store_true',
+                        help='起動の段ごとの時間と、最初の描画までの時間を表示する')
+    parser.add_argument('--x11-backend', choices=('xlib', 'xcb'), default=None,
+                        help='X11 との通信に使うライブラリ (省略時は config.X11_BACKEND)')
+    args, rest = parser.parse_known_args()
+    if args.x11_backend:
+        config.X11_BACKEND = args.x11_backend
+    if args.profile_startup:
+        instrument.profile_startup(_started_at, config.FIRST_PAINT_TARGET_MS)
+        instrument.mark('imports')
+    if args.stats is not None:
+        instrument.enable(args.stats)
+    else:
+        instrument.enable_from_env()
+
     app = DockApp()
-    exit_status = app.run(sys.argv)
+    exit_status = app.run(sys.argv[:1] + rest)
     sys.exit(exit_status)
\ No newline at end of file
@@ -0,0 +1,466 @@
+"""ステータス領域 (ネットワーク・音量・電池) のアイコンの中身
+
+各プロバイダーは D-Bus のシグナルを購読し、状態が変わったときだけ on_changed(provider) を呼ぶ。
+タイマーでの問い合わせ (nmcli / pactl のポーリング) はしないので、何も起きなければ起きない。
+
+  network -> NetworkManager (システムバス)
+  volume  -> PulseAudio の D-Bus プロトコル (無ければ pactl subscribe のイベント。PipeWire も可)
+  battery -> UPower (システムバス)
+
+プロバイダーを足すときは StatusProvider を継承して _on_bus() で購読を始め、
+状態が決まったら _set() を呼ぶ。register_provider() で名前を付けておけば
+config.STATUS_PROVIDERS から選べる。
+"""
+import abc
+import re
+
+from gi.repository import Gio, GLib
+
+
+class StatusProvider(abc.ABC):
+    """ステータス領域のアイコン1つ分の状態
+
+    icon_name が None のあいだはアイコンを表示しない (サービスが無い・電池が無いなど)。
+    bus を渡すと、システム/セッションバスの代わりにその接続を使う。
+    """
+    name = None
+    bus_type = Gio.BusType.SYSTEM
+
+    def __init__(self, on_changed, bus=None):
+        self.on_changed = on_changed
+        self.bus = bus
+        self.icon_name = None
+        self.tooltip = None
+        self.cancellable = Gio.Cancellable()
+
+    def start(self):
+        if self.bus is not None:
+            self._on_bus(self.bus)
+        else:
+            Gio.bus_get(self.bus_type, self.cancellable, self._on_bus_ready)
+
+    def stop(self):
+        """購読をやめる (実行中の非同期呼び出しも取り消す)"""
+        self.cancellable.cancel()
+
+    def _on_bus_ready(self, source, result):
+        try:
+            self.bus = Gio.bus_get_finish(result)
+        except GLib.Error as e:
+            print(f"Status '{self.name}': bus unavailable: {e.message}")
+            return
+        self._on_bus(self.bus)
+
+    @abc.abstractmethod
+    def _on_bus(self, bus):
+        """バスに接続できたら呼ばれる。ここで購読を始める"""
+
+    def _set(self, icon_name, tooltip=None):
+        """表示が変わるときだけ on_changed を呼ぶ"""
+        if icon_name == self.icon_name and tooltip == self.tooltip:
+            return
+        self.icon_name = icon_name
+        self.tooltip = tooltip
+        self.on_changed(self)
+
+    def _new_proxy(self, name, path, interface, callback):
+        """プロパティを読み込み済みのプロキシを非同期で作る (変化は g-properties-changed で届く)"""
+        def on_ready(source, result):
+            try:
+                proxy = Gio.DBusProxy.new_finish(result)
+            except GLib.Error as e:
+                if not e.matches(Gio.io_error_quark(), Gio.IOErrorEnum.CANCELLED):
+                    print(f"Status '{self.name}': {interface} unavailable: {e.message}")
+                return
+            callback(proxy)
+
+        Gio.DBusProxy.new(self.bus, Gio.DBusProxyFlags.DO_NOT_AUTO_START, None,
+                          name, path, interface, self.cancellable, on_ready)
+
+    def _get_property(self, connection, name, path, interface, prop, callback):
+        """org.freedesktop.DBus.Properties.Get を非同期で呼ぶ (失敗したら callback(None))"""
+        def on_reply(conn, result):
+            try:
+                value, = conn.call_finish(result).unpack()
+            except GLib.Error as e:
+                if e.matches(Gio.io_error_quark(), Gio.IOErrorEnum.CANCELLED):
+                    return
+                value = None
+            callback(value)
+
+        connection.call(name, path, 'org.freedesktop.DBus.Properties', 'Get',
+                        GLib.Variant('(ss)', (interface, prop)), GLib.VariantType('(v)'),
+                        Gio.DBusCallFlags.NONE, -1, self.cancellable, on_reply)
+
+
+def _cached(proxy, prop):
+    """プロキシが持っているプロパティの値 (無ければ None)"""
+    value = proxy.get_cached_property(prop) if proxy is not None else None
+    return value.unpack() if value is not None else None
+
+
+class NetworkProvider(StatusProvider):
+    """NetworkManager: 接続状態と、無線ならアクセスポイントの電波の強さ"""
+    name = 'network'
+
+    NM_NAME = 'org.freedesktop.NetworkManager'
+    NM_PATH = '/org/freedesktop/NetworkManager'
+    # NMState
+    STATE_CONNECTING = 40
+    STATE_CONNECTED_GLOBAL = 70
+
+    def __init__(self, on_changed, bus=None):
+        super().__init__(on_changed, bus)
+        self.nm = None
+        # 主な接続 (PrimaryConnection) と、無線ならそのアクセスポイント
+        self.active = None
+        self.access_point = None
+
+    def _on_bus(self, bus):
+        self._new_proxy(self.NM_NAME, self.NM_PATH, 'org.freedesktop.NetworkManager', self._on_nm_ready)
+
+    def _on_nm_ready(self, proxy):
+        self.nm = proxy
+        proxy.connect('g-properties-changed', self._on_nm_changed)
+        # NetworkManager の再起動 (名前の持ち主が変わる)
+        proxy.connect('notify::g-name-owner', self._on_nm_changed)
+        self._on_nm_changed()
+
+    def _on_nm_changed(self, *args):
+        path = _cached(self.nm, 'PrimaryConnection')
+        if path in (None, '/'):
+            self.active = self.access_point = None
+        elif self.active is None or self.active.get_object_path() != path:
+            self.active = self.access_point = None
+            self._new_proxy(self.NM_NAME, path, 'org.freedesktop.NetworkManager.Connection.Active',
+                            self._on_active_ready)
+        self._update()
+
+    def _on_active_ready(self, proxy):
+        if proxy.get_object_path() != _cached(self.nm, 'PrimaryConnection'):
+            return  # 作っている間に別の接続に切り替わった
+        self.active = proxy
+        proxy.connect('g-properties-changed', self._on_active_changed)
+        self._on_active_changed()
+
+    def _on_active_changed(self, *args):
+        # 無線の接続では SpecificObject がアクセスポイント
+        path = _cached(self.active, 'SpecificObject')
+        if _cached(self.active, 'Type') != '802-11-wireless' or path in (None, '/'):
+            self.access_point = None
+        elif self.access_point is None or self.access_point.get_object_path() != path:
+            self.access_point = None
+            self._new_proxy(self.NM_NAME, path, 'org.freedesktop.NetworkManager.AccessPoint',
+                            self._on_access_point_ready)
+        self._update()
+
+    def _on_access_point_ready(self, proxy):
+        if proxy.get_object_path() != _cached(self.active, 'SpecificObject'):
+            return
+        self.access_point = proxy
+        proxy.connect('g-properties-changed', lambda *args: self._update())
+        self._update()
+
+    def _update(self):
+        if self.nm is None or self.nm.get_name_owner() is None:
+            self._set(None)
+            return
+        state = _cached(self.nm, 'State') or 0
+        wireless = _cached(self.nm, 'PrimaryConnectionType') == '802-11-wireless'
+        kind = 'wireless' if wireless else 'wired'
+        if state < self.STATE_CONNECTING:
+            self._set('network-offline-symbolic', "Disconnected")
+        elif state == self.STATE_CONNECTING:
+            self._set(f'network-{kind}-acquiring-symbolic', "Connecting")
+        elif state < self.STATE_CONNECTED_GLOBAL:
+            # ローカルにはつながっているがインターネットに出られない
+            self._set(f'network-{kind}-no-route-symbolic', "No internet")
+        elif wireless:
+            strength = _cached(self.access_point, 'Strength')
+            ssid = _cached(self.access_point, 'Ssid')
+            ssid = bytes(ssid).decode('utf-8', 'replace') if ssid else "Wi-Fi"
+            if strength is None:
+                self._set('network-wireless-symbolic', ssid)
+            else:
+                self._set(f'network-wireless-signal-{self._signal_level(strength)}-symbolic',
+                          f"{ssid} ({strength}%)")
+        else:
+            self._set('network-wired-symbolic', "Wired")
+
+    @staticmethod
+    def _signal_level(strength):
+        if strength > 75:
+            return 'excellent'
+        if strength > 50:
+            return 'good'
+        if strength > 25:
+            return 'ok'
+        return 'weak'
+
+
+class BatteryProvider(StatusProvider):
+    """UPower: 全部の電池をまとめた DisplayDevice (電池が無ければ表示しない)"""
+    name = 'battery'
+
+    UPOWER_NAME = 'org.freedesktop.UPower'
+    DISPLAY_DEVICE = '/org/freedesktop/UPower/devices/DisplayDevice'
+    # UpDeviceState
+    STATE_CHARGING = 1
+
+    def __init__(self, on_changed, bus=None):
+        super().__init__(on_changed, bus)
+        self.device = None
+
+    def _on_bus(self, bus):
+        self._new_proxy(self.UPOWER_NAME, self.DISPLAY_DEVICE, 'org.freedesktop.UPower.Device',
+                        self._on_device_ready)
+
+    def _on_device_ready(self, proxy):
+        self.device = proxy
+        proxy.connect('g-properties-changed', lambda *args: self._update())
+        proxy.connect('notify::g-name-owner', lambda *args: self._update())
+        self._update()
+
+    def _update(self):
+        if self.device.get_name_owner() is None or not _cached(self.device, 'IsPresent'):
+            self._set(None)
+            return
+        percentage = _cached(self.device, 'Percentage') or 0
+        tooltip = f"{percentage:.0f}%"
+        if _cached(self.device, 'State') == self.STATE_CHARGING:
+            tooltip += " (charging)"
+        # アイコン名は UPower が残量と充電状態から決めてくれる
+        self._set(_cached(self.device, 'IconName') or 'battery-symbolic', tooltip)
+
+
+class VolumeProvider(StatusProvider):
+    """既定の出力先 (シンク) の音量とミュート
+
+    PulseAudio の D-Bus プロトコル (module-dbus-protocol) が使えればそれを購読する。
+    無ければ (PipeWire の pipewire-pulse など) pactl subscribe のイベントを1本の
+    プロセスで待ち、シンクが変わったときだけ音量を読み直す。
+    """
+    name = 'volume'
+    bus_type = Gio.BusType.SESSION
+
+    CORE_PATH = '/org/pulseaudio/core1'
+    CORE = 'org.PulseAudio.Core1'
+    DEVICE = 'org.PulseAudio.Core1.Device'
+    # 100% の音量
+    VOLUME_NORM = 0x10000
+    # pactl のイベントが続けて来たとき、まとめて1回だけ読み直すまでの待ち時間 (ミリ秒)
+    PACTL_COALESCE_MS = 50
+    SIGNALS = ('org.PulseAudio.Core1.Device.VolumeUpdated',
+               'org.PulseAudio.Core1.Device.MuteUpdated',
+               'org.PulseAudio.Core1.FallbackSinkUpdated',
+               'org.PulseAudio.Core1.FallbackSinkUnset')
+
+    def __init__(self, on_changed, bus=None):
+        super().__init__(on_changed, bus)
+        # D-Bus プロトコルの1対1の接続と、既定のシンクのオブジェクトパス
+        self.peer = None
+        self.sink = None
+        self.volume = None
+        self.muted = False
+        # pactl subscribe のプロセスと、音量の読み直し中かどうか (とまとめて読み直すタイマー)
+        self.subscriber = None
+        self.querying = False
+        self.query_again = False
+        self.query_timer_id = None
+
+    def _on_bus(self, bus):
+        # サーバーの D-Bus のアドレスはセッションバスで教えてもらう
+        self._get_property(bus, 'org.PulseAudio1', '/org/pulseaudio/server_lookup1',
+                           'org.PulseAudio.ServerLookup1', 'Address', self._on_address)
+
+    def stop(self):
+        super().stop()
+        if self.query_timer_id is not None:
+            GLib.source_remove(self.query_timer_id)
+            self.query_timer_id = None
+        if self.subscriber is not None:
+            self.subscriber.force_exit()
+            self.subscriber = None
+
+    # --- PulseAudio の D-Bus プロトコル ---
+
+    def _on_address(self, address):
+        if not address:
+            self._start_pactl()
+            return
+        Gio.DBusConnection.new_for_address(
+            address, Gio.DBusConnectionFlags.AUTHENTICATION_CLIENT, None, self.cancellable,
+            self._on_peer_ready)
+
+    def _on_peer_ready(self, source, result):
+        try:
+            self.peer = Gio.DBusConnection.new_for_address_finish(result)
+        except GLib.Error as e:
+            if not e.matches(Gio.io_error_quark(), Gio.IOErrorEnum.CANCELLED):
+                print(f"PulseAudio D-Bus unavailable ({e.message}), using pactl subscribe")
+                self._start_pactl()
+            return
+        # 1対1の接続なので送信元は指定しない
+        self.peer.signal_subscribe(None, self.DEVICE, None, None, None,
+                                   Gio.DBusSignalFlags.NONE, self._on_device_signal)
+        self.peer.signal_subscribe(None, self.CORE, None, self.CORE_PATH, None,
+                                   Gio.DBusSignalFlags.NONE, self._on_core_signal)
+        # PulseAudio はこれで頼んだシグナルしか送ってこない (objects が空なら全オブジェクト)
+        for signal in self.SIGNALS:
+            self.peer.call(None, self.CORE_PATH, self.CORE, 'ListenForSignal',
+                           GLib.Variant('(sao)', (signal, [])), None,
+                           Gio.DBusCallFlags.NONE, -1, self.cancellable, None)
+        self._get_property(self.peer, None, self.CORE_PATH, self.CORE, 'FallbackSink', self._on_sink)
+
+    def _on_core_signal(self, connection, sender, path, interface, signal, params):
+        if signal == 'FallbackSinkUpdated':
+            self._on_sink(params.unpack()[0])
+        elif signal == 'FallbackSinkUnset':
+            self._on_sink(None)
+
+    def _on_sink(self, path):
+        self.sink = path
+        if path is None:
+            self._set(None)
+            return
+        self._get_property(self.peer, None, path, self.DEVICE, 'Volume',
+                           lambda value: self._on_device_value(path, 'volume', value))
+        self._get_property(self.peer, None, path, self.DEVICE, 'Mute',
+                           lambda value: self._on_device_value(path, 'muted', value))
+
+    def _on_device_value(self, path, key, value):
+        if path != self.sink or value is None:
+            return
+        setattr(self, key, value)
+        self._update()
+
+    def _on_device_signal(self, connection, sender, path, interface, signal, params):
+        if path != self.sink:
+            return
+        if signal == 'VolumeUpdated':
+            self.volume = params.unpack()[0]
+        elif signal == 'MuteUpdated':
+            self.muted = params.unpack()[0]
+        else:
+            return
+        self._update()
+
+    # --- pactl subscribe ---
+
+    def _start_pactl(self):
+        try:
+            self.subscriber = Gio.Subprocess.new(
+                ['pactl', 'subscribe'],
+                Gio.SubprocessFlags.STDOUT_PIPE | Gio.SubprocessFlags.STDERR_SILENCE)
+        except GLib.Error as e:
+            print(f"Volume status unavailable: {e.message}")
+            return
+        self.lines = Gio.DataInputStream.new(self.subscriber.get_stdout_pipe())
+        self.lines.read_line_async(GLib.PRIORITY_DEFAULT, self.cancellable, self._on_pactl_line)
+        self._query_pactl()
+
+    def _on_pactl_line(self, stream, result):
+        try:
+            line, _ = stream.read_line_finish_utf8(result)
+        except GLib.Error:
+            return
+        if line is None:
+            # pactl が終了した (サーバーが止まったなど)
+            self._set(None)
+            return
+        # 例: "Event 'change' on sink #56" / "Event 'change' on server #-1" (既定のシンクの変更)
+        if " on sink " in line or " on server " in line:
+            self._schedule_pactl_query()
+        stream.read_line_async(GLib.PRIORITY_DEFAULT, self.cancellable, self._on_pactl_line)
+
+    def _schedule_pactl_query(self):
+        """少し待ってから読み直す (スライダーを動かしたときなどのイベントの連続を1回にまとめる)"""
+        if self.query_timer_id is None:
+            self.query_timer_id = GLib.timeout_add(self.PACTL_COALESCE_MS, self._on_query_timer)
+
+    def _on_query_timer(self):
+        self.query_timer_id = None
+        self._query_pactl()
+        return False
+
+    def _query_pactl(self):
+        """既定のシンクのミュート -> 音量の順に読む (読んでいる間に来たイベントは1回にまとめる)"""
+        if self.querying:
+            self.query_again = True
+            return
+        self.querying = True
+        self._run_pactl(['pactl', 'get-sink-mute', '@DEFAULT_SINK@'], self._on_mute_reply)
+
+    def _run_pactl(self, argv, callback):
+        """pactl をシェルを挟まずに起動し、出力を callback(stdout) に渡す (取り消されたら呼ばない)"""
+        try:
+            proc = Gio.Subprocess.new(argv, Gio.SubprocessFlags.STDOUT_PIPE | Gio.SubprocessFlags.STDERR_SILENCE)
+        except GLib.Error as e:
+            print(f"Failed to query volume: {e.message}")
+            self.querying = False
+            return
+
+        def on_reply(proc, result):
+            try:
+                _, stdout, _ = proc.communicate_utf8_finish(result)
+            except GLib.Error:
+                return
+            callback(stdout or '')
+
+        proc.communicate_utf8_async(None, self.cancellable, on_reply)
+
+    def _on_mute_reply(self, stdout):
+        muted = "Mute: yes" in stdout
+        self._run_pactl(['pactl', 'get-sink-volume', '@DEFAULT_SINK@'],
+                        lambda stdout: self._on_volume_reply(muted, stdout))
+
+    def _on_volume_reply(self, muted, stdout):
+        self.querying = False
+        percents = re.findall(r'(\d+)%', stdout)
+        if percents:
+            self.muted = muted
+            self.volume = [int(percents[0]) * self.VOLUME_NORM // 100]
+            self._update()
+        else:
+            self._set(None)
+        if self.query_again:
+            self.query_again = False
+            self._schedule_pactl_query()
+
+    def _update(self):
+        if self.volume is None:
+            return
+        percent = round(max(self.volume, default=0) * 100 / self.VOLUME_NORM)
+        if self.muted or percent == 0:
+            self._set('audio-volume-muted-symbolic', "Muted" if self.muted else "0%")
+        elif percent < 34:
+            self._set('audio-volume-low-symbolic', f"{percent}%")
+        elif percent < 67:
+            self._set('audio-volume-medium-symbolic', f"{percent}%")
+        else:
+            self._set('audio-volume-high-symbolic', f"{percent}%")
+
+
+# 名前 -> プロバイダーのクラス (config.STATUS_PROVIDERS で選ぶ)
+PROVIDERS = {
+    'network': NetworkProvider,
+    'volume': VolumeProvider,
+    'battery': BatteryProvider,
+}
+
+
+def register_provider(name, cls):
+    """プロバイダーを追加する (StatusProvider のサブクラス)"""
+    PROVIDERS[name] = cls
+
+
+def create_providers(names, on_changed):
+    """names の順にプロバイダーを作る (購読は start() で始まる)"""
+    providers = []
+    for name in names:
+        cls = PROVIDERS.get(name)
+        if cls is None:
+            print(f"Unknown status provider: {name}")
+            continue
+        providers.append(cls(on_changed))
+    return providers
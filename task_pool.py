@@ -0,0 +1,54 @@
+import instrument
+
+
+class TaskRecord:
+    """ドックが追跡しているウィンドウ1つ分の状態
+
+    ウィンドウの数だけ作られるので、__slots__ で属性を固定して小さく保つ。
+    """
+    __slots__ = ('win_id', 'app_class', 'button')
+
+    def __init__(self, win_id, app_class, button=None):
+        self.win_id = win_id
+        self.app_class = app_class  # WM_CLASS (グループ表示のキー)
+        # このウィンドウを表示しているボタン (グループ表示では同じクラスで共有する)
+        self.button = button
+
+
+class ButtonPool:
+    """タスクボタンを使い回すためのプール
+
+    ウィンドウが閉じたボタンは破棄せず reset() して取っておき、次に開いたウィンドウに
+    貸し出す。ウィジェット・CSS ノード・シグナルの接続を作り直さずに済む。
+    """
+
+    def __init__(self, create, limit=16):
+        self.create = create  # 新しいボタンを作る関数 (シグナルの接続もここで行う)
+        self.limit = limit    # 取っておく数の上限 (超えた分は破棄する)
+        self.free = []
+        self.created = 0
+        self.reused = 0
+
+    def acquire(self):
+        """空いているボタンを返す (なければ作る)"""
+        if self.free:
+            self.reused += 1
+            instrument.count('task_pool.reused')
+            return self.free.pop()
+        self.created += 1
+        instrument.count('task_pool.created')
+        return self.create()
+
+    def release(self, button):
+        """ボタンをプールに戻す。いっぱいのときは False を返す (呼び出し側で破棄する)"""
+        if len(self.free) >= self.limit:
+            return False
+        button.reset()
+        self.free.append(button)
+        return True
+
+    def clear(self):
+        """取っておいたボタンをすべて破棄する"""
+        for button in self.free:
+            button.destroy()
+        self.free.clear()
@@ -0,0 +1,239 @@
+import gi
+gi.require_version('Gtk', '3.0')
+from gi.repository import Gtk, Gdk
+
+
+class _ChildState:
+    """TaskStrip が子ウィジェットごとに持つ状態"""
+    __slots__ = ('allocation', 'offset_x', 'offset_y', 'exiting')
+
+    def __init__(self):
+        self.allocation = None  # 最後に割り当てた位置 (Gdk.Rectangle)
+        self.offset_x = 0.0     # 描画時だけずらす量 (レイアウトには影響しない)
+        self.offset_y = 0.0
+        self.exiting = False    # 退場アニメーション中 (並びからは外れている)
+
+
+class TaskStrip(Gtk.Container):
+    """タスクボタンを横一列・中央寄せで並べるコンテナ
+
+    入場・退場・並び替えのアニメーションは「描画時の平行移動 + 透明度」だけで表現する。
+    並びが変わったときに1回だけ配置を計算し、各ボタンを元の位置から新しい位置まで
+    オフセットで滑らせる (FLIP)。アニメーション中のフレームは queue_draw だけで、
+    size-allocate は走らない。
+    """
+    __gtype_name__ = 'DockTaskStrip'
+
+    # 入場・退場時に縦方向へずらす量 (px)
+    SLIDE_DISTANCE = 12
+
+    def __init__(self, clock, spacing=0, duration_ms=250, easing_func=None, animate=True):
+        super().__init__()
+        self.set_has_window(False)
+        self.clock = clock
+        self.spacing = spacing
+        self.duration_ms = duration_ms
+        self.easing_func = easing_func
+        self.animate = animate
+        # 並び順 (退場中のものも描画のために残す)
+        self.children = []
+        self.states = {}
+
+    # --- 公開API ---
+
+    def animate_entry(self, widget, duration_ms, easing_func=None):
+        """追加済みの widget を、下からふわっと出てくるように表示する"""
+        if not self.animate: return
+        state = self.states[widget]
+        widget.set_opacity(0.0)
+        state.offset_y = self.SLIDE_DISTANCE
+        self.clock.animate(widget, "opacity", 1.0, duration_ms, widget.set_opacity,
+                           easing_func=easing_func, from_value=0.0)
+        self.clock.animate(widget, "strip-offset-y", 0.0, duration_ms,
+                           lambda value: self._set_offset(widget, 'offset_y', value),
+                           easing_func=easing_func, from_value=state.offset_y)
+
+    def remove_animated(self, widget, on_removed=None):
+        """widget を退場アニメーションの後に取り除いて破棄する
+
+        並びからはすぐ外すので、隣のボタンは同時に新しい位置へ滑っていく。
+        on_removed を渡すと、破棄せずに取り除いてから on_removed(widget) を呼ぶ (使い回し用)。
+        """
+        state = self.states.get(widget)
+        if state is None or state.exiting: return
+        if not self.animate or state.allocation is None or not widget.get_visible():
+            self._finish_removal(widget, on_removed)
+            return
+
+        state.exiting = True
+        self.queue_resize()  # 隣のボタンの位置を決め直す (この1回だけ)
+        self.clock.animate(widget, "strip-offset-y", self.SLIDE_DISTANCE, self.duration_ms,
+                           lambda value: self._set_offset(widget, 'offset_y', value),
+                           from_value=state.offset_y)
+        self.clock.animate(widget, "opacity", 0.0, self.duration_ms, widget.set_opacity,
+                           complete_callback=lambda: self._finish_removal(widget, on_removed))
+
+    def reorder_child(self, widget, position):
+        """並び順を変える (移動は FLIP で自動的にアニメーションする)"""
+        self.children.remove(widget)
+        self.children.insert(position, widget)
+        self.queue_resize()
+
+    # --- Gtk.Container の実装 ---
+
+    def do_add(self, widget):
+        self.children.append(widget)
+        self.states[widget] = _ChildState()
+        widget.set_parent(self)
+
+    def do_remove(self, widget):
+        if widget not in self.states: return
+        was_visible = widget.get_visible()
+        widget.unparent()
+        self.children.remove(widget)
+        del self.states[widget]
+        if was_visible:
+            self.queue_resize()
+
+    def do_forall(self, include_internals, callback, *callback_data):
+        for child in list(self.children):
+            callback(child, *callback_data)
+
+    def do_child_type(self):
+        return Gtk.Widget.__gtype__
+
+    def do_get_request_mode(self):
+        return Gtk.SizeRequestMode.CONSTANT_SIZE
+
+    def do_get_preferred_width(self):
+        layout = self._layout_children()
+        minimum = natural = self.spacing * max(len(layout) - 1, 0)
+        for child in layout:
+            child_min, child_nat = child.get_preferred_width()
+            minimum += child_min
+            natural += child_nat
+        return minimum, natural
+
+    def do_get_preferred_height(self):
+        minimum = natural = 0
+        for child in self._layout_children():
+            child_min, child_nat = child.get_preferred_height()
+            minimum = max(minimum, child_min)
+            natural = max(natural, child_nat)
+        return minimum, natural
+
+    def do_size_allocate(self, allocation):
+        self.set_allocation(allocation)
+
+        layout = self._layout_children()
+        widths = [child.get_preferred_width()[1] for child in layout]
+        total = sum(widths) + self.spacing * max(len(layout) - 1, 0)
+        x = allocation.x + max((allocation.width - total) // 2, 0)
+
+        for child, width in zip(layout, widths):
+            state = self.states[child]
+            height = min(child.get_preferred_height()[1], allocation.height)
+            rect = Gdk.Rectangle()
+            rect.x = x
+            rect.y = allocation.y + (allocation.height - height) // 2
+            rect.width = width
+            rect.height = height
+
+            # 位置が変わったら、見た目は元の場所に残したまま新しい位置へ滑らせる
+            if self.animate and state.allocation is not None and state.allocation.x != x:
+                self._slide_x(child, state.offset_x + state.allocation.x - x)
+            state.allocation = rect
+            child.size_allocate(rect)
+            x += width + self.spacing
+
+        # 退場中のものは最後の位置のまま
+        for child in self.children:
+            state = self.states[child]
+            if state.exiting and state.allocation is not None:
+                child.size_allocate(state.allocation)
+
+    def do_draw(self, cr):
+        for child in self.children:
+            state = self.states[child]
+            if state.offset_x or state.offset_y:
+                cr.save()
+                cr.translate(state.offset_x, state.offset_y)
+                self.propagate_draw(child, cr)
+                cr.restore()
+            else:
+                self.propagate_draw(child, cr)
+        return False
+
+    # --- 内部処理 ---
+
+    def _layout_children(self):
+        """並びに参加する (表示中かつ退場中でない) 子"""
+        return [child for child in self.children
+                if child.get_visible() and not self.states[child].exiting]
+
+    def _finish_removal(self, widget, on_removed):
+        if on_removed is None:
+            widget.destroy()
+            return
+        # 残っているアニメーション (位置) は使い回す前に止める
+        self.clock.cancel_widget(widget)
+        self.remove(widget)
+        on_removed(widget)
+
+    def _slide_x(self, child, offset):
+        self.states[child].offset_x = offset
+        self.clock.animate(child, "strip-offset-x", 0.0, self.duration_ms,
+                           lambda value: self._set_offset(child, 'offset_x', value),
+                           easing_func=self.easing_func, from_value=offset)
+
+    def _set_offset(self, child, attr, value):
+        state = self.states.get(child)
+        if state is None: return
+        setattr(state, attr, value)
+        # 再配置はせず、描画だけやり直す
+        self.queue_draw()
+
+
+class TaskButton(Gtk.Button):
+    """タスクバーのボタン (ButtonPool で使い回す)
+
+    表示するウィンドウ (グループ表示ではクラス名) は key で持ち、シグナルは作ったときに
+    1回だけつなぐ。使い回すときは reset() で前のウィンドウの表示を消して key を差し替える。
+    """
+    __gtype_name__ = 'DockTaskButton'
+
+    def __init__(self):
+        super().__init__()
+        self.get_style_context().add_class("app-button")
+        self.key = None
+        self.image = Gtk.Image()
+        # ウィンドウ数のバッジ (グループ表示で2つ目のウィンドウが来たときに作る)
+        self.badge = None
+        self.overlay = Gtk.Overlay()
+        self.overlay.add(self.image)
+        self.add(self.overlay)
+
+    def set_badge(self, count):
+        """アイコンの右上にウィンドウ数を重ねる (1つ以下のときは隠す)"""
+        if self.badge is None:
+            if count <= 1:
+                return
+            self.badge = Gtk.Label()
+            self.badge.get_style_context().add_class("window-badge")
+            self.badge.set_halign(Gtk.Align.END)
+            self.badge.set_valign(Gtk.Align.START)
+            self.badge.set_no_show_all(True)
+            self.overlay.add_overlay(self.badge)
+        self.badge.set_text(str(count))
+        self.badge.set_visible(count > 1)
+
+    def reset(self):
+        """プールに戻す前に、前のウィンドウの表示を消す"""
+        self.key = None
+        self.image.clear()
+        self.set_badge(0)
+        self.set_tooltip_text(None)
+        self.set_opacity(1.0)
+        style = self.get_style_context()
+        style.remove_class("active")
+        style.remove_class("launching")
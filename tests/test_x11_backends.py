@@ -0,0 +1,126 @@
+"""python-xlib と xcffib のバックエンドが同じ結果を返すかのテスト
+
+同じ Xvfb・同じウィンドウ群に対して両方の X11Helper を動かし、ウィンドウ情報・アイコン・
+イベントが一致することを確かめる。Xvfb・python-xlib・xcffib・GTK のどれかが無ければスキップする。
+
+使い方: python3 -m unittest discover tests
+"""
+import contextlib
+import os
+import select
+import shutil
+import sys
+import time
+import unittest
+
+BENCH_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "bench")
+sys.path.insert(0, BENCH_DIR)
+
+from xvfb import xvfb, create_windows  # noqa: E402  (リポジトリ直下も import できるようになる)
+
+try:
+    import x11_backends
+    from x11_helper import X11Helper
+    from bench_backends import publish
+    MISSING = None if x11_backends.HAS_XLIB and x11_backends.HAS_XCFFIB else "python-xlib or xcffib"
+except (ImportError, ValueError) as e:
+    MISSING = str(e)
+if shutil.which("Xvfb") is None:
+    MISSING = "Xvfb"
+
+WINDOWS = 12
+
+
+def wait_for_events(backend, want, timeout=5.0):
+    """want(events) が True になるまで backend のイベントを読み溜める"""
+    events = []
+    deadline = time.monotonic() + timeout
+    while not want(events) and time.monotonic() < deadline:
+        batch = backend.poll_events()
+        events.extend(batch)
+        if not batch:
+            select.select([backend.fileno()], [], [], 0.1)
+    return events
+
+
+@unittest.skipIf(MISSING, f"missing {MISSING}")
+class BackendConsistencyTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        from Xlib import display
+
+        cls.stack = contextlib.ExitStack()
+        cls.stack.enter_context(xvfb())
+        cls.creator = display.Display()
+        cls.ids = create_windows(cls.creator, WINDOWS)
+        publish(cls.creator, cls.ids)
+        cls.helpers = {name: X11Helper(backend=name) for name in x11_backends.BACKENDS}
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.creator.close()
+        cls.stack.close()
+
+    def results(self, func):
+        """全バックエンドで func(helper) を呼んだ結果 {バックエンド名: 結果}"""
+        return {name: func(helper) for name, helper in self.helpers.items()}
+
+    def assertSame(self, results):
+        values = list(results.values())
+        for name, value in results.items():
+            self.assertEqual(value, values[0], f"{name} differs")
+        return values[0]
+
+    def test_backends_are_distinct(self):
+        # xcffib が見つからないと python-xlib に切り替わるので、比べる意味が無くなる
+        self.assertEqual({helper.backend.name for helper in self.helpers.values()}, set(x11_backends.BACKENDS))
+
+    def test_window_list(self):
+        self.assertEqual(self.assertSame(self.results(lambda h: h.get_window_list())), self.ids)
+
+    def test_root_properties(self):
+        self.assertEqual(self.assertSame(self.results(lambda h: h.get_current_desktop())), 1)
+        self.assertEqual(self.assertSame(self.results(lambda h: h.get_active_window())), self.ids[0])
+
+    def test_metadata(self):
+        metadata = self.assertSame(self.results(lambda h: h.get_window_metadata(self.ids)))
+        self.assertEqual(set(metadata), set(self.ids))
+        self.assertEqual(metadata[self.ids[1]]['wm_class'], 'firefox')
+        self.assertEqual(metadata[self.ids[1]]['desktop'], 1)
+
+    def test_window_class(self):
+        self.assertSame(self.results(lambda h: [h.get_window_class(win_id) for win_id in self.ids]))
+
+    def test_icons(self):
+        icons = self.assertSame(self.results(lambda h: [h.get_window_icon(win_id, 24) for win_id in self.ids]))
+        # publish は3つに1つだけアイコンを付ける
+        self.assertEqual([icon is not None for icon in icons], [i % 3 == 0 for i in range(WINDOWS)])
+
+    def test_events(self):
+        from Xlib import Xatom
+
+        # 他のテストが使うウィンドウを壊さないよう、このテスト用に作る
+        target, doomed = create_windows(self.creator, 2)
+        for helper in self.helpers.values():
+            helper.track_windows([target, doomed])
+            helper.backend.sync()
+            helper.backend.poll_events()
+
+        atom_desktop = self.creator.intern_atom('_NET_WM_DESKTOP')
+        self.creator.create_resource_object('window', target).change_property(
+            atom_desktop, Xatom.CARDINAL, 32, [3])
+        self.creator.create_resource_object('window', doomed).destroy()
+        self.creator.sync()
+
+        def want(events):
+            return ('destroy', doomed, None) in events
+
+        received = self.results(lambda h: set(wait_for_events(h.backend, want)))
+        for events in received.values():
+            self.assertIn(('property', target, atom_desktop), events)
+            self.assertIn(('destroy', doomed, None), events)
+        self.assertSame(received)
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,99 @@
+from collections import OrderedDict
+import time
+
+import cairo
+import gi
+gi.require_version('Gtk', '3.0')
+from gi.repository import Gdk
+
+
+def capture_to_thumbnail(capture, size):
+    """取得したウィンドウの中身を、長辺が size (px) の Pixbuf にする
+
+    共有メモリの画像をそのまま cairo の画像として包んで縮小するので、
+    元の大きさの画像はどこにもコピーしない (コピーされるのは縮小後の小さい画像だけ)。
+    ZPixmap の 32bit ピクセルは cairo と同じ「ネイティブのバイト順の ARGB」で、
+    深さ32のウィンドウはアルファ乗算済み (ARGB32)、深さ24は4バイト目が不定なので
+    アルファを無視する RGB24 として読む。
+    """
+    width, height = capture.width, capture.height
+    # cairo は書き込める buffer しか包めない (共有メモリの memoryview はそのまま使える)
+    data = capture.data if capture.shared else bytearray(capture.data)
+    fmt = cairo.FORMAT_ARGB32 if capture.depth == 32 else cairo.FORMAT_RGB24
+    frame = cairo.ImageSurface.create_for_data(data, fmt, width, height, width * 4)
+
+    ratio = min(size / max(width, height), 1.0)
+    thumb_w, thumb_h = max(int(width * ratio), 1), max(int(height * ratio), 1)
+    thumb = cairo.ImageSurface(fmt, thumb_w, thumb_h)
+    cr = cairo.Context(thumb)
+    cr.scale(thumb_w / width, thumb_h / height)
+    cr.set_source_surface(frame, 0, 0)
+    cr.get_source().set_filter(cairo.FILTER_GOOD)
+    cr.paint()
+    # 共有メモリは次の取得で上書きされるので、ここで手放す
+    frame.finish()
+    # RGBA (アルファ乗算なし) への並べ替えは GDK が小さい画像に対して行う
+    return Gdk.pixbuf_get_from_surface(thumb, 0, 0, thumb_w, thumb_h)
+
+
+class ThumbnailCache:
+    """ウィンドウの縮小画像 (ホバー時のプレビュー) のキャッシュ
+
+    同じウィンドウは min_interval_ms より短い間隔では取り直さない (マウスの移動のたびに
+    query-tooltip が呼ばれても、取得はこの間隔に抑えられる)。
+    合計サイズが max_bytes を超えたら、一番長く使われていないものから捨てる。
+    """
+    def __init__(self, capture, max_bytes, min_interval_ms):
+        # capture(win_id) -> x11_backends.Capture / None
+        self.capture = capture
+        self.max_bytes = max_bytes
+        self.min_interval = min_interval_ms / 1000.0
+        # win_id -> (Pixbuf, 長辺, 取得した時刻, バイト数)
+        self._entries = OrderedDict()
+        self.total_bytes = 0
+        # 統計用カウンタ
+        self.captures = 0
+        self.hits = 0
+
+    def get(self, win_id, size):
+        """縮小画像を返す。古ければ取り直す
+
+        取得できないとき (最小化中など) は、前に取れた画像があればそれを返す。
+        """
+        entry = self._entries.get(win_id)
+        now = time.monotonic()
+        if entry is not None:
+            self._entries.move_to_end(win_id)
+            if entry[1] == size and now - entry[2] < self.min_interval:
+                self.hits += 1
+                return entry[0]
+
+        capture = self.capture(win_id)
+        if capture is None:
+            return entry[0] if entry is not None else None
+        self.captures += 1
+        pixbuf = capture_to_thumbnail(capture, size)
+
+        nbytes = pixbuf.get_rowstride() * pixbuf.get_height()
+        self._store(win_id, (pixbuf, size, now, nbytes))
+        return pixbuf
+
+    def invalidate(self, win_id):
+        entry = self._entries.pop(win_id, None)
+        if entry is not None:
+            self.total_bytes -= entry[3]
+
+    def clear(self):
+        self._entries.clear()
+        self.total_bytes = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def _store(self, win_id, entry):
+        self.invalidate(win_id)
+        self._entries[win_id] = entry
+        self.total_bytes += entry[3]
+        while self.total_bytes > self.max_bytes and len(self._entries) > 1:
+            _, old = self._entries.popitem(last=False)
+            self.total_bytes -= old[3]
@@ -0,0 +1,450 @@
+"""X11Helper が使うプロトコル層 (python-xlib / xcffib)
+
+どちらのバックエンドも同じメソッドを持ち、返答とイベントを同じ形に揃えて返す。
+問い合わせ系 (get_property など) は送信だけしてクッキーを返し、
+reply() を呼んだときに初めて返答を待つので、まとめて送れば往復は1回で済む。
+
+  get_property(win_id, atom, long_offset, long_length).reply()
+      -> PropertyReply / プロパティが無ければ None
+  get_geometry(win_id).reply()
+      -> ルート座標の (x, y, 幅, 高さ)
+  poll_events()
+      -> 届いているイベントを全部 (待たずに) 読んで
+         ('property', win_id, atom) / ('destroy', win_id, None) / ('configure', win_id, None)
+         のリストで返す (それ以外のイベントは捨てる)
+
+  capture_window(win_id)
+      -> ウィンドウの中身 (Capture) / 取得できなければ None
+         XComposite の名前付きピクスマップを MIT-SHM の共有メモリで受け取る (xcb のみ)。
+         画像をソケット経由の GetImage で丸ごと読むと UI が止まるので、MIT-SHM が使えない
+         とき (python-xlib・拡張の無いサーバー) はプレビューを出さない
+
+ウィンドウが既に閉じられているなどのエラーは reply() で例外になる。
+"""
+from array import array
+from collections import namedtuple
+import ctypes
+import struct
+import sys
+
+try:
+    from Xlib import display as xdisplay, X
+    from Xlib import error as xerror
+    from Xlib.protocol import event as xevent
+    from Xlib.protocol import request as xrequest
+    HAS_XLIB = True
+except ImportError:
+    HAS_XLIB = False
+
+try:
+    import xcffib
+    import xcffib.xproto as xproto
+    import xcffib.composite as xcb_composite
+    import xcffib.shm as xcb_shm
+    HAS_XCFFIB = True
+except ImportError:
+    HAS_XCFFIB = False
+
+# イベントマスク (プロトコルで決まっている値なので両方のバックエンドで共通)
+NO_EVENT_MASK = 0
+STRUCTURE_NOTIFY_MASK = 1 << 17
+SUBSTRUCTURE_NOTIFY_MASK = 1 << 19
+SUBSTRUCTURE_REDIRECT_MASK = 1 << 20
+PROPERTY_CHANGE_MASK = 1 << 22
+
+# 定義済みの Atom
+ATOM_WM_CLASS = 67
+
+# イベントの種類 (プロトコルの値)
+_DESTROY_NOTIFY = 17
+_CONFIGURE_NOTIFY = 22
+_PROPERTY_NOTIFY = 28
+_CLIENT_MESSAGE = 33
+
+# GetImage の形式 (1ピクセルを連続したビットで持つ形式)
+_Z_PIXMAP = 2
+_ALL_PLANES = 0xFFFFFFFF
+# 接続時の setup の image_byte_order
+_LSB_FIRST = 0
+# Composite の RedirectWindow: サーバーが今まで通り画面にも描く
+_REDIRECT_AUTOMATIC = 0
+
+# 32bit 値の配列の型コード
+_ARRAY32 = 'I' if array('I').itemsize == 4 else 'L'
+
+# type は Atom、value は format 8 なら bytes、16/32 なら数値の array
+PropertyReply = namedtuple('PropertyReply', 'type format value bytes_after')
+
+# プレビュー用に取得したウィンドウの中身
+# data は ZPixmap (1ピクセル32bit・ネイティブのバイト順、深さ32ならアルファ乗算済みの ARGB)。
+# shared が True なら共有メモリ上の書き込める memoryview で、次の capture_window までしか
+# 有効でない (使う側ですぐに縮小する)
+Capture = namedtuple('Capture', 'width height depth data shared')
+
+BACKENDS = ('xlib', 'xcb')
+
+
+def create_backend(name='xlib'):
+    """name のバックエンドで X サーバーに接続する
+
+    xcffib が無ければ python-xlib を使う。どちらも無ければ None。
+    """
+    if name == 'xcb':
+        if HAS_XCFFIB:
+            return XcbBackend()
+        print("Warning: xcffib not found. Falling back to python-xlib.")
+    elif name != 'xlib':
+        print(f"Warning: unknown X11 backend '{name}'. Using python-xlib.")
+    if HAS_XLIB:
+        return XlibBackend()
+    print("Warning: python-xlib not found. Window management features disabled.")
+    return None
+
+
+class XlibBackend:
+    """python-xlib (純Python) のバックエンド"""
+    name = 'xlib'
+
+    def __init__(self):
+        self.display = xdisplay.Display()
+        self.root = self.display.screen().root.id
+
+    def fileno(self):
+        return self.display.fileno()
+
+    def intern_atom(self, name):
+        return self.display.intern_atom(name)
+
+    def get_property(self, win_id, atom, long_offset, long_length):
+        return _XlibPropertyCookie(xrequest.GetProperty(
+            display=self.display.display,
+            defer=True,
+            delete=False,
+            window=win_id,
+            property=atom,
+            type=X.AnyPropertyType,
+            long_offset=long_offset,
+            long_length=long_length
+        ))
+
+    def get_geometry(self, win_id):
+        # WM の枠の中に入っているので、位置は TranslateCoords で求める
+        translate = xrequest.TranslateCoords(
+            display=self.display.display,
+            defer=True,
+            src_wid=win_id,
+            dst_wid=self.root,
+            src_x=0,
+            src_y=0
+        )
+        geometry = xrequest.GetGeometry(display=self.display.display, defer=True, drawable=win_id)
+        return _XlibGeometryCookie(translate, geometry)
+
+    def select_input(self, win_id, event_mask):
+        win = self.display.create_resource_object('window', win_id)
+        win.change_attributes(event_mask=event_mask, onerror=xerror.CatchError())
+
+    def change_property32(self, win_id, atom, type_atom, values):
+        win = self.display.create_resource_object('window', win_id)
+        win.change_property(atom, type_atom, 32, values)
+
+    def send_root_message(self, win_id, type_atom, data):
+        """EWMH のクライアントメッセージをルートウィンドウに送る"""
+        win = self.display.create_resource_object('window', win_id)
+        ev = xevent.ClientMessage(window=win, client_type=type_atom, data=(32, data))
+        root = self.display.create_resource_object('window', self.root)
+        root.send_event(ev, event_mask=SUBSTRUCTURE_REDIRECT_MASK | SUBSTRUCTURE_NOTIFY_MASK)
+
+    def capture_window(self, win_id):
+        """python-xlib は MIT-SHM を持たないのでプレビューは出さない
+
+        GetImage で読むと1フレーム分 (4K なら約33MB) がソケットを通り、その間 UI が止まる。
+        """
+        return None
+
+    def release_window(self, win_id):
+        pass
+
+    def poll_events(self):
+        events = []
+        while self.display.pending_events() > 0:
+            event = self.display.next_event()
+            if event.type == _PROPERTY_NOTIFY:
+                events.append(('property', event.window.id, event.atom))
+            elif event.type == _DESTROY_NOTIFY:
+                events.append(('destroy', event.window.id, None))
+            elif event.type == _CONFIGURE_NOTIFY:
+                events.append(('configure', event.window.id, None))
+        return events
+
+    def flush(self):
+        self.display.flush()
+
+    def sync(self):
+        self.display.sync()
+
+
+class _XlibPropertyCookie:
+    __slots__ = ('request',)
+
+    def __init__(self, request):
+        self.request = request
+
+    def reply(self):
+        req = self.request
+        req.reply()
+        if not req.property_type:
+            return None
+        fmt, value = req.value
+        return PropertyReply(req.property_type, fmt, value, req.bytes_after)
+
+
+class _XlibGeometryCookie:
+    __slots__ = ('translate', 'geometry')
+
+    def __init__(self, translate, geometry):
+        self.translate = translate
+        self.geometry = geometry
+
+    def reply(self):
+        self.translate.reply()
+        self.geometry.reply()
+        return (self.translate.x, self.translate.y, self.geometry.width, self.geometry.height)
+
+
+class XcbBackend:
+    """xcffib (libxcb) のバックエンド
+
+    返答のデコードは libxcb 側で行われ、Python では値の取り出しだけになる。
+    """
+    name = 'xcb'
+
+    def __init__(self):
+        self.conn = xcffib.connect()
+        self.core = self.conn.core
+        setup = self.conn.get_setup()
+        self.root = setup.roots[self.conn.pref_screen].root
+        # Composite で中身を残すようにしたウィンドウ
+        self._redirected = set()
+        # 拡張は最初の capture_window で調べる (None = まだ / False = 使えない)
+        self._composite = None
+        self._shm = None
+        self._segment = None
+
+    def fileno(self):
+        return self.conn.get_file_descriptor()
+
+    def intern_atom(self, name):
+        name = name.encode('ascii')
+        return self.core.InternAtom(False, len(name), name).reply().atom
+
+    def get_property(self, win_id, atom, long_offset, long_length):
+        return _XcbPropertyCookie(self.core.GetProperty(
+            False, win_id, atom, xproto.GetPropertyType.Any, long_offset, long_length))
+
+    def get_geometry(self, win_id):
+        return _XcbGeometryCookie(
+            self.core.TranslateCoordinates(win_id, self.root, 0, 0),
+            self.core.GetGeometry(win_id))
+
+    def select_input(self, win_id, event_mask):
+        # エラー (BadWindow) はイベントとして届き、poll_events で捨てる
+        self.core.ChangeWindowAttributes(win_id, xproto.CW.EventMask, [event_mask])
+
+    def change_property32(self, win_id, atom, type_atom, values):
+        data = struct.pack(f"={len(values)}I", *values)
+        self.core.ChangeProperty(xproto.PropMode.Replace, win_id, atom, type_atom, 32, len(values), data)
+
+    def send_root_message(self, win_id, type_atom, data):
+        """EWMH のクライアントメッセージをルートウィンドウに送る"""
+        event = struct.pack("=BBHII5I", _CLIENT_MESSAGE, 32, 0, win_id, type_atom, *data)
+        self.core.SendEvent(False, self.root, SUBSTRUCTURE_REDIRECT_MASK | SUBSTRUCTURE_NOTIFY_MASK, event)
+
+    def capture_window(self, win_id):
+        """ウィンドウの中身を取得する
+
+        画像は MIT-SHM の共有メモリに直接書かれ、ソケットを通るのは返答のヘッダだけになる。
+        MIT-SHM が使えなければ None (ソケット経由の GetImage にはしない)。
+        """
+        if self._composite is None:
+            self._init_capture()
+        if not self._composite or not self._shm:
+            return None
+        if win_id not in self._redirected:
+            # 他のウィンドウに隠れていても中身が残るようにする
+            self._composite.RedirectWindow(win_id, _REDIRECT_AUTOMATIC)
+            self._redirected.add(win_id)
+        pixmap = self.conn.generate_id()
+        self._composite.NameWindowPixmap(win_id, pixmap)
+        try:
+            # 最小化中 (マップされていない) なら xcffib.Error になる
+            geometry = self.core.GetGeometry(pixmap).reply()
+            if geometry.depth not in (24, 32):
+                return None
+            width, height = geometry.width, geometry.height
+            segment = self._shm_segment(width * height * 4)
+            if segment is None:
+                return None
+            image = self._shm.GetImage(pixmap, 0, 0, width, height, _ALL_PLANES, _Z_PIXMAP,
+                                       segment.xid, 0).reply()
+            return Capture(width, height, geometry.depth, segment.view[:image.size], True)
+        finally:
+            self.core.FreePixmap(pixmap)
+
+    def release_window(self, win_id):
+        """capture_window のためのリダイレクトをやめる"""
+        if win_id in self._redirected:
+            self._redirected.discard(win_id)
+            self._composite.UnredirectWindow(win_id, _REDIRECT_AUTOMATIC)
+
+    def _has_extension(self, name):
+        name = name.encode('ascii')
+        return bool(self.core.QueryExtension(len(name), name).reply().present)
+
+    def _init_capture(self):
+        self._composite = False
+        # 共有メモリの画像はサーバーのバイト順のまま読むので、手元と同じときだけ使う
+        lsb_first = self.conn.get_setup().image_byte_order == _LSB_FIRST
+        if lsb_first != (sys.byteorder == 'little'):
+            print("Window previews disabled: X server image byte order differs from this machine")
+            return
+        if not self._has_extension('Composite') or not self._has_extension('MIT-SHM'):
+            return
+        composite = self.conn(xcb_composite.key)
+        composite.QueryVersion(0, 4).reply()
+        self._composite = composite
+        shm = self.conn(xcb_shm.key)
+        shm.QueryVersion().reply()
+        self._shm = shm
+
+    def _shm_segment(self, size):
+        """size バイト以上の共有メモリを返す (足りなければ作り直す)。使えなければ None"""
+        if self._segment is not None and self._segment.size >= size:
+            return self._segment
+        if self._segment is not None:
+            self._shm.Detach(self._segment.xid)
+            self._segment.close()
+            self._segment = None
+        # 少し大きいウィンドウのたびに作り直さないよう、1MB 単位で切り上げる
+        size = (size + 0xFFFFF) & ~0xFFFFF
+        try:
+            segment = _ShmSegment(size)
+        except OSError as e:
+            print(f"MIT-SHM unavailable, window previews disabled: {e}")
+            self._shm = None
+            return None
+        segment.xid = self.conn.generate_id()
+        try:
+            self._shm.AttachChecked(segment.xid, segment.shmid, False).check()
+        except xcffib.Error:
+            # リモートの X サーバーなどで共有メモリを使えない
+            segment.remove()
+            segment.close()
+            self._shm = None
+            return None
+        # サーバーと両方で付けたので、どちらかが外れたら自動で消えるようにしておく
+        segment.remove()
+        self._segment = segment
+        return segment
+
+    def poll_events(self):
+        events = []
+        while True:
+            try:
+                event = self.conn.poll_for_event()
+            except xcffib.Error:
+                # 返答の無いリクエストのエラー (閉じたウィンドウへのイベント選択など)
+                continue
+            if event is None:
+                return events
+            if isinstance(event, xproto.PropertyNotifyEvent):
+                events.append(('property', event.window, event.atom))
+            elif isinstance(event, xproto.DestroyNotifyEvent):
+                events.append(('destroy', event.window, None))
+            elif isinstance(event, xproto.ConfigureNotifyEvent):
+                events.append(('configure', event.window, None))
+
+    def flush(self):
+        self.conn.flush()
+
+    def sync(self):
+        # XCB に XSync は無いので、返答のある最小のリクエストで往復を待つ
+        self.core.GetInputFocus().reply()
+
+
+class _XcbPropertyCookie:
+    __slots__ = ('cookie',)
+
+    def __init__(self, cookie):
+        self.cookie = cookie
+
+    def reply(self):
+        r = self.cookie.reply()
+        if not r.type:
+            return None
+        raw = r.value.raw
+        if r.format == 32:
+            value = array(_ARRAY32, raw)
+        elif r.format == 16:
+            value = array('H', raw)
+        else:
+            value = raw
+        return PropertyReply(r.type, r.format, value, r.bytes_after)
+
+
+class _XcbGeometryCookie:
+    __slots__ = ('translate', 'geometry')
+
+    def __init__(self, translate, geometry):
+        self.translate = translate
+        self.geometry = geometry
+
+    def reply(self):
+        translate = self.translate.reply()
+        geometry = self.geometry.reply()
+        return (translate.dst_x, translate.dst_y, geometry.width, geometry.height)
+
+
+_libc = None
+
+# sys/ipc.h の値
+_IPC_PRIVATE = 0
+_IPC_CREAT = 0o1000
+_IPC_RMID = 0
+
+
+def _load_libc():
+    global _libc
+    if _libc is None:
+        libc = ctypes.CDLL(None, use_errno=True)
+        libc.shmget.argtypes = (ctypes.c_int, ctypes.c_size_t, ctypes.c_int)
+        libc.shmget.restype = ctypes.c_int
+        libc.shmat.argtypes = (ctypes.c_int, ctypes.c_void_p, ctypes.c_int)
+        libc.shmat.restype = ctypes.c_void_p
+        libc.shmdt.argtypes = (ctypes.c_void_p,)
+        libc.shmctl.argtypes = (ctypes.c_int, ctypes.c_int, ctypes.c_void_p)
+        _libc = libc
+    return _libc
+
+
+class _ShmSegment:
+    """MIT-SHM 用の SysV 共有メモリ (標準ライブラリに無いので libc を ctypes で呼ぶ)"""
+
+    def __init__(self, size):
+        libc = _load_libc()
+        self.size = size
+        self.xid = None
+        self.shmid = libc.shmget(_IPC_PRIVATE, size, _IPC_CREAT | 0o600)
+        if self.shmid < 0:
+            raise OSError(ctypes.get_errno(), "shmget failed")
+        self.addr = libc.shmat(self.shmid, None, 0)
+        if self.addr is None or self.addr == ctypes.c_void_p(-1).value:
+            self.remove()
+            raise OSError(ctypes.get_errno(), "shmat failed")
+        self.view = memoryview((ctypes.c_char * size).from_address(self.addr)).cast('B')
+
+    def remove(self):
+        _load_libc().shmctl(self.shmid, _IPC_RMID, None)
+
+    def close(self):
+        _load_libc().shmdt(self.addr)
@@ -1,142 +1,554 @@
+import os
+import time
+import select
+import threading
 import gi
 gi.require_version('Gtk', '3.0')
 from gi.repository import Gtk, GLib
 
-# X11操作用ライブラリの読み込みを試みる
-try:
-    from Xlib import display, X
-    from Xlib.protocol import event as xevent
-    HAS_XLIB = True
-except ImportError:
-    HAS_XLIB = False
-    print("Warning: python-xlib not found. Window management features disabled.")
+import instrument
+import x11_backends
+from x11_backends import (ATOM_WM_CLASS, NO_EVENT_MASK, PROPERTY_CHANGE_MASK,
+                          STRUCTURE_NOTIFY_MASK)
 
 class X11Helper:
-    def __init__(self):
-        self.enabled = HAS_XLIB
-        self.callback = None
+    # まとめ取得でプロパティ1つあたりに読む最大長 (32bit単位)
+    METADATA_LONG_LENGTH = 1024
+    # _NET_WM_ICON でこれより大きい辺の画像は壊れたデータとみなす
+    MAX_ICON_SIZE = 1024
+    # _NET_WM_DESKTOP がこの値なら全デスクトップに表示されるウィンドウ
+    ALL_DESKTOPS = 0xFFFFFFFF
+
+    def __init__(self, event_thread=False, coalesce_ms=10, backend='xlib'):
+        # プロトコル層 ('xlib' = python-xlib, 'xcb' = xcffib)。接続できなければ None
+        self.backend_name = backend
+        self.backend = None
+        # True ならイベントの受信を専用スレッドで行う
+        self.event_thread = event_thread
+        # 最初のイベントからこの時間内に届いたものを1回の処理にまとめる (スレッド方式)
+        self.coalesce_ms = coalesce_ms
+        # 受信したイベント数と、まとめてハンドラを呼んだ回数
+        self.stats = {'raw_events': 0, 'dispatches': 0}
+        # イベント種別ごとのハンドラ {'client-list': [...], 'active-window': [...]}
+        self.handlers = {}
+        # 管理中のクライアントウィンドウの情報キャッシュ {win_id: get_window_metadata と同じ形式}
+        # (複数のドックがあっても接続とキャッシュは1つだけ)
+        self.windows = {}
+        try:
+            self.backend = x11_backends.create_backend(backend)
+        except Exception as e:
+            print(f"X11 init failed: {e}")
+        self.enabled = self.backend is not None
         if self.enabled:
             try:
-                self.display = display.Display()
-                self.root = self.display.screen().root
-                
+                self.root_id = self.backend.root
+                intern_atom = self.backend.intern_atom
+
                 # よく使うAtomを事前登録
-                self.atom_client_list = self.display.intern_atom('_NET_CLIENT_LIST')
-                self.atom_active_window = self.display.intern_atom('_NET_ACTIVE_WINDOW')
-                self.atom_wm_change_state = self.display.intern_atom('WM_CHANGE_STATE')
+                self.atom_client_list = intern_atom('_NET_CLIENT_LIST')
+                self.atom_active_window = intern_atom('_NET_ACTIVE_WINDOW')
+                self.atom_wm_change_state = intern_atom('WM_CHANGE_STATE')
+                self.atom_wm_name = intern_atom('_NET_WM_NAME')
+                self.atom_wm_pid = intern_atom('_NET_WM_PID')
+                self.atom_wm_state = intern_atom('_NET_WM_STATE')
+                self.atom_wm_icon = intern_atom('_NET_WM_ICON')
+                self.atom_wm_desktop = intern_atom('_NET_WM_DESKTOP')
+                self.atom_current_desktop = intern_atom('_NET_CURRENT_DESKTOP')
+                self.atom_startup_id = intern_atom('_NET_STARTUP_ID')
+
+                # get_window_metadata で取得する項目: (キー, Atom)
+                self.metadata_props = (
+                    ('wm_class', ATOM_WM_CLASS),
+                    ('title', self.atom_wm_name),
+                    ('pid', self.atom_wm_pid),
+                    ('state', self.atom_wm_state),
+                    ('desktop', self.atom_wm_desktop),
+                    # 起動したアプリのウィンドウを見分けるための起動通知ID
+                    ('startup_id', self.atom_startup_id),
+                )
+                # PropertyNotify の Atom -> キャッシュのキー
+                self.metadata_keys = {atom: key for key, atom in self.metadata_props}
                 
                 # Strut (場所取り) 用のAtom
-                self.atom_strut = self.display.intern_atom('_NET_WM_STRUT')
-                self.atom_strut_partial = self.display.intern_atom('_NET_WM_STRUT_PARTIAL')
-                self.atom_cardinal = self.display.intern_atom('CARDINAL')
+                self.atom_strut = intern_atom('_NET_WM_STRUT')
+                self.atom_strut_partial = intern_atom('_NET_WM_STRUT_PARTIAL')
+                self.atom_cardinal = intern_atom('CARDINAL')
             except Exception as e:
                 print(f"X11 init failed: {e}")
                 self.enabled = False
 
-    def start_monitoring(self, callback):
-        """X11のイベント監視を開始する (GLibのループに統合)"""
+    def connect(self, kind, handler):
+        """イベント種別ごとにハンドラを登録する
+
+        kind: 'client-list'     -> _NET_CLIENT_LIST が変わったとき
+              'current-desktop' -> _NET_CURRENT_DESKTOP が変わったとき
+              'active-window'   -> _NET_ACTIVE_WINDOW が変わったとき
+              'window-changed'  -> 管理中ウィンドウの情報が変わったとき
+                                   handler(win_id, key) で呼ばれる
+                                   (key は 'wm_class', 'title', 'pid', 'state', 'desktop',
+                                    'startup_id', 'geometry', 'icon')
+        """
+        self.handlers.setdefault(kind, []).append(handler)
+
+    def disconnect(self, kind, handler):
+        handlers = self.handlers.get(kind, [])
+        if handler in handlers:
+            handlers.remove(handler)
+
+    def start_monitoring(self):
+        """X11のイベント監視を開始する
+
+        通常は GLib のループに統合し、event_thread=True のときは専用スレッドで
+        イベントを読む。どちらの場合もイベントはまとめて (coalesce) から処理する。
+        """
         if not self.enabled: return
 
-        self.callback = callback
-        
-        # ルートウィンドウのプロパティ変更（ウィンドウリストやアクティブウィンドウの変化）を監視
-        self.root.change_attributes(event_mask=X.PropertyChangeMask)
+        # Atom -> イベント種別 の対応表 (ディスパッチもこの順番で行う)
+        self.atom_kinds = {
+            self.atom_client_list: 'client-list',
+            self.atom_current_desktop: 'current-desktop',
+            self.atom_active_window: 'active-window',
+        }
         
-        # X11のソケットをGLibで監視する
-        # これにより、イベントが来たときだけ処理が走るようになる（省エネ！）
         try:
-            fd = self.display.display.socket.fileno()
-            GLib.io_add_watch(fd, GLib.IO_IN, self._on_x_event)
+            if self.event_thread:
+                self._start_event_thread()
+            else:
+                # ルートウィンドウのプロパティ変更（ウィンドウリストやアクティブウィンドウの変化）を監視
+                self.backend.select_input(self.root_id, PROPERTY_CHANGE_MASK)
+                self.backend.flush()
+                # X11のソケットをGLibで監視する
+                # これにより、イベントが来たときだけ処理が走るようになる（省エネ！）
+                GLib.io_add_watch(self.backend.fileno(), GLib.IO_IN, self._on_x_event)
             print("X11 event monitoring started.")
         except Exception as e:
             print(f"Failed to start X11 monitoring: {e}")
 
+    @instrument.timed('x11.on_x_event')
     def _on_x_event(self, source, condition):
-        """X11からイベントが来たときに呼ばれる"""
+        """X11からイベントが来たときに呼ばれる (メインループ方式)"""
         try:
-            # 溜まっているイベントがある限り処理する
-            while self.display.pending_events() > 0:
-                event = self.display.next_event()
-                
-                # 興味があるのはプロパティの変更だけ
-                if event.type == X.PropertyNotify:
-                    if event.atom in [self.atom_client_list, self.atom_active_window]:
-                        # コールバックを実行 (dock_window側の update_window_list を呼ぶ)
-                        if self.callback:
-                            self.callback()
+            while True:
+                # 溜まっているイベントを全部読んでから、まとめて1回だけ処理する
+                changes = {}
+                for event in self.backend.poll_events():
+                    self._collect_event(changes, event)
+                if not changes:
+                    break
+                # 処理中の問い合わせで届いたイベントもここで拾う
+                self._apply_changes(changes)
         except Exception as e:
             print(f"Error in event loop: {e}")
             
         return True # 監視を継続
 
+    def _start_event_thread(self):
+        """イベント受信専用の接続とスレッドを用意する"""
+        # python-xlib の Display はスレッド間で共有できないので、イベント用に別接続を持つ
+        # (xcffib も同じ形にしておき、メインスレッドの問い合わせとロックを取り合わない)
+        self.event_backend = x11_backends.create_backend(self.backend.name)
+        self.event_lock = threading.Lock()
+        self.wake_r, self.wake_w = os.pipe()
+        self.event_backend.select_input(self.event_backend.root, PROPERTY_CHANGE_MASK)
+        self.event_backend.flush()
+        threading.Thread(target=self._event_thread_main, daemon=True).start()
+
+    def _event_thread_main(self):
+        """イベントスレッド: 受信・デコード・まとめをここで行い、UIには触らない"""
+        fd = self.event_backend.fileno()
+        while True:
+            try:
+                changes = self._read_events({})
+                if not changes:
+                    self._wait_for_events(fd, None)
+                    continue
+                # 最初のイベントから少しの間に届いたものを1つの変更セットにまとめる
+                deadline = time.monotonic() + self.coalesce_ms / 1000.0
+                while True:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._wait_for_events(fd, remaining)
+                    self._read_events(changes)
+                GLib.idle_add(self._apply_changes, changes)
+            except Exception as e:
+                print(f"Error in event thread: {e}")
+                time.sleep(0.1)
+
+    def _wait_for_events(self, fd, timeout):
+        # 読み込み済みのイベントは _read_events で全部取り出してあるので、ソケットだけ待てばよい
+        # メインスレッドがイベント選択のついでに読み込んだ分は wake パイプで知らされる
+        readable, _, _ = select.select([fd, self.wake_r], [], [], timeout)
+        if self.wake_r in readable:
+            os.read(self.wake_r, 64)
+
+    def _read_events(self, changes):
+        with self.event_lock:
+            events = self.event_backend.poll_events()
+        for event in events:
+            self._collect_event(changes, event)
+        return changes
+
+    def _collect_event(self, changes, event):
+        """イベントを変更セットに加える (同じ対象への変更は最新の1件だけ残る)
+
+        event はバックエンドが揃えた (種類, win_id, Atom) の形。
+        """
+        self.stats['raw_events'] += 1
+        kind, win_id, atom = event
+        if kind == 'property':
+            if win_id == self.root_id:
+                changes[('root', atom)] = None
+            else:
+                changes[('window', win_id, atom)] = None
+        elif kind == 'destroy':
+            changes[('destroy', win_id)] = None
+        elif kind == 'configure':
+            # 移動・リサイズ (座標は親ウィンドウ基準のことがあるので、位置は取り直す)
+            changes[('configure', win_id)] = None
+
+    @instrument.timed('x11.apply_changes')
+    def _apply_changes(self, changes):
+        """変更セットを1回で反映し、ハンドラを呼ぶ (メインスレッド)"""
+        self.stats['dispatches'] += 1
+
+        # 閉じられたウィンドウはキャッシュから外す
+        for key in changes:
+            if key[0] == 'destroy':
+                self.windows.pop(key[1], None)
+
+        # 変わったプロパティ・位置は全部まとめて取り直す (イベントには値が含まれない)
+        pending = []
+        icon_changed = []
+        for key in changes:
+            if key[0] == 'configure' and key[1] in self.windows:
+                pending.append((key[1], 'geometry', self._request_geometry(key[1])))
+                continue
+            if key[0] != 'window' or key[1] not in self.windows:
+                continue
+            _, win_id, atom = key
+            if atom == self.atom_wm_icon:
+                # アイコンのピクセルデータは大きいので、ここでは変更の通知だけ行う
+                icon_changed.append(win_id)
+            elif atom in self.metadata_keys:
+                pending.append((win_id, self.metadata_keys[atom], self._request_property(win_id, atom)))
+
+        if pending:
+            instrument.count('x11.round_trips')
+        updated = []
+        for win_id, key, req in pending:
+            try:
+                value = self._reply(key, req)
+            except Exception:
+                continue
+            info = self.windows.get(win_id)
+            if info is not None and info[key] != value:
+                info[key] = value
+                updated.append((win_id, key))
+
+        for win_id, key in updated:
+            self._dispatch('window-changed', win_id, key)
+        for win_id in icon_changed:
+            self._dispatch('window-changed', win_id, 'icon')
+
+        # ルートの変化は種別ごとに1回だけ (ウィンドウリスト -> デスクトップ -> アクティブの順)
+        for atom, kind in self.atom_kinds.items():
+            if ('root', atom) in changes:
+                self._dispatch(kind)
+        return False
+
+    def _dispatch(self, kind, *args):
+        """種別に対応するハンドラだけを呼ぶ"""
+        for handler in self.handlers.get(kind, ()):
+            handler(*args)
+
+    def _select_window_events(self, win_ids, event_mask):
+        """クライアントウィンドウのイベント選択を変える
+
+        イベントを受け取る接続で選択する必要があるので、スレッド方式では
+        イベント用の接続を使い、サーバーに届くまで待ってから戻る。
+        """
+        if self.event_thread:
+            with self.event_lock:
+                for win_id in win_ids:
+                    self.event_backend.select_input(win_id, event_mask)
+                # 選択が有効になってから情報を取得しないと、間の変更を取りこぼす
+                self.event_backend.sync()
+                instrument.count('x11.round_trips')
+            # sync 中に読み込まれたイベントをスレッドに気づかせる
+            os.write(self.wake_w, b'\0')
+        else:
+            # 同じ接続なので、この後の GetProperty より先に処理されることが保証される
+            for win_id in win_ids:
+                self.backend.select_input(win_id, event_mask)
+
+    def track_windows(self, win_ids):
+        """ウィンドウの監視を始め、情報をキャッシュに載せる
+
+        PropertyChangeMask/StructureNotifyMask を選択してから取得するので、
+        取得後の変更は必ずイベントで届く。
+        """
+        if not self.enabled:
+            return
+        new_ids = [win_id for win_id in win_ids if win_id not in self.windows]
+        if not new_ids:
+            return
+        self._select_window_events(new_ids, PROPERTY_CHANGE_MASK | STRUCTURE_NOTIFY_MASK)
+        self.windows.update(self.get_window_metadata(new_ids))
+
+    def untrack_window(self, win_id):
+        """ウィンドウの監視をやめてキャッシュから外す
+
+        DestroyNotify でキャッシュから外れた後でも、バックエンドの資源 (リダイレクト) は解放する。
+        """
+        if not self.enabled:
+            return
+        if self.windows.pop(win_id, None) is not None:
+            # まだ存在していれば (クライアントリストから外れただけ) イベント選択を解除
+            self._select_window_events([win_id], NO_EVENT_MASK)
+        self.backend.release_window(win_id)
+
+    def get_window_info(self, win_id):
+        """キャッシュ済みのウィンドウ情報を返す (X11への問い合わせはしない)"""
+        return self.windows.get(win_id)
+
     def set_strut(self, win_id, x, y, width, height, screen_width, screen_height):
         """ウィンドウマネージャーにドックの領域（Strut）を予約する"""
         if not self.enabled: return
 
         try:
-            window = self.display.create_resource_object('window', win_id)
-            
             # 部分的なStrut (新しい規格)
             # [left, right, top, bottom, 
             #  left_start_y, left_end_y, right_start_y, right_end_y, 
             #  top_start_x, top_end_x, bottom_start_x, bottom_end_x]
             # ドックは「下」にあるので bottom を設定する
             
+            # 下端からの予約量は画面全体の下端から数える (下に別のモニターがある場合)
+            bottom = screen_height - y
+
             strut_partial = [
-                0, 0, 0, height,  # 予約する幅/高さ
+                0, 0, 0, bottom,  # 予約する幅/高さ
                 0, 0, 0, 0,       # 左右の開始・終了位置（使わない）
                 0, 0,             # 上の開始・終了位置（使わない）
                 x, x + width      # 下の開始・終了位置（ドックの横幅に合わせる）
             ]
             
             # 古い規格 (画面幅いっぱい予約しちゃうやつ)
-            strut = [0, 0, 0, height]
+            strut = [0, 0, 0, bottom]
 
             # プロパティを設定
-            window.change_property(self.atom_strut_partial, self.atom_cardinal, 32, strut_partial)
-            window.change_property(self.atom_strut, self.atom_cardinal, 32, strut)
-            self.display.flush()
+            self.backend.change_property32(win_id, self.atom_strut_partial, self.atom_cardinal, strut_partial)
+            self.backend.change_property32(win_id, self.atom_strut, self.atom_cardinal, strut)
+            self.backend.flush()
             
         except Exception as e:
             print(f"Error setting strut: {e}")
 
+    @instrument.timed('x11.get_window_list')
     def get_window_list(self):
         """現在開いているウィンドウのIDリストを取得する"""
         if not self.enabled:
             return []
         
         try:
-            prop = self.root.get_full_property(self.atom_client_list, X.AnyPropertyType)
-            if not prop:
+            prop = self._get_full_property(self.root_id, self.atom_client_list)
+            if prop is None or prop.format != 32:
                 return []
-            return prop.value
+            return list(prop.value)
         except Exception as e:
             print(f"Error getting window list: {e}")
             return []
 
+    @instrument.timed('x11.get_window_class')
     def get_window_class(self, win_id):
         """ウィンドウIDからクラス名(アプリ名)を取得する"""
         if not self.enabled:
             return None
             
         try:
-            win = self.display.create_resource_object('window', win_id)
-            wm_class = win.get_wm_class()
-            if wm_class:
-                return wm_class[1].lower()
+            instrument.count('x11.round_trips')
+            return self._reply_value('wm_class', self._request_property(win_id, ATOM_WM_CLASS).reply())
         except:
             pass
         return None
 
+    @instrument.timed('x11.get_window_metadata')
+    def get_window_metadata(self, win_ids):
+        """複数ウィンドウの情報をまとめて取得する
+
+        GetProperty を全部送ってから返答を読むので、ウィンドウ数に関係なく
+        待ち時間はほぼ1往復分で済む。
+        戻り値: {win_id: {'wm_class', 'title', 'pid', 'state', 'desktop', 'startup_id', 'geometry'}}
+        (geometry はルート座標の (x, y, 幅, 高さ)。途中で消えたウィンドウは含まれない)
+        """
+        if not self.enabled or not win_ids:
+            return {}
+
+        # 1. 返答を待たずにリクエストだけ積む
+        pending = []
+        for win_id in win_ids:
+            for key, atom in self.metadata_props:
+                pending.append((win_id, key, self._request_property(win_id, atom)))
+            pending.append((win_id, 'geometry', self._request_geometry(win_id)))
+
+        # 2. 最初の reply() で全リクエストが送信され、以降は順に返答を読むだけ
+        instrument.count('x11.round_trips')
+        result = {}
+        gone = set()
+        for win_id, key, req in pending:
+            info = result.get(win_id)
+            if info is None:
+                info = result[win_id] = {'wm_class': None, 'title': None, 'pid': None, 'state': (),
+                                         'desktop': None, 'startup_id': None, 'geometry': None}
+            try:
+                info[key] = self._reply(key, req)
+            except Exception:
+                # BadWindow など (ウィンドウが既に閉じられている)
+                gone.add(win_id)
+
+        for win_id in gone:
+            result.pop(win_id, None)
+        return result
+
+    @instrument.timed('x11.get_window_icon')
+    def get_window_icon(self, win_id, size):
+        """_NET_WM_ICON から size (px) に一番近い画像を1つだけ取得する
+
+        プロパティは [幅, 高さ, ピクセル...] の繰り返しで、全体は数百KBになることもある。
+        各画像のヘッダ (2要素) だけを読んで大きさを選び、選んだ画像のピクセルだけを取得する。
+        戻り値: (幅, 高さ, ARGB のバイト列 (ネイティブのバイト順)) / 無ければ None
+        """
+        if not self.enabled:
+            return None
+
+        try:
+            # 1. ヘッダをたどって (幅, 高さ, ピクセルの開始位置) を集める
+            icons = []
+            offset = 0
+            total = None  # プロパティ全体の長さ (32bit単位)
+            while total is None or offset + 2 <= total:
+                prop = self._request_property(win_id, self.atom_wm_icon, offset, 2).reply()
+                instrument.count('x11.round_trips')
+                if prop is None:
+                    break
+                header = prop.value
+                if prop.format != 32 or len(header) < 2:
+                    break
+                if total is None:
+                    total = offset + len(header) + prop.bytes_after // 4
+                width, height = header[0], header[1]
+                if not (0 < width <= self.MAX_ICON_SIZE and 0 < height <= self.MAX_ICON_SIZE):
+                    break
+                if offset + 2 + width * height > total:
+                    break
+                icons.append((width, height, offset + 2))
+                offset += 2 + width * height
+            if not icons:
+                return None
+
+            # 2. size 以上で一番小さいもの (無ければ一番大きいもの) のピクセルだけ取得
+            large_enough = [icon for icon in icons if max(icon[0], icon[1]) >= size]
+            if large_enough:
+                width, height, start = min(large_enough, key=lambda icon: icon[0] * icon[1])
+            else:
+                width, height, start = max(icons, key=lambda icon: icon[0] * icon[1])
+            prop = self._request_property(win_id, self.atom_wm_icon, start, width * height).reply()
+            instrument.count('x11.round_trips')
+            if prop is None or prop.format != 32 or len(prop.value) < width * height:
+                return None
+            return width, height, prop.value.tobytes()
+        except Exception:
+            # BadWindow など (ウィンドウが既に閉じられている)
+            return None
+
+    @instrument.timed('x11.capture_window')
+    def capture_window(self, win_id):
+        """ウィンドウの中身を取得する (ホバー時のプレビュー用)
+
+        XComposite の名前付きピクスマップから読むので、他のウィンドウに隠れていても取れる。
+        最小化中のウィンドウは中身が無いので None。MIT-SHM が使えない (python-xlib) ときも None。
+        戻り値: x11_backends.Capture (data は次の呼び出しまでしか有効でない) / None
+        """
+        if not self.enabled:
+            return None
+        try:
+            capture = self.backend.capture_window(win_id)
+        except Exception:
+            # BadWindow / BadDrawable (閉じられた・最小化されたウィンドウ)
+            return None
+        if capture is not None:
+            instrument.count('x11.round_trips', 2)
+        return capture
+
+    def _request_property(self, win_id, atom, long_offset=0, long_length=None):
+        """GetProperty を送信キューに積むだけで、返答は待たない (reply() で PropertyReply / None)"""
+        return self.backend.get_property(win_id, atom, long_offset,
+                                         long_length or self.METADATA_LONG_LENGTH)
+
+    def _request_geometry(self, win_id):
+        """ルート座標での位置と大きさの問い合わせを積むだけで、返答は待たない"""
+        return self.backend.get_geometry(win_id)
+
+    def _get_full_property(self, win_id, atom):
+        """プロパティを最後まで読む (METADATA_LONG_LENGTH に収まらなければ残りを取り直す)"""
+        instrument.count('x11.round_trips')
+        prop = self._request_property(win_id, atom).reply()
+        if prop is None or not prop.bytes_after:
+            return prop
+        instrument.count('x11.round_trips')
+        length = self.METADATA_LONG_LENGTH + (prop.bytes_after + 3) // 4
+        return self._request_property(win_id, atom, 0, length).reply()
+
+    def _reply(self, key, req):
+        """積んでおいた問い合わせの返答を待って、キャッシュ用の値にする"""
+        if key == 'geometry':
+            return req.reply()
+        return self._reply_value(key, req.reply())
+
+    def _reply_value(self, key, prop):
+        """GetProperty の返答 (PropertyReply) を get_window_metadata 用の値に変換する"""
+        if prop is None:
+            # プロパティが存在しない
+            return () if key == 'state' else None
+        fmt, value = prop.format, prop.value
+        if key == 'wm_class':
+            # "instance\0class\0" の形式。get_window_class と同じくクラス名を使う
+            parts = bytes(value).split(b'\0')
+            if len(parts) < 2:
+                return None
+            return parts[1].decode('latin-1').lower()
+        if key in ('title', 'startup_id'):
+            return bytes(value).decode('utf-8', 'replace') if fmt == 8 else None
+        if key in ('pid', 'desktop'):
+            return int(value[0]) if fmt == 32 and len(value) else None
+        if key == 'state':
+            return tuple(value) if fmt == 32 else ()
+        return value
+
+    def get_current_desktop(self):
+        """現在のデスクトップ番号を取得する (WMが対応していなければ None)"""
+        if not self.enabled:
+            return None
+
+        try:
+            instrument.count('x11.round_trips')
+            prop = self._request_property(self.root_id, self.atom_current_desktop, 0, 1).reply()
+            if prop and prop.format == 32 and prop.value:
+                return int(prop.value[0])
+        except Exception as e:
+            print(f"Error getting current desktop: {e}")
+        return None
+
     def get_active_window(self):
         """現在アクティブな（フォーカスされている）ウィンドウIDを取得する"""
         if not self.enabled:
             return None
         
         try:
-            prop = self.root.get_full_property(self.atom_active_window, X.AnyPropertyType)
-            if prop and prop.value:
-                return prop.value[0]
+            instrument.count('x11.round_trips')
+            prop = self._request_property(self.root_id, self.atom_active_window, 0, 1).reply()
+            if prop and prop.format == 32 and prop.value:
+                return int(prop.value[0])
         except Exception as e:
             print(f"Error getting active window: {e}")
         return None
@@ -146,15 +558,10 @@ class X11Helper:
         if not self.enabled: return
 
         try:
-            win = self.display.create_resource_object('window', win_id)
-            data = [2, X.CurrentTime, 0, 0, 0]
-            ev = xevent.ClientMessage(
-                window=win, 
-                client_type=self.atom_active_window, 
-                data=(32, data)
-            )
-            self.root.send_event(ev, event_mask=X.SubstructureRedirectMask | X.SubstructureNotifyMask)
-            self.display.flush()
+            # ソース = 2 (ページャー), タイムスタンプ = CurrentTime
+            data = [2, 0, 0, 0, 0]
+            self.backend.send_root_message(win_id, self.atom_active_window, data)
+            self.backend.flush()
         except Exception as e:
             print(f"Error activating window: {e}")
 
@@ -163,15 +570,9 @@ class X11Helper:
         if not self.enabled: return
 
         try:
-            win = self.display.create_resource_object('window', win_id)
             # IconicState = 3
             data = [3, 0, 0, 0, 0]
-            ev = xevent.ClientMessage(
-                window=win,
-                client_type=self.atom_wm_change_state,
-                data=(32, data)
-            )
-            self.root.send_event(ev, event_mask=X.SubstructureRedirectMask | X.SubstructureNotifyMask)
-            self.display.flush()
+            self.backend.send_root_message(win_id, self.atom_wm_change_state, data)
+            self.backend.flush()
         except Exception as e:
             print(f"Error minimizing window: {e}")
\ No newline at end of file